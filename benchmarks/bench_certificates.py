@@ -0,0 +1,62 @@
+# =========================
+# ⏱️ Benchmark — زمن توليد الشهادة: بدون كاش (كل مرة من الصفر) مقابل القالب والخطوط المخزنة
+# python benchmarks/bench_certificates.py --n 50
+# (يحتاج Amiri-Regular.ttf في مجلد التشغيل كما في التطبيق)
+# =========================
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import eohealth_certificates as certs  # noqa: E402
+
+NAMES = ["أحمد علي", "مريم حسن", "يوسف سعيد", "سارة محمد", "آدم خالد", "لين محمود", "عمر نبيل", "نور سامي"]
+
+
+def sample_child(i):
+    return {
+        "full_name": NAMES[i % len(NAMES)],
+        "national_id": f"T{10000000 + i}",
+        "smart_id": f"EOH-20250101-{i:06d}",
+        "birth_date": "2024-01-10",
+        "gender": "Male / ذكر" if i % 2 else "Female / أنثى",
+        "governorate": "Cairo",
+    }
+
+
+def clear_caches():
+    certs.choose_font.cache_clear()
+    certs.shape_arabic.cache_clear()
+    certs.certificate_template.cache_clear()
+    certs._footer_mask_over_qr.cache_clear()
+
+
+def bench(n, cold):
+    samples = []
+    for i in range(n):
+        if cold:
+            clear_caches()
+        t0 = time.perf_counter()
+        certs.create_birth_certificate_image(sample_child(i))
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), statistics.mean(samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-certificate render time, cold vs cached")
+    parser.add_argument("--n", type=int, default=50)
+    args = parser.parse_args()
+
+    cold = bench(args.n, cold=True)
+    clear_caches()
+    certs.create_birth_certificate_image(sample_child(0))  # تسخين القالب والخطوط
+    warm = bench(args.n, cold=False)
+    print(f"{'path':<34}{'p50':>10}{'mean':>10}")
+    print(f"{'cold (fonts + template + shaping)':<34}{cold[0]:>8.2f}ms{cold[1]:>8.2f}ms")
+    print(f"{'cached template/fonts/shaping':<34}{warm[0]:>8.2f}ms{warm[1]:>8.2f}ms")
+    print(f"speedup: {cold[0] / warm[0]:.1f}x")
+    print(f"shape_arabic cache: {certs.shape_arabic.cache_info()}")
@@ -0,0 +1,109 @@
+# =========================
+# ✍️ Benchmark — حفظ السجلات الطبية: COMMIT لكل حفظ (strict) مقابل group commit
+# كل thread = جلسة عيادة تحفظ كشفاً لطفل موجود وتنتظر الإقرار (رقم السجل بعد COMMIT)
+# python benchmarks/bench_group_commit.py --writers 1 8 32 --duration 5
+# python benchmarks/bench_group_commit.py --synchronous FULL      (fsync لكل COMMIT)
+# =========================
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import eohealth_db  # noqa: E402
+from eohealth_db import ConnectionPool, migrate, insert_child, insert_medical_record  # noqa: E402
+from eohealth_writer import GroupCommitWriter, GROUP_MAX_DELAY_S, GROUP_MAX_ROWS  # noqa: E402
+
+CHILDREN = 1000
+
+
+def prepare(db_path: Path) -> list:
+    pool = ConnectionPool(db_path)
+    migrate(pool)
+    with pool.transaction() as conn:
+        ids = [insert_child(conn, {"full_name": f"طفل {i}", "national_id": f"G{i:012d}", "smart_id": "",
+                                   "birth_date": "2024-01-01", "gender": "Male / ذكر", "mother_id": "M",
+                                   "father_id": "F", "governorate": "Cairo"}) for i in range(CHILDREN)]
+    pool.close()
+    return ids
+
+
+def session(writer, child_ids, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        data = {"record_date": "2025-06-01", "weight": round(rng.uniform(3, 30), 1),
+                "height": round(rng.uniform(50, 130), 1), "notes": "clinic visit"}
+        t0 = time.perf_counter()
+        try:
+            rec_id = writer.write(insert_medical_record, rng.choice(child_ids), data)
+        except Exception as e:   # database is locked بعد انتهاء busy_timeout
+            errors.append(type(e).__name__)
+            continue
+        if rec_id:
+            latencies.append(time.perf_counter() - t0)
+
+
+def run(db_path, child_ids, mode, writers, duration, max_rows, max_delay) -> dict:
+    pool = ConnectionPool(db_path)
+    writer = GroupCommitWriter(pool, mode, max_rows=max_rows, max_delay=max_delay).start()
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=session, args=(writer, child_ids, deadline, latencies, errors, i))
+               for i in range(writers)]
+    t0 = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    elapsed = time.perf_counter() - t0
+    writer.close()
+    stats = writer.stats()
+    pool.close()
+    s = sorted(latencies)
+    pick = lambda q: round(s[min(len(s) - 1, int(q * len(s)))] * 1000, 2) if s else 0.0
+    return {"mode": mode, "writers": writers, "inserts": len(s), "inserts_per_s": round(len(s) / elapsed, 1),
+            "p50_ms": pick(0.50), "p99_ms": pick(0.99), "commits": stats["groups"], "mean_group": stats["mean_group"],
+            "errors": len(errors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Medical record inserts/sec: strict per-write commit vs group commit")
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--modes", nargs="+", default=["strict", "group"])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--max-rows", type=int, default=GROUP_MAX_ROWS)
+    parser.add_argument("--max-delay-ms", type=float, default=GROUP_MAX_DELAY_S * 1000)
+    parser.add_argument("--synchronous", choices=["OFF", "NORMAL", "FULL"], default=eohealth_db.PRAGMAS["synchronous"])
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    eohealth_db.PRAGMAS["synchronous"] = args.synchronous
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "group_commit.db"
+        child_ids = prepare(db_path)
+        print(f"synchronous={args.synchronous} max_rows={args.max_rows} max_delay={args.max_delay_ms}ms")
+        print(f"{'mode':<8}{'writers':>8}{'inserts':>9}{'insert/s':>10}{'p50':>10}{'p99':>10}{'commits':>9}"
+              f"{'group':>7}{'errors':>8}  speedup")
+        for writers in args.writers:
+            baseline = None
+            for mode in args.modes:
+                r = run(db_path, child_ids, mode, writers, args.duration, args.max_rows, args.max_delay_ms / 1000)
+                baseline = baseline or r["inserts_per_s"]
+                r["speedup"] = round(r["inserts_per_s"] / baseline, 2) if baseline else 0.0
+                results.append(r)
+                print(f"{mode:<8}{writers:>8}{r['inserts']:>9}{r['inserts_per_s']:>10.0f}{r['p50_ms']:>8.2f}ms"
+                      f"{r['p99_ms']:>8.2f}ms{r['commits']:>9}{r['mean_group']:>7}{r['errors']:>8}  ×{r['speedup']}")
+    if args.json:
+        Path(args.json).write_text(json.dumps({"synchronous": args.synchronous, "runs": results}, indent=2))
+        print(f"saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# =========================
+# ⏱️ Benchmark — زمن البحث قبل وبعد فهارس الترحيل رقم 2
+# python benchmarks/bench_indexes.py --sizes 10000 100000 1000000
+# =========================
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from eohealth_db import ConnectionPool, migrate  # noqa: E402
+
+GOVERNORATES = ["Cairo", "Giza", "Alexandria", "Dakahliya", "Aswan", "Luxor", "Ismailia", "Suez", "Gharbia"]
+MEDICAL_PER_CHILD = 2
+LOOKUPS = 200
+
+
+def populate(pool, n):
+    """إدخال n طفل و 2n سجل طبي دفعة واحدة"""
+    rnd = random.Random(42)
+    with pool.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO children (id, full_name, national_id, smart_id, birth_date, gender, governorate, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, '')",
+            (
+                (i, f"child {i}", f"N{i:012d}", f"EOH-20250101-{i:06d}",
+                 f"{rnd.randint(2015, 2025)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+                 rnd.choice(["M", "F"]), rnd.choice(GOVERNORATES))
+                for i in range(1, n + 1)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO medical_files (child_id, record_date, weight, height, created_at) VALUES (?, '2025-01-01', 10, 80, '')",
+            ((rnd.randint(1, n),) for _ in range(n * MEDICAL_PER_CHILD)),
+        )
+
+
+def timed(pool, sql, params_list):
+    """الوسيط وp99 لزمن الاستعلام بالمللي ثانية"""
+    samples = []
+    with pool.connection() as conn:
+        for params in params_list:
+            t0 = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def run(n):
+    queries = {
+        "medical by child_id": ("SELECT * FROM medical_files WHERE child_id=? ORDER BY id DESC", lambda i: (i,)),
+        "child by smart_id": ("SELECT * FROM children WHERE smart_id=?", lambda i: (f"EOH-20250101-{i:06d}",)),
+        "child by national_id": ("SELECT * FROM children WHERE national_id=?", lambda i: (f"N{i:012d}",)),
+        "count by governorate+year": (
+            "SELECT COUNT(*) FROM children WHERE governorate=? AND birth_date BETWEEN ? AND ?",
+            lambda i: (GOVERNORATES[i % len(GOVERNORATES)], "2020-01-01", "2020-12-31"),
+        ),
+    }
+    rnd = random.Random(7)
+    ids = [rnd.randint(1, n) for _ in range(LOOKUPS)]
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(Path(tmp) / "bench.db")
+        migrate(pool, target=1)
+        populate(pool, n)
+        before = {name: timed(pool, sql, [make(i) for i in ids]) for name, (sql, make) in queries.items()}
+        t0 = time.perf_counter()
+        migrate(pool)
+        build_s = time.perf_counter() - t0
+        after = {name: timed(pool, sql, [make(i) for i in ids]) for name, (sql, make) in queries.items()}
+        pool.close()
+
+    print(f"\n## {n:,} children / {n * MEDICAL_PER_CHILD:,} medical records (index build {build_s:.2f}s)")
+    print(f"{'query':<28}{'before p50':>12}{'before p99':>12}{'after p50':>12}{'after p99':>12}{'speedup':>10}")
+    for name in queries:
+        b50, b99 = before[name]
+        a50, a99 = after[name]
+        print(f"{name:<28}{b50:>10.3f}ms{b99:>10.3f}ms{a50:>10.3f}ms{a99:>10.3f}ms{b50 / max(a50, 1e-6):>9.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lookup latency before/after schema indexes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size)
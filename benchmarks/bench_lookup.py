@@ -0,0 +1,85 @@
+# =========================
+# ⏱️ Benchmark — زمن البحث بالكارت الذكي تحت الحمل (p50 / p99)
+# python benchmarks/bench_lookup.py --children 100000 --threads 8 --scans 20000
+# =========================
+
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from eohealth_db import ConnectionPool, migrate  # noqa: E402
+from eohealth_lookup import ChildLookup  # noqa: E402
+from eohealth_qr import card_payload  # noqa: E402
+from bench_indexes import populate  # noqa: E402
+
+
+def codes_for(n, scans, hot_fraction, seed):
+    """خليط واقعي: نسبة من المسحات لأطفال تم مسحهم مؤخراً (نفس الطابور في العيادة)"""
+    rnd = random.Random(seed)
+    hot = [rnd.randint(1, n) for _ in range(max(1, n // 100))]
+    out = []
+    for _ in range(scans):
+        i = rnd.choice(hot) if rnd.random() < hot_fraction else rnd.randint(1, n)
+        kind = rnd.random()
+        if kind < 0.7:
+            out.append(card_payload(f"EOH-20250101-{i:06d}", f"N{i:012d}"))   # QR
+        elif kind < 0.9:
+            out.append(f"N{i:012d}")                                          # رقم قومي مكتوب
+        else:
+            out.append(f"EOH-20250101-{i:06d}")                               # هوية ذكية مكتوبة
+    return out
+
+
+def run(lookup, codes, threads):
+    per_thread = [codes[i::threads] for i in range(threads)]
+    misses = []
+
+    def worker(batch):
+        for code in batch:
+            if lookup.lookup(code) is None:
+                misses.append(code)
+
+    t0 = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(b,)) for b in per_thread]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - t0
+    return elapsed, len(misses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan-to-record lookup latency under concurrent load")
+    parser.add_argument("--children", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--scans", type=int, default=20_000)
+    parser.add_argument("--hot", type=float, default=0.5, help="fraction of repeat scans")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(Path(tmp) / "bench.db", size=args.threads)
+        migrate(pool)
+        populate(pool, args.children)
+        codes = codes_for(args.children, args.scans, args.hot, seed=1)
+
+        print(f"{args.children:,} children, {args.scans:,} scans, {args.threads} threads, {args.hot:.0%} repeat scans")
+        print(f"{'mode':<14}{'scans/s':>10}{'p50':>10}{'p99':>10}{'hit rate':>10}")
+        for mode, cache_size in (("no cache", 0), ("hot cache", 2048)):
+            lookup = ChildLookup(pool, cache_size=cache_size, ttl=60)
+            elapsed, missing = run(lookup, codes, args.threads)
+            lat = lookup.latency_stats()
+            print(f"{mode:<14}{args.scans / elapsed:>10,.0f}{lat['p50_ms']:>8.3f}ms{lat['p99_ms']:>8.3f}ms"
+                  f"{lookup.cache.stats()['hit_rate']:>10.1%}")
+            assert missing == 0, f"{missing} scans did not resolve"
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# =========================
+# ⏱️ Benchmark — رموز QR: بدون كاش / مع الكاش / صفحات الطباعة بالجملة
+# python benchmarks/bench_qr.py --n 500 --sheets 2000 --workers 4
+# =========================
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import eohealth_qr as qr  # noqa: E402
+from eohealth_certificates import render_qr_sheets  # noqa: E402
+
+
+def payloads(n):
+    return [qr.card_payload(f"EOH-20250101-{i:06d}", f"T{10000000 + i}") for i in range(n)]
+
+
+def per_call_ms(fn, items, clear=None):
+    samples = []
+    for p in items:
+        if clear:
+            clear()
+        t0 = time.perf_counter()
+        fn(p)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), statistics.mean(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QR generation: uncached, cached and batch sheets")
+    parser.add_argument("--n", type=int, default=500)
+    parser.add_argument("--sheets", type=int, default=2000, help="cards for the batch sheet run")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    items = payloads(args.n)
+
+    rows = []
+    for name, fn in (("png", qr.qr_png_bytes), ("pil image", qr.qr_image), ("svg", qr.qr_svg)):
+        rows.append((f"{name} uncached", *per_call_ms(fn, items, clear=fn.cache_clear)))
+        for p in items:      # تسخين
+            fn(p)
+        rows.append((f"{name} cached", *per_call_ms(fn, items)))
+
+    print(f"{'path':<26}{'p50':>10}{'mean':>10}")
+    for name, p50, mean in rows:
+        print(f"{name:<26}{p50:>8.3f}ms{mean:>8.3f}ms")
+
+    cards = ({"smart_id": f"EOH-20250101-{i:06d}", "national_id": f"T{10000000 + i}"} for i in range(args.sheets))
+    with tempfile.TemporaryDirectory() as tmp:
+        result = render_qr_sheets(cards, Path(tmp) / "sheets.pdf", workers=args.workers, total=args.sheets)
+    print(f"\nbatch sheets: {result['cards']:,} cards / {result['pages']} pages in {result['seconds']}s "
+          f"— {result['cards_per_sec']} cards/sec, {result['bytes'] / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# =========================
+# 🗺️ Benchmark — سرعة الكتابة: ملف واحد مقابل ملف لكل محافظة / hash bucket
+# كل thread = مكتب صحة في محافظة يسجل طفلاً + كشفه الأول في معاملة واحدة
+# python benchmarks/bench_shards.py --writers 8 --duration 5 --layouts single 4 8 governorate
+# python benchmarks/bench_shards.py --synchronous FULL      (fsync لكل commit كما على قرص حقيقي بدون WAL cache)
+# =========================
+
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import eohealth_db  # noqa: E402
+from eohealth_db import ConnectionPool, insert_child, insert_medical_record  # noqa: E402
+from eohealth_shards import GOVERNORATE_CODES, ShardedRegistry  # noqa: E402
+
+GOVERNORATES = list(GOVERNORATE_CODES)
+
+
+def open_registry(layout, base: Path) -> ShardedRegistry:
+    # نفس أحجام المجمّعات في التطبيق (POOL_SIZE للملف الواحد، SHARD_POOL_SIZE لكل ملف مقسم)
+    base.mkdir(parents=True, exist_ok=True)
+    if layout == "single":
+        registry = ShardedRegistry.single(ConnectionPool(base / "single.db"))
+    else:
+        registry = ShardedRegistry.open(base / f"shards_{layout}", int(layout) if layout.isdigit() else layout)
+    registry.migrate()
+    return registry
+
+
+def office(registry, governorate, deadline, latencies, errors, seq):
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        rec = {"full_name": f"طفل {governorate} {n}", "national_id": f"B{seq:03d}{n:09d}", "smart_id": "",
+               "birth_date": "2025-06-01", "gender": "Female / أنثى" if n % 2 else "Male / ذكر",
+               "mother_id": f"M{seq}-{n}", "father_id": f"F{seq}-{n}", "governorate": governorate}
+        t0 = time.perf_counter()
+        try:
+            with registry.pool_for_governorate(governorate).transaction() as conn:
+                child_id = insert_child(conn, rec)
+                insert_medical_record(conn, child_id, {"record_date": "2025-06-01", "weight": 3.4, "height": 50.0,
+                                                       "notes": "birth visit"})
+        except Exception as e:   # database is locked بعد انتهاء busy_timeout
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - t0)
+
+
+def run(layout, writers, duration, base: Path) -> dict:
+    registry = open_registry(layout, base)
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=office, args=(registry, GOVERNORATES[i % len(GOVERNORATES)], deadline,
+                                                     latencies, errors, i))
+               for i in range(writers)]
+    t0 = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    elapsed = time.perf_counter() - t0
+    files = len(registry.pools)
+    registry.close()
+    s = sorted(latencies)
+    pick = lambda q: round(s[min(len(s) - 1, int(q * len(s)))] * 1000, 2) if s else 0.0
+    return {"layout": layout, "files": files, "writers": writers, "commits": len(s),
+            "commits_per_s": round(len(s) / elapsed, 1), "p50_ms": pick(0.50), "p99_ms": pick(0.99),
+            "errors": len(errors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write throughput: single SQLite file vs sharded storage")
+    parser.add_argument("--layouts", nargs="+", default=["single", "4", "8", "governorate"])
+    parser.add_argument("--writers", type=int, nargs="+", default=[8])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--synchronous", choices=["OFF", "NORMAL", "FULL"], default=eohealth_db.PRAGMAS["synchronous"])
+    parser.add_argument("--dir", help="keep the databases here instead of a temporary directory")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    eohealth_db.PRAGMAS["synchronous"] = args.synchronous
+    tmp = None if args.dir else tempfile.TemporaryDirectory()
+    base = Path(args.dir or tmp.name)
+    results = []
+    print(f"synchronous={args.synchronous}")
+    print(f"{'layout':<13}{'files':>6}{'writers':>8}{'commits':>9}{'commit/s':>10}{'p50':>10}{'p99':>10}{'errors':>8}  speedup")
+    try:
+        for writers in args.writers:
+            baseline = None
+            for layout in args.layouts:
+                r = run(layout, writers, args.duration, base / f"w{writers}")
+                baseline = baseline or r["commits_per_s"]
+                r["speedup"] = round(r["commits_per_s"] / baseline, 2) if baseline else 0.0
+                results.append(r)
+                print(f"{layout:<13}{r['files']:>6}{writers:>8}{r['commits']:>9}{r['commits_per_s']:>10.0f}"
+                      f"{r['p50_ms']:>8.2f}ms{r['p99_ms']:>8.2f}ms{r['errors']:>8}  ×{r['speedup']}")
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+    if args.json:
+        Path(args.json).write_text(json.dumps({"synchronous": args.synchronous, "runs": results}, indent=2))
+        print(f"saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# =========================
+# ⏱️ Benchmark — زمن بدء التطبيق و overhead كل rerun لكل صفحة (بدون متصفح)
+# python benchmarks/bench_startup.py --children 10000 --reruns 20 [--json startup.json]
+# =========================
+
+import time
+
+_t0 = time.perf_counter()
+import streamlit as st  # noqa: E402  — أول import في العملية: زمن التحميل البارد
+
+IMPORT_STREAMLIT_S = time.perf_counter() - _t0
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import os  # noqa: E402
+import runpy  # noqa: E402
+import statistics  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+import threading  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+from streamlit.runtime.memory_uploaded_file_manager import MemoryUploadedFileManager  # noqa: E402
+from streamlit.runtime.scriptrunner.script_run_context import ScriptRunContext, add_script_run_ctx  # noqa: E402
+from streamlit.runtime.state import SafeSessionState, SessionState  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from eohealth_db import ConnectionPool, migrate  # noqa: E402
+from bench_indexes import populate  # noqa: E402
+
+APP = ROOT / "eohealth_app_main.py"
+PAGES = ["Home", "Vaccination Tracker", "Health Record", "AI Insights", "Eco Dashboard", "Digital Card", "Admin"]
+
+
+def attach_session() -> ScriptRunContext:
+    """جلسة Streamlit حقيقية على الـ thread الحالي (بدونها لا يعمل st.cache_resource ولا session_state)"""
+    ctx = ScriptRunContext(
+        session_id="bench", _enqueue=lambda msg: None, query_string="",
+        session_state=SafeSessionState(SessionState()), uploaded_file_mgr=MemoryUploadedFileManager("/upload"),
+        page_script_hash="", user_info={"email": "bench@localhost"},
+    )
+    add_script_run_ctx(threading.current_thread(), ctx)
+    return ctx
+
+
+def run_script(ctx: ScriptRunContext, page: str) -> float:
+    """تشغيل السكربت مرة واحدة (= rerun) على صفحة معينة — يرجع الزمن بالثواني"""
+    ctx.reset()
+    st.sidebar.radio = lambda *a, **k: page
+    t0 = time.perf_counter()
+    runpy.run_path(str(APP), run_name="__main__")
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start and per-rerun overhead of the Streamlit script")
+    parser.add_argument("--children", type=int, default=10_000)
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--pages", nargs="*", default=PAGES)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    json_path = Path(args.json).resolve() if args.json else None
+
+    ctx = attach_session()
+    # تحذير "No runtime found" يتكرر مع كل تشغيل بدون خادم (Streamlit يعيد ضبط المستوى، فنستخدم فلتر)
+    logging.getLogger("streamlit.runtime.caching.cache_data_api").addFilter(lambda r: r.levelno >= logging.ERROR)
+
+    results = {"import_streamlit_ms": round(IMPORT_STREAMLIT_S * 1000, 1), "children": args.children, "pages": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)                       # التطبيق يستخدم eohealth.db و uploads/ نسبةً للمجلد الحالي
+        pool = ConnectionPool("eohealth.db")
+        migrate(pool)
+        populate(pool, args.children)
+        pool.close()
+
+        before = set(sys.modules)
+        results["first_run_ms"] = round(run_script(ctx, "Home") * 1000, 1)   # init_db + الموارد + الصفحة الرئيسية
+        results["first_run_new_modules"] = len(set(sys.modules) - before)
+
+        print(f"import streamlit: {results['import_streamlit_ms']:.0f}ms — first run: {results['first_run_ms']:.0f}ms "
+              f"({results['first_run_new_modules']} modules loaded)")
+        print(f"{'page':<22}{'first visit':>12}{'modules':>9}{'rerun p50':>12}{'rerun p95':>12}")
+        for page in args.pages:
+            before = set(sys.modules)
+            first = run_script(ctx, page)
+            loaded = len(set(sys.modules) - before)
+            samples = sorted(run_script(ctx, page) for _ in range(args.reruns))
+            p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+            results["pages"][page] = {
+                "first_visit_ms": round(first * 1000, 1), "modules_loaded": loaded,
+                "rerun_p50_ms": round(statistics.median(samples) * 1000, 1), "rerun_p95_ms": round(p95 * 1000, 1),
+            }
+            r = results["pages"][page]
+            print(f"{page:<22}{r['first_visit_ms']:>10.1f}ms{loaded:>9}{r['rerun_p50_ms']:>10.1f}ms{r['rerun_p95_ms']:>10.1f}ms")
+
+        os.chdir(ROOT)
+
+    if json_path:
+        json_path.write_text(json.dumps(results, indent=2))
+        print(f"saved {json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+# =========================
+# ⏱️ Benchmark suite — طبقة البيانات والصفحات على بيانات تجريبية (1k / 100k / 1M) بدون متصفح
+# python benchmarks/bench_suite.py --sizes 1000 100000 1000000 --json results.json [--compare old.json]
+# النتائج بصيغة JSON قريبة من pytest-benchmark حتى تُقارن التشغيلات عبر الزمن
+# =========================
+
+import argparse
+import json
+import math
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import cycle
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from eohealth_cache import LRUCache  # noqa: E402
+from eohealth_db import ConnectionPool, migrate, count_children, fetch_children_page, fetch_medical_records  # noqa: E402
+from eohealth_synthetic import REFERENCE_DATE, populate, write_import_file  # noqa: E402
+
+CASES = []  # [(name, heavy, fn(bench) -> (callable, extra_info))]
+FONT = Path("Amiri-Regular.ttf")   # الشهادات تقرأ الخط من مجلد التشغيل كما في التطبيق
+
+
+class SkipCase(Exception):
+    """الحالة لا يمكن قياسها في هذه البيئة (يُطبع السبب بدلاً من النتيجة)"""
+
+
+def case(name: str, heavy=False):
+    """تسجيل حالة قياس — heavy = تعمل مرات أقل (استيراد/تصدير/توليد شهادات)"""
+    def register(fn):
+        CASES.append((name, heavy, fn))
+        return fn
+    return register
+
+
+def summarize(samples: list) -> dict:
+    """نفس حقول stats في pytest-benchmark (بالثواني)"""
+    s = sorted(samples)
+    q1, q3 = (statistics.quantiles(s, n=4)[i] for i in (0, 2)) if len(s) > 1 else (s[0], s[0])
+    mean = statistics.fmean(s)
+    return {
+        "min": s[0], "max": s[-1], "mean": mean, "stddev": statistics.stdev(s) if len(s) > 1 else 0.0,
+        "median": statistics.median(s), "q1": q1, "q3": q3, "iqr": q3 - q1,
+        "rounds": len(s), "total": sum(s), "ops": 1 / mean if mean > 0 else math.inf,
+    }
+
+
+class Bench:
+    """قاعدة بيانات واحدة مولدة لكل حجم + مجلد مؤقت للملفات"""
+
+    def __init__(self, n: int, records_per_child: int, tmp: Path, cert_limit: int):
+        self.n = n
+        self.tmp = tmp
+        self.cert_limit = cert_limit
+        self.pool = ConnectionPool(tmp / "bench.db")
+        migrate(self.pool)
+        self.populated = populate(self.pool, n, records_per_child)
+        ids = [1 + (i * 7919) % n for i in range(1000)]   # أطفال متفرقين (نفس القائمة في كل تشغيل)
+        self.child_ids = cycle(ids)
+
+    def close(self):
+        self.pool.close()
+
+
+@case("children_page")
+def _children_page(b):
+    # fetch_children_df القديمة (قراءة الجدول كاملاً) استُبدلت بعدد + صفحة واحدة بالـ keyset
+    def run():
+        with b.pool.connection() as conn:
+            count_children(conn)
+            fetch_children_page(conn, page_size=50)
+    return run, {}
+
+
+@case("children_page_deep_filtered")
+def _children_page_deep(b):
+    def run():
+        with b.pool.connection() as conn:
+            count_children(conn, governorate="Cairo")
+            fetch_children_page(conn, before_id=b.n // 2, page_size=50, governorate="Cairo")
+    return run, {}
+
+
+@case("fetch_medical_df")
+def _fetch_medical(b):
+    def run():
+        with b.pool.connection() as conn:
+            fetch_medical_records(conn, next(b.child_ids))
+    return run, {}
+
+
+@case("fetch_medical_df_cached")
+def _fetch_medical_cached(b):
+    cache = LRUCache(512)
+    child_id = next(b.child_ids)
+
+    def load():
+        with b.pool.connection() as conn:
+            return fetch_medical_records(conn, child_id)
+    cache.get_or_load(("medical", child_id), load)
+    return (lambda: cache.get_or_load(("medical", child_id), load)), {}
+
+
+@case("insights_rules", heavy=True)
+def _insights(b):
+    from eohealth_insights import load_insights_frame, evaluate_rules
+
+    extra = {}
+
+    def run():
+        with b.pool.connection() as conn:
+            frame = load_insights_frame(conn, today=REFERENCE_DATE)
+        extra["alerts"] = len(evaluate_rules(frame))
+    return run, extra
+
+
+def _snapshot(b):
+    try:
+        import eohealth_snapshots
+    except ImportError:
+        raise SkipCase("pyarrow not installed")
+    out = b.tmp / "snapshots"
+    if not eohealth_snapshots.has_snapshot(out):
+        eohealth_snapshots.refresh_snapshots({0: b.pool}, out)
+    return eohealth_snapshots, out
+
+
+@case("insights_snapshot", heavy=True)
+def _insights_snapshot(b):
+    # نفس الحالة insights_rules لكن من لقطة Parquet (5 أعمدة للسجلات بدل SELECT من SQLite)
+    from eohealth_insights import evaluate_rules
+
+    snapshots, out = _snapshot(b)
+    extra = {}
+
+    def run():
+        frame = snapshots.load_insights_frame(out, today=REFERENCE_DATE)
+        extra["alerts"] = len(evaluate_rules(frame))
+    return run, extra
+
+
+@case("insights_snapshot_governorate")
+def _insights_snapshot_governorate(b):
+    snapshots, out = _snapshot(b)
+    return (lambda: snapshots.load_insights_frame(out, today=REFERENCE_DATE, governorate="Cairo")), {}
+
+
+@case("snapshot_refresh_full", heavy=True)
+def _snapshot_refresh(b):
+    snapshots, out = _snapshot(b)
+    extra = {}
+
+    def run():
+        extra.update(snapshots.refresh_snapshots({0: b.pool}, out, full=True))
+    return run, extra
+
+
+def _export(fmt):
+    def factory(b):
+        from eohealth_io import export_children
+
+        extra = {}
+
+        def run():
+            result = export_children(b.pool, fmt=fmt, out_dir=b.tmp / "exports")
+            result["path"].unlink()
+            extra.update(rows=result["rows"], bytes=result["bytes"])
+        return run, extra
+    return factory
+
+
+def _import(fmt):
+    def factory(b):
+        from eohealth_io import import_children
+
+        source = b.tmp / f"import.{fmt}"
+        if not source.exists():
+            write_import_file(source, b.n, fmt)
+        extra = {}
+        rounds = iter(range(1_000_000))
+
+        def run():
+            # قاعدة جديدة لكل جولة: الاستيراد يرفض الأرقام القومية المسجلة مسبقاً
+            pool = ConnectionPool(b.tmp / f"import_{next(rounds)}.db")
+            migrate(pool)
+            with open(source, "rb") as fh:
+                result = import_children(pool, fh, source.name)
+            pool.close()
+            extra.update(rows=result["inserted"], rows_per_sec=result["rows_per_sec"])
+        return run, extra
+    return factory
+
+
+for _fmt in ("csv", "xlsx"):
+    case(f"export_{_fmt}", heavy=True)(_export(_fmt))
+    case(f"import_{_fmt}", heavy=True)(_import(_fmt))
+
+
+def _require_font():
+    if not FONT.exists():
+        raise SkipCase(f"{FONT} not found in {Path.cwd()}")
+
+
+def _sample_children(b, limit):
+    with b.pool.connection() as conn:
+        cur = conn.execute("SELECT * FROM children ORDER BY id LIMIT ?", (limit,))
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, row)) for row in cur.fetchall()]
+
+
+@case("certificate_render")
+def _certificate(b):
+    _require_font()
+    import eohealth_certificates as certs
+
+    children = cycle(_sample_children(b, 100))
+    certs.create_birth_certificate_image(next(children))   # تسخين القالب والخطوط
+    return (lambda: certs.create_birth_certificate_image(next(children))), {}
+
+
+@case("certificate_batch_pdf", heavy=True)
+def _certificate_batch(b):
+    _require_font()
+    from eohealth_certificates import render_certificates_batch
+
+    children = _sample_children(b, b.cert_limit)
+    extra = {"pages": len(children)}
+
+    def run():
+        result = render_certificates_batch(children, b.tmp / "batch.pdf", total=len(children))
+        extra["pages_per_sec"] = result["pages_per_sec"]
+    return run, extra
+
+
+def measure(fn, rounds: int, warmup: int) -> list:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def machine_info() -> dict:
+    return {
+        "python_version": platform.python_version(), "platform": platform.platform(),
+        "cpu_count": os.cpu_count(), "sqlite_version": sqlite3.sqlite_version,
+    }
+
+
+def commit_info() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"id": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def compare(results: dict, baseline_path: Path, threshold: float):
+    """مقارنة الوسيط مع تشغيل سابق — تغيير أكبر من threshold يُعلَّم كتراجع"""
+    old = {b["fullname"]: b["stats"]["median"] for b in json.loads(baseline_path.read_text())["benchmarks"]}
+    print(f"\n## compared with {baseline_path.name} (median)")
+    regressions = 0
+    for b in results["benchmarks"]:
+        before = old.get(b["fullname"])
+        if not before:
+            continue
+        change = b["stats"]["median"] / before - 1
+        flag = "REGRESSION" if change > threshold else ("faster" if change < -threshold else "")
+        regressions += flag == "REGRESSION"
+        print(f"{b['fullname']:<44}{before * 1000:>12.2f}ms{b['stats']['median'] * 1000:>12.2f}ms{change:>+9.1%}  {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmark suite over synthetic registries")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--records-per-child", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--heavy-rounds", type=int, default=3)
+    parser.add_argument("--cert-limit", type=int, default=100, help="certificates per batch case")
+    parser.add_argument("--only", nargs="*", help="case names to run (default: all)")
+    parser.add_argument("--skip", nargs="*", default=[], help="case names to skip")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="previous --json output to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown reported as regression")
+    args = parser.parse_args()
+
+    results = {"machine_info": machine_info(), "commit_info": commit_info(),
+               "datetime": datetime.utcnow().isoformat(), "benchmarks": []}
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            b = Bench(n, args.records_per_child, Path(tmp), args.cert_limit)
+            group = f"{n} children"
+            print(f"\n## {n:,} children / {b.populated['medical_records']:,} records "
+                  f"(generated in {b.populated['seconds']}s, {b.populated['rows_per_sec']:,.0f} rows/s)")
+            print(f"{'case':<30}{'rounds':>7}{'min':>11}{'median':>11}{'mean':>11}{'max':>11}")
+            results["benchmarks"].append({
+                "group": group, "name": "generate", "fullname": f"{group}::generate", "params": {"children": n},
+                "stats": summarize([b.populated["seconds"]]), "extra_info": b.populated,
+            })
+            for name, heavy, factory in CASES:
+                if (args.only and name not in args.only) or name in args.skip:
+                    continue
+                try:
+                    fn, extra = factory(b)
+                except SkipCase as e:
+                    print(f"{name:<30}skipped: {e}")
+                    continue
+                rounds = args.heavy_rounds if heavy else args.rounds
+                stats = summarize(measure(fn, rounds, warmup=0 if heavy else 1))
+                results["benchmarks"].append({
+                    "group": group, "name": name, "fullname": f"{group}::{name}", "params": {"children": n},
+                    "stats": stats, "extra_info": dict(extra),
+                })
+                ms = {k: stats[k] * 1000 for k in ("min", "median", "mean", "max")}
+                print(f"{name:<30}{stats['rounds']:>7}{ms['min']:>9.2f}ms{ms['median']:>9.2f}ms"
+                      f"{ms['mean']:>9.2f}ms{ms['max']:>9.2f}ms")
+            b.close()
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, ensure_ascii=False, default=str))
+        print(f"\nsaved {args.json}")
+    if args.compare and compare(results, Path(args.compare), args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# =========================
+# ⏱️ Benchmark — بناء قائمة التطعيمات المستحقة + استعلام "المتأخرين هذا الأسبوع"
+# python benchmarks/bench_vaccines.py --children 1000000
+# =========================
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from eohealth_db import ConnectionPool, migrate  # noqa: E402
+from eohealth_vaccines import SCHEDULE, refresh_due_list, due_list, week_window  # noqa: E402
+from bench_indexes import populate, GOVERNORATES  # noqa: E402
+
+TODAY = "2025-06-01"
+
+
+def record_history(pool, n, coverage, seed=7):
+    """جرعات مُعطاة لنسبة من الأطفال (حتى لا تكون القائمة كلها متأخرة)"""
+    rnd = random.Random(seed)
+    with pool.transaction() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO vaccination_events (child_id, vaccine_code, given_on, source) VALUES (?, ?, ?, 'bench')",
+            ((rnd.randint(1, n), rnd.choice(SCHEDULE).code, TODAY) for _ in range(int(n * coverage))),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vaccination due-list refresh and window query")
+    parser.add_argument("--children", type=int, default=1_000_000)
+    parser.add_argument("--coverage", type=float, default=5.0, help="recorded doses per child")
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(Path(tmp) / "bench.db")
+        migrate(pool)
+        populate(pool, args.children)
+        record_history(pool, args.children, args.coverage)
+
+        stats = refresh_due_list(pool, today=TODAY)
+        print(f"{args.children:,} children — refresh: {stats['children']:,} in follow-up age, "
+              f"{stats['pending_doses']:,} pending doses in {stats['seconds']}s")
+
+        start, end = week_window(TODAY)
+        print(f"{'query':<34}{'rows':>8}{'p50':>10}{'max':>10}")
+        for label, gov in (("overdue this week (all)", None), ("overdue this week (governorate)", GOVERNORATES[0])):
+            samples, rows = [], 0
+            with pool.connection() as conn:
+                for _ in range(args.queries):
+                    t0 = time.perf_counter()
+                    rows = len(due_list(conn, "overdue", gov, start, end, today=TODAY, limit=100_000))
+                    samples.append((time.perf_counter() - t0) * 1000)
+            print(f"{label:<34}{rows:>8,}{statistics.median(samples):>8.1f}ms{max(samples):>8.1f}ms")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
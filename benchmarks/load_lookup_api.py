@@ -0,0 +1,207 @@
+# =========================
+# 🛰️ Load test — خدمة البحث (eohealth_api.py): عدد الطلبات/ثانية وزمن الذيل p95/p99
+# python benchmarks/load_lookup_api.py --url http://127.0.0.1:8502 --db eohealth.db --concurrency 64 --duration 10
+# python benchmarks/load_lookup_api.py --spawn --children 100000   (خادم على قاعدة تجريبية مؤقتة)
+# =========================
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+NOT_FOUND_SHARE = 0.05   # نسبة أكواد غير موجودة (كروت تالفة / أطفال من مكتب آخر)
+
+
+def sample_codes(db_path, n: int, seed: int) -> list:
+    """أكواد مسح واقعية: smart_id|national_id، smart_id وحده، أو الرقم القومي وحده"""
+    conn = sqlite3.connect(db_path)
+    total = conn.execute("SELECT MAX(id) FROM children").fetchone()[0] or 0
+    rng = random.Random(seed)
+    ids = sorted({rng.randint(1, total) for _ in range(n)}) if total else []
+    rows = []
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        rows += conn.execute(f"SELECT id, smart_id, national_id FROM children WHERE id IN ({','.join('?' * len(chunk))})",
+                             chunk).fetchall()
+    conn.close()
+    codes = []
+    for child_id, smart_id, national_id in rows:
+        form = rng.random()
+        code = f"{smart_id}|{national_id}" if form < 0.6 else (smart_id if form < 0.8 else national_id)
+        codes.append((child_id, code))
+    codes += [(None, f"EGY-{rng.randrange(10**8):08d}") for _ in range(int(len(codes) * NOT_FOUND_SHARE))]
+    rng.shuffle(codes)
+    return codes
+
+
+class Client:
+    """اتصال HTTP/1.1 keep-alive واحد (مثل جهاز مسح واحد في عيادة)"""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(payload)}\r\n"
+        if payload:
+            head += "Content-Type: application/json\r\n"
+        self.writer.write(head.encode() + b"\r\n" + payload)
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("server closed the connection")
+        status = int(status_line.split()[1])
+        length, close = 0, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                close = True
+        data = await self.reader.readexactly(length) if length else b""
+        if close:
+            self.close()
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def worker(client, codes, deadline, write_share, rng, latencies, statuses):
+    while time.perf_counter() < deadline:
+        child_id, code = rng.choice(codes)
+        if child_id is not None and rng.random() < write_share:
+            method, path = "POST", f"/children/{child_id}/medical"
+            body = {"record_date": time.strftime("%Y-%m-%d"), "weight": round(rng.uniform(3, 30), 1),
+                    "height": round(rng.uniform(50, 130), 1), "notes": "load test"}
+        else:
+            method, path, body = "GET", f"/lookup?code={quote(code)}", None
+        t0 = time.perf_counter()
+        try:
+            status, _ = await client.request(method, path, body)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError) as e:
+            client.close()
+            status = type(e).__name__
+        latencies.append(time.perf_counter() - t0)
+        statuses[f"{method} {status}"] += 1
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))] if sorted_values else 0.0
+
+
+async def run_load(url, codes, concurrency, duration, write_share, seed):
+    parts = urlsplit(url)
+    clients = [Client(parts.hostname, parts.port or 80) for _ in range(concurrency)]
+    latencies, statuses = [], Counter()
+    # تسخين قصير: فتح الاتصالات وملء كاش الخادم جزئياً
+    await asyncio.gather(*(c.request("GET", "/health") for c in clients))
+    t0 = time.perf_counter()
+    deadline = t0 + duration
+    await asyncio.gather(*(worker(c, codes, deadline, write_share, random.Random(seed + i), latencies, statuses)
+                           for i, c in enumerate(clients)))
+    elapsed = time.perf_counter() - t0
+    health = json.loads((await clients[0].request("GET", "/health"))[1])
+    for c in clients:
+        c.close()
+    s = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3)
+    return {
+        "url": url, "concurrency": concurrency, "duration_s": round(elapsed, 2), "write_share": write_share,
+        "requests": len(s), "throughput_rps": round(len(s) / elapsed, 1),
+        "latency_ms": {"p50": ms(percentile(s, 0.50)), "p95": ms(percentile(s, 0.95)),
+                       "p99": ms(percentile(s, 0.99)), "max": ms(s[-1] if s else 0.0)},
+        "statuses": dict(statuses), "server": health,
+    }
+
+
+def spawn_server(tmp: Path, children: int, port: int):
+    """قاعدة تجريبية مؤقتة + تشغيل eohealth_api.py كعملية منفصلة"""
+    from eohealth_db import ConnectionPool, migrate
+    from eohealth_synthetic import populate
+
+    db = tmp / "load.db"
+    pool = ConnectionPool(db)
+    migrate(pool)
+    info = populate(pool, children)
+    pool.close()
+    print(f"generated {children:,} children in {info['seconds']}s")
+    proc = subprocess.Popen([sys.executable, str(ROOT / "eohealth_api.py"), "--db", str(db), "--port", str(port)],
+                            cwd=tmp, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return db, proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError(proc.stderr.read().decode())
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("lookup API did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the EoHealth lookup API")
+    parser.add_argument("--url", default="http://127.0.0.1:8502")
+    parser.add_argument("--db", default="eohealth.db", help="database to sample scan codes from")
+    parser.add_argument("--spawn", action="store_true", help="start the API on a temporary synthetic database")
+    parser.add_argument("--children", type=int, default=100_000, help="synthetic registry size with --spawn")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--codes", type=int, default=5_000, help="distinct children sampled")
+    parser.add_argument("--write-share", type=float, default=0.0, help="share of requests adding a medical record")
+    parser.add_argument("--seed", type=int, default=2025)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    proc = tmp = None
+    url, db = args.url, args.db
+    if args.spawn:
+        tmp = tempfile.TemporaryDirectory()
+        port = urlsplit(url).port or 8502
+        db, proc = spawn_server(Path(tmp.name), args.children, port)
+        url = f"http://127.0.0.1:{port}"
+    try:
+        codes = sample_codes(db, args.codes, args.seed)
+        if not codes:
+            sys.exit(f"no children in {db}")
+        results = []
+        print(f"{'conc':>5}{'requests':>10}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  statuses")
+        for conc in args.concurrency:
+            r = asyncio.run(run_load(url, codes, conc, args.duration, args.write_share, args.seed))
+            results.append(r)
+            lat = r["latency_ms"]
+            print(f"{conc:>5}{r['requests']:>10}{r['throughput_rps']:>10.0f}{lat['p50']:>8.2f}ms{lat['p95']:>8.2f}ms"
+                  f"{lat['p99']:>8.2f}ms{lat['max']:>8.2f}ms  {r['statuses']}  mean batch {r['server']['mean_batch']}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+            tmp.cleanup()
+    if args.json:
+        Path(args.json).write_text(json.dumps({"runs": results}, indent=2, ensure_ascii=False))
+        print(f"saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
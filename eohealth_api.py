@@ -0,0 +1,370 @@
+# =========================
+# 🛰️ EoHealth Egypt — خدمة HTTP خفيفة لأجهزة مسح الكروت (asyncio)
+# نفس طبقة البيانات (ConnectionPool + ChildLookup + كاش الشهادات) بدون rerun لسكربت Streamlit
+# python eohealth_api.py --db eohealth.db --port 8502
+# python eohealth_api.py --shards governorate          (ملف لكل محافظة في shards/)
+# =========================
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import tornado.web  # متاح مع Streamlit (خادمه مبني عليه) — يعمل فوق asyncio
+
+from eohealth_db import ConnectionPool, fetch_child, insert_medical_record, POOL_SIZE
+from eohealth_lookup import ChildLookup
+from eohealth_metrics import METRICS
+from eohealth_shards import ShardedRegistry, SHARDS_DIR, SHARD_POOL_SIZE
+from eohealth_writer import WRITE_MODES
+
+DB_PATH = "eohealth.db"
+CERT_CACHE_DIR = Path("cache") / "certificates"   # نفس مجلد كاش الشهادات في التطبيق
+BATCH_MAX = 64                  # أقصى عدد أكواد في استعلام IN واحد من طلبات متزامنة
+GROWTH_REFRESH_DELAY_S = 1.0    # تحديث مؤشرات النمو مرة واحدة لكل مجموعة سجلات جديدة
+MAX_BATCH_CODES = 500
+MEDICAL_FIELDS = ("record_date", "weight", "height", "bmi", "vaccinations", "diagnoses", "medications", "notes")
+
+log = logging.getLogger("eohealth.api")
+
+
+class LookupBatcher:
+    """يجمع طلبات البحث المتزامنة في استعلام واحد: تُرسل فوراً (الدورة التالية للحلقة) طالما يوجد
+    thread فاضي، وأثناء انشغال كل الـ threads تتراكم الطلبات وتخرج دفعة واحدة عند أول thread يتحرر"""
+
+    def __init__(self, lookup: ChildLookup, executor, max_in_flight=POOL_SIZE, max_batch=BATCH_MAX):
+        self.lookup = lookup
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self.max_batch = max_batch
+        self._pending = []
+        self._scheduled = False
+        self._in_flight = 0
+        self.batches = self.batched = 0
+
+    def submit(self, code: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((code, fut))
+        self._schedule(loop)
+        return fut
+
+    def _schedule(self, loop):
+        if self._pending and not self._scheduled and self._in_flight < self.max_in_flight:
+            self._scheduled = True
+            loop.call_soon(self._flush, loop)   # كل الطلبات المقروءة في نفس الدورة تدخل الدفعة
+
+    def _flush(self, loop):
+        self._scheduled = False
+        while self._pending and self._in_flight < self.max_in_flight:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self._in_flight += 1
+            loop.create_task(self._run(loop, batch))
+
+    async def _run(self, loop, batch):
+        self.batches += 1
+        self.batched += len(batch)
+        try:
+            results = await loop.run_in_executor(self.executor, self.lookup.lookup_many, [c for c, _ in batch])
+        except Exception as e:
+            results = None
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+        finally:
+            self._in_flight -= 1
+            self._schedule(loop)
+        if results is not None:
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+
+
+def _add_medical(conn, child_id: int, data: dict):
+    if conn.execute("SELECT 1 FROM children WHERE id=?", (child_id,)).fetchone() is None:
+        return None
+    return insert_medical_record(conn, child_id, data)
+
+
+class LookupService:
+    """العمليات المتاحة عبر HTTP — كل عمل قاعدة البيانات/الرسم في executor حتى لا تتوقف الحلقة"""
+
+    def __init__(self, registry: ShardedRegistry, workers=POOL_SIZE, cert_dir=CERT_CACHE_DIR):
+        self.registry = registry
+        self.lookup = registry.lookup()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="eohealth-api")
+        self.batcher = LookupBatcher(self.lookup, self.executor, max_in_flight=workers)
+        self.cert_dir = cert_dir
+        self._certificates = None
+        self._growth_handle = None
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def lookup_code(self, code: str):
+        # الكروت الممسوحة حديثاً تُجاب من الكاش مباشرة داخل الحلقة بدون thread
+        return self.lookup.cached(code) or await self.batcher.submit(code)
+
+    async def lookup_many(self, codes: list) -> list:
+        return await self._run(self.lookup.lookup_many, codes)
+
+    def _pool(self, child_id: int):
+        try:
+            return self.registry.pool_for_child(child_id)
+        except KeyError:   # رقم خارج نطاق كل الملفات = طفل غير موجود
+            return None
+
+    def _child(self, child_id: int):
+        pool = self._pool(child_id)
+        if pool is None:
+            return None
+        with pool.connection() as conn:
+            return fetch_child(conn, child_id)
+
+    async def add_medical(self, child_id: int, data: dict):
+        try:
+            writer = self.registry.writer_for_child(child_id)
+        except KeyError:
+            return None
+        if writer.mode == "group":
+            # الانتظار داخل الحلقة: عدد الكتابات المعلقة (وحجم المجموعة) غير محدود بعدد الـ threads
+            rec_id = await asyncio.wrap_future(writer.submit(_add_medical, child_id, data))
+        else:
+            rec_id = await self._run(writer.write, _add_medical, child_id, data)
+        if rec_id is not None:
+            self.lookup.invalidate_child(child_id)
+            self._schedule_growth()
+        return rec_id
+
+    def _schedule_growth(self):
+        if self._growth_handle is None:
+            loop = asyncio.get_running_loop()
+            self._growth_handle = loop.call_later(GROWTH_REFRESH_DELAY_S, lambda: loop.create_task(self._refresh_growth()))
+
+    async def _refresh_growth(self):
+        self._growth_handle = None
+        try:
+            await self._run(self.registry.refresh_growth)   # تزايدي: الملفات بدون سجلات جديدة لا تكلف شيئاً
+        except Exception:
+            log.exception("growth refresh failed")
+
+    def _qr_png(self, child_id: int):
+        from eohealth_qr import qr_png_bytes, card_payload
+
+        child = self._child(child_id)
+        return qr_png_bytes(card_payload(child["smart_id"], child["national_id"])) if child else None
+
+    async def qr_png(self, child_id: int):
+        return await self._run(self._qr_png, child_id)
+
+    def _certificate(self, child_id: int):
+        from eohealth_certificates import CertificateCache
+
+        child = self._child(child_id)
+        if child is None:
+            return None
+        if self._certificates is None:
+            self._certificates = CertificateCache(self.cert_dir)
+        return self._certificates.get_or_render(child)
+
+    async def certificate(self, child_id: int):
+        return await self._run(self._certificate, child_id)
+
+    def stats(self) -> dict:
+        return {
+            "lookup": self.lookup.latency_stats(),
+            "hot_cache": self.lookup.cache.stats(),
+            "batches": self.batcher.batches,
+            "mean_batch": round(self.batcher.batched / self.batcher.batches, 2) if self.batcher.batches else 0.0,
+            "writes": self.registry.writer_stats(),
+        }
+
+
+# ====================================================
+# 🌐 HTTP handlers
+# ====================================================
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, service: LookupService):
+        self.service = service
+        self._t0 = time.perf_counter()
+
+    def on_finish(self):
+        METRICS.observe("api", f"{self.request.method} {self.route}", time.perf_counter() - self._t0)
+
+    @property
+    def route(self) -> str:
+        return type(self).route_name
+
+    def write_json(self, payload, status=200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.finish(json.dumps(payload, ensure_ascii=False, default=str))
+
+    def write_error(self, status_code, **kwargs):
+        self.write_json({"error": self._reason}, status_code)
+
+    def json_body(self) -> dict:
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="invalid JSON body")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="JSON object expected")
+        return body
+
+
+class HealthHandler(BaseHandler):
+    route_name = "/health"
+
+    def get(self):
+        self.write_json({"status": "ok", **self.service.stats()})
+
+
+class LookupHandler(BaseHandler):
+    route_name = "/lookup"
+
+    async def get(self):
+        # ?code=<الكود الممسوح> أو ?smart_id=...&national_id=...
+        code = self.get_query_argument("code", "")
+        if not code:
+            smart_id = self.get_query_argument("smart_id", "")
+            national_id = self.get_query_argument("national_id", "")
+            code = f"{smart_id}|{national_id}" if smart_id and national_id else (smart_id or national_id)
+        if not code.strip():
+            raise tornado.web.HTTPError(400, reason="code, smart_id or national_id is required")
+        result = await self.service.lookup_code(code)
+        if result is None:
+            raise tornado.web.HTTPError(404, reason="child not found")
+        self.write_json(result)
+
+
+class LookupBatchHandler(BaseHandler):
+    route_name = "/lookup/batch"
+
+    async def post(self):
+        codes = self.json_body().get("codes")
+        if not isinstance(codes, list) or not all(isinstance(c, str) for c in codes):
+            raise tornado.web.HTTPError(400, reason="codes must be a list of strings")
+        if len(codes) > MAX_BATCH_CODES:
+            raise tornado.web.HTTPError(413, reason=f"at most {MAX_BATCH_CODES} codes per request")
+        self.write_json({"results": await self.service.lookup_many(codes)})
+
+
+class MedicalHandler(BaseHandler):
+    route_name = "/children/{id}/medical"
+
+    async def post(self, child_id):
+        body = self.json_body()
+        data = {k: body.get(k) for k in MEDICAL_FIELDS if k in body}
+        # سجل بدون تاريخ كشف = سجل فارغ في ملف الطفل
+        try:
+            data["record_date"] = date.fromisoformat(str(data.get("record_date") or "")).isoformat()
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="record_date (YYYY-MM-DD) is required")
+        for key in ("weight", "height", "bmi"):
+            if data.get(key) is not None and not isinstance(data[key], (int, float)):
+                raise tornado.web.HTTPError(400, reason=f"{key} must be a number")
+        if data.get("bmi") is None and data.get("weight") and data.get("height"):
+            data["bmi"] = round(data["weight"] / (data["height"] / 100) ** 2, 2)
+        rec_id = await self.service.add_medical(int(child_id), data)
+        if rec_id is None:
+            raise tornado.web.HTTPError(404, reason="child not found")
+        self.write_json({"id": rec_id, "child_id": int(child_id)}, status=201)
+
+
+class QrHandler(BaseHandler):
+    route_name = "/children/{id}/qr.png"
+
+    async def get(self, child_id):
+        png = await self.service.qr_png(int(child_id))
+        if png is None:
+            raise tornado.web.HTTPError(404, reason="child not found")
+        self.set_header("Content-Type", "image/png")
+        self.set_header("Cache-Control", "max-age=300")
+        self.finish(png)
+
+
+class CertificateHandler(BaseHandler):
+    route_name = "/children/{id}/certificate.pdf"
+
+    async def get(self, child_id):
+        path = await self.service.certificate(int(child_id))
+        if path is None:
+            raise tornado.web.HTTPError(404, reason="child not found")
+        # اسم الملف = hash المحتوى: نفس الاسم يعني نفس الشهادة
+        self.set_header("ETag", f'"{path.stem}"')
+        if self.request.headers.get("If-None-Match") == f'"{path.stem}"':
+            self.set_status(304)
+            return self.finish()
+        self.set_header("Content-Type", "application/pdf")
+        self.set_header("Content-Disposition", f'inline; filename="birth_certificate_{child_id}.pdf"')
+        self.finish(await asyncio.get_running_loop().run_in_executor(self.service.executor, path.read_bytes))
+
+
+class MetricsHandler(BaseHandler):
+    route_name = "/metrics"
+
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.finish(METRICS.to_prometheus())
+
+
+def make_app(service: LookupService) -> tornado.web.Application:
+    args = {"service": service}
+    return tornado.web.Application([
+        (r"/health", HealthHandler, args),
+        (r"/lookup", LookupHandler, args),
+        (r"/lookup/batch", LookupBatchHandler, args),
+        (r"/children/(\d+)/medical", MedicalHandler, args),
+        (r"/children/(\d+)/qr\.png", QrHandler, args),
+        (r"/children/(\d+)/certificate\.pdf", CertificateHandler, args),
+        (r"/metrics", MetricsHandler, args),
+    ], log_function=lambda handler: None)   # سجل لكل طلب يبطئ الخدمة تحت الحمل
+
+
+async def serve(db_path=DB_PATH, host="127.0.0.1", port=8502, workers=POOL_SIZE, shards=None, shards_dir=SHARDS_DIR,
+                write_mode="group"):
+    if shards:
+        layout = int(shards) if str(shards).isdigit() else shards
+        registry = ShardedRegistry.open(shards_dir, layout, pool_size=min(workers, SHARD_POOL_SIZE), metrics=METRICS)
+    else:
+        registry = ShardedRegistry.single(ConnectionPool(db_path, size=workers, metrics=METRICS))
+    registry.migrate()
+    registry.use_writers(write_mode, metrics=METRICS)
+    service = LookupService(registry, workers)
+    server = make_app(service).listen(port, address=host, xheaders=True)
+    log.info("EoHealth lookup API on http://%s:%d (%s, %s writes)", host, port,
+             f"{len(registry.pools)} shards in {shards_dir}" if shards else f"db={db_path}", write_mode)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.stop()
+        service.executor.shutdown(wait=False)
+        registry.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EoHealth lookup API for clinic QR scanners")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--workers", type=int, default=POOL_SIZE, help="database threads (= pool size)")
+    parser.add_argument("--shards", help="sharded storage: 'governorate' or a bucket count (ignores --db)")
+    parser.add_argument("--shards-dir", default=str(SHARDS_DIR))
+    parser.add_argument("--write-mode", choices=WRITE_MODES, default="group",
+                        help="group: one COMMIT per batch of concurrent writes; strict: one COMMIT per write")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.workers, args.shards, Path(args.shards_dir), args.write_mode))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,20 @@
 # د. سها ناصر — الكارت الموحد للطفل
 # =========================
 
+import time
+_run_t0 = time.perf_counter()   # ⏱️ بداية تشغيل السكربت (لقياس زمن كل rerun)
 import streamlit as st
 import pandas as pd
-import qrcode
-from io import BytesIO
-import sqlite3                  # ✅ قاعدة البيانات
 from datetime import datetime, date
 from pathlib import Path
-import io, base64
-from PIL import Image, ImageDraw, ImageFont
-import arabic_reshaper
-from bidi.algorithm import get_display
+import base64, os
+from functools import wraps
+from eohealth_db import ConnectionPool, child_version, fetch_medical_records, insert_medical_record  # ✅ مجمّع اتصالات SQLite
+from eohealth_shards import ShardedRegistry, SHARDS_DIR  # 🗺️ ملف واحد أو ملف لكل محافظة بنفس الواجهة
+from eohealth_cache import LRUCache  # 🧠 كاش محدود مع حذف لكل مفتاح
+from eohealth_uploads import UploadStore, save_uploads, attach_files, list_attachments, import_legacy_files  # 📎 المرفقات
+from eohealth_metrics import METRICS  # 📈 أزمنة SQL والصفحات والرسم
+# ⚡ الوحدات الثقيلة (الشهادات، QR، الاستيراد/التصدير، التحليلات) تُحمَّل داخل الصفحة التي تستخدمها فقط
 
 # =======================
 # 🧠 الإعدادات الأساسية
@@ -22,21 +25,113 @@ from bidi.algorithm import get_display
 # 🗂️ إنشاء قاعدة البيانات ومجلد الملفات إن لم يكونا موجودين
 DB_PATH = "eohealth.db"
 UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-
-# 🖋️ دالة لتحديد الخط المستخدم في الشهادات أو الصور
-def choose_font(size=20):
-    try:
-        return ImageFont.truetype("Amiri-Regular.ttf", size)
-    except:
-        return ImageFont.load_default()
-
-# ✅ اختبار الاتصال بقاعدة البيانات (إنشاء ملف القاعدة في أول تشغيل)
+CERT_CACHE_DIR = Path("cache") / "certificates"   # كاش الشهادات منفصل عن ملفات المستخدمين
+SNAPSHOT_DIR = Path("cache") / "snapshots"        # لقطات Parquet للتحليلات (تُعاد من القاعدة في أي وقت)
+# 🧠 كاش بيانات كل طفل (السجلات الطبية + المرفقات): حد للعدد والذاكرة + صلاحية زمنية
+CHILD_CACHE_ENTRIES = 512
+CHILD_CACHE_MAX_BYTES = 64 * 1024 * 1024
+CHILD_CACHE_TTL_S = 600
+JOB_REFRESH_S = 2   # فترة تحديث لوحة المهام أثناء عمل مهام في الخلفية
+# 🗺️ التخزين المقسم: "" = ملف واحد (الافتراضي)، "governorate" = ملف لكل محافظة، أو عدد ملفات (hash bucket)
+STORAGE_SHARDS = os.environ.get("EOHEALTH_SHARDS", "").strip()
+SHARDED = bool(STORAGE_SHARDS)
+# ✍️ وضع الكتابة: "group" = thread كاتب يجمع حفظ كل الجلسات في COMMIT واحد، "strict" = COMMIT لكل حفظ
+WRITE_MODE = os.environ.get("EOHEALTH_WRITE_MODE", "group").strip() or "group"
+
+# 🔌 مجمّع اتصالات واحد لكل عملية (مشترك بين كل الجلسات)
+@st.cache_resource(show_spinner=False)
+def get_pool():
+    """إنشاء مجمّع الاتصالات مرة واحدة (WAL + busy timeout)"""
+    return ConnectionPool(DB_PATH, metrics=METRICS)
+
+@st.cache_resource(show_spinner=False)
+def get_registry():
+    """سجل الأطفال: يوجّه الكتابة لملف المحافظة ويجمع الشاشات القومية من كل الملفات بالتوازي"""
+    if not SHARDED:
+        registry = ShardedRegistry.single(get_pool())
+    else:
+        layout = int(STORAGE_SHARDS) if STORAGE_SHARDS.isdigit() else STORAGE_SHARDS
+        registry = ShardedRegistry.open(SHARDS_DIR, layout, metrics=METRICS)
+    return registry.use_writers(WRITE_MODE, metrics=METRICS)
+
+@st.cache_resource(show_spinner=False)
+def get_certificate_cache():
+    """كاش شهادات PDF حسب المحتوى (مشترك بين كل الجلسات)"""
+    from eohealth_certificates import CertificateCache
+
+    return CertificateCache(CERT_CACHE_DIR)
+
+@st.cache_resource(show_spinner=False)
+def get_lookup():
+    """خدمة البحث بالكارت الذكي مع الكاش الساخن (مشتركة بين كل الجلسات)"""
+    # validate: السجلات المضافة عبر الـ API (عملية أخرى) تظهر في المسح فوراً
+    return get_registry().lookup(validate=True)
+
+@st.cache_resource(show_spinner=False)
+def get_child_cache():
+    """كاش LRU لبيانات الأطفال — الحفظ يحذف مفاتيح الطفل المعدَّل فقط، وكتابة عملية أخرى تُكشف برقم النسخة"""
+    return LRUCache(CHILD_CACHE_ENTRIES, ttl=CHILD_CACHE_TTL_S, max_bytes=CHILD_CACHE_MAX_BYTES)
+
+@st.cache_resource(show_spinner=False)
+def get_upload_store():
+    """مخزن المرفقات حسب المحتوى (ينشئ مجلدات uploads/objects و thumbs)"""
+    return UploadStore(UPLOAD_DIR)
+
+@st.cache_resource(show_spinner=False)
+def init_db():
+    """تهيئة الجداول والفهارس عبر الترحيلات المرقمة — مرة واحدة لكل عملية وليس مع كل rerun"""
+    get_registry().migrate()
+    # المرفقات القديمة (مسارات في عمود files) تُنقل للمخزن الجديد مرة واحدة
+    if not SHARDED:
+        import_legacy_files(get_pool(), get_upload_store())
+    return True
+
+DATA_JOBS = ("import_children", "clear_database", "synthetic_registry")  # مهام تغير بيانات الأطفال
+
+@st.cache_resource(show_spinner=False)
+def get_job_queue():
+    """طابور مهام الإدارة: threads تعمل مرة واحدة لكل عملية وتستعيد المهام المقطوعة عند البدء"""
+    from eohealth_jobs import JobQueue
+
+    init_db()
+    # الكاشات تُجلب هنا (داخل السكربت) لأن on_finish يُستدعى من thread المهام
+    pool, registry, child_cache, lookup, store = get_pool(), get_registry(), get_child_cache(), get_lookup(), get_upload_store()
+
+    def on_finish(job):
+        if job["status"] != "done" or job["kind"] not in DATA_JOBS:
+            return
+        fetch_filter_options.clear()
+        search_children_df.clear()
+        count_children_filtered.clear()
+        child_cache.clear()
+        lookup.cache.clear()
+        if job["kind"] == "clear_database":
+            store.collect_garbage(list(registry.pools.values()))   # المخزن مشترك بين كل الملفات
+    # المهام بالجملة تعمل على نفس الملفات التي يكتب فيها التطبيق (ملف واحد أو ملف لكل محافظة)
+    return JobQueue(pool, on_finish=on_finish, registry=registry).start()
+
+# 🚀 تشغيل التهيئة مرة واحدة عند بدء التطبيق (الخطأ لا يُخزن في الكاش فتُعاد المحاولة في الـ rerun التالي)
 try:
-    conn_test = sqlite3.connect(DB_PATH)
-    conn_test.close()
+    init_db()
+    st.sidebar.success("✅ قاعدة البيانات جاهزة")  # رسالة جانبية للتأكيد
+    if SHARDED:
+        st.sidebar.caption(f"🗺️ Sharded storage: {len(get_registry().pools)} files ({STORAGE_SHARDS})")
 except Exception as e:
-    st.error(f"⚠️ خطأ في إنشاء قاعدة البيانات: {e}")
+    st.error(f"⚠️ خطأ في تهيئة قاعدة البيانات: {e}")
+
+# ====================================================
+# 🗃️ قاعدة البيانات والتوابع الخاصة بها
+# ====================================================
+
+def get_conn(child_id: int):
+    """استعارة اتصال للقراءة من ملف الطفل — يُستخدم مع with"""
+    return get_registry().pool_for_child(child_id).connection()
+
+
+def write_child(child_id: int, fn, *args):
+    """حفظ fn(conn, *args) عبر كاتب ملف الطفل — يرجع بعد COMMIT فقط (group أو strict حسب WRITE_MODE)"""
+    return get_registry().writer_for_child(child_id).write(fn, *args)
+
 
 # ----------------------------
 # واجهة المستخدم التجريبية
@@ -47,17 +142,31 @@ st.title("🧒 واجهة المستخدم - خدمات الكارت الموح
 st.subheader("🔍 مسح الكود أو إدخال رقم الكارت الذكي")
 qr_code = st.text_input("أدخل رقم الكارت أو امسح QR Code:")
 
-if qr_code:
-    # الخطوة 2: عرض بيانات الطفل (افتراضية للتجريب)
+try:
+    found = get_lookup().lookup(qr_code) if qr_code else None
+except Exception as e:
+    st.error(f"⚠️ خطأ في البحث عن الطفل: {e}")
+    found = None
+
+if qr_code and not found:
+    st.warning("⚠️ لم يتم العثور على طفل بهذا الكود / No child found for this code")
+
+if found:
+    # الخطوة 2: عرض بيانات الطفل من قاعدة البيانات
+    child, latest = found["child"], found["latest_medical"]
     child_data = {
-        "الاسم": "محمد أحمد علي",
-        "تاريخ الميلاد": "2024-03-12",
-        "الرقم القومي": "30210142301124",
-        "المنطقة الصحية": "شمال الجيزة",
-        "الحالة الصحية": "جيدة"
+        "الاسم": child["full_name"],
+        "تاريخ الميلاد": child["birth_date"],
+        "الرقم القومي": child["national_id"],
+        "الهوية الذكية": child["smart_id"],
+        "المحافظة": child["governorate"],
+        "آخر كشف": latest["record_date"] if latest else "—",
+        "الحالة الصحية": (latest["diagnoses"] or "—") if latest else "—",
     }
     st.success("✅ تم قراءة بيانات الطفل بنجاح")
     st.table(pd.DataFrame([child_data]))
+    perf = get_lookup().latency_stats()
+    st.caption(f"⏱️ lookup p50 {perf['p50_ms']} ms / p99 {perf['p99_ms']} ms ({perf['count']} scans)")
 
     # الخطوة 3: اختيار الخدمة
     st.subheader("🎯 اختر الخدمة المطلوبة:")
@@ -75,10 +184,27 @@ if qr_code:
             st.success("✅ تم تسجيل المولود بنجاح")
 
     elif service == "حجز تطعيم":
-        vaccine = st.selectbox("اختيار نوع التطعيم:", ["الدرن", "شلل الأطفال", "الثلاثي", "الكبد"])
+        # الجرعات الناقصة فقط من جدول الطفل (الأقرب استحقاقاً أولاً)
+        from eohealth_vaccines import child_schedule, book_vaccination
+
+        try:
+            with get_conn(child["id"]) as conn:
+                plan = child_schedule(conn, child["id"])
+            pending = plan[plan["status"] != "completed"]
+        except Exception as e:
+            st.error(f"⚠️ خطأ في تحميل جدول التطعيمات: {e}")
+            pending = pd.DataFrame(columns=["vaccine_code", "vaccine", "due_date"])
+        labels = {r.vaccine_code: f"{r.vaccine} — {r.due_date}" for r in pending.itertuples()}
+        if not labels:
+            st.info("لا توجد جرعات مستحقة")
+        vaccine = st.selectbox("اختيار نوع التطعيم:", list(labels), format_func=labels.get)
         date_pick = st.date_input("تاريخ الموعد المطلوب")
-        if st.button("تأكيد الحجز"):
-            st.success(f"💉 تم حجز تطعيم ({vaccine}) بتاريخ {date_pick}")
+        if st.button("تأكيد الحجز", disabled=not labels):
+            try:
+                booking_id = write_child(child["id"], book_vaccination, child["id"], vaccine, date_pick)
+                st.success(f"💉 تم حجز تطعيم ({labels[vaccine]}) بتاريخ {date_pick} — رقم الحجز #{booking_id}")
+            except Exception as e:
+                st.error(f"⚠️ لم يتم حفظ الحجز: {e}")
 
     elif service == "حجز كشف طبي":
         dept = st.selectbox("اختيار العيادة:", ["الأطفال", "الأسنان", "الأنف والأذن", "باطنة"])
@@ -106,189 +232,219 @@ if qr_code:
         💬 تقديم الشكاوى
         """)
 
-else:
+elif not qr_code:
     st.info("📷 برجاء إدخال أو مسح كود الكارت الذكي لبدء الخدمة.")
 
 # ====================================================
-# 🗃️ قاعدة البيانات والتوابع الخاصة بها
+# ✳️ دوال مساعدة إضافية (روابط التحميل)
+# ====================================================
+
+def make_download_link_bytes(data_bytes, filename, label="Download") -> str:
+    """توليد رابط تحميل ملف (QR أو PDF)"""
+    b64 = base64.b64encode(data_bytes).decode()
+    href = f'<a href="data:application/octet-stream;base64,{b64}" download="{filename}">{label}</a>'
+    return href
+
+
+# ====================================================
+# 🗃️ Data Access Layer (SQLite + Streamlit Cache)
 # ====================================================
 
-def get_conn():
-    """إنشاء اتصال بقاعدة البيانات المحلية"""
+def metered_cache_data(**cache_kwargs):
+    """st.cache_data مع عدّادات للوحة الأداء — الدالة الأصلية لا تُنفَّذ إلا عند miss"""
+    def decorate(fn):
+        @wraps(fn)
+        def load(*args, **kwargs):
+            METRICS.count("cache", fn.__name__, "misses")
+            with METRICS.timer("cache_load", fn.__name__):
+                return fn(*args, **kwargs)
+        cached = st.cache_data(**cache_kwargs)(load)
+
+        @wraps(fn)
+        def call(*args, **kwargs):
+            METRICS.count("cache", fn.__name__, "requests")
+            return cached(*args, **kwargs)
+        call.clear = cached.clear
+        return call
+    return decorate
+
+
+def count_registered_children() -> int:
+    """عدد الأطفال من عداد الإحصائيات (بدون قراءة الجدول)"""
     try:
-        return sqlite3.connect(DB_PATH, check_same_thread=False)
+        return get_registry().read_stats()["total_children"]
     except Exception as e:
-        st.error(f"⚠️ خطأ في الاتصال بقاعدة البيانات: {e}")
-        return None
+        st.error(f"⚠️ خطأ في تحميل بيانات الأطفال: {e}")
+        return 0
 
 
-def init_db():
-    """تهيئة الجداول الأساسية عند أول تشغيل"""
-    conn = get_conn()
-    if conn is None:
-        return
-    c = conn.cursor()
-
-    # جدول الأطفال
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS children (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        full_name TEXT,
-        national_id TEXT,
-        smart_id TEXT,
-        birth_date TEXT,
-        gender TEXT,
-        mother_id TEXT,
-        father_id TEXT,
-        governorate TEXT,
-        created_at TEXT
-    )
-    """)
-
-    # جدول الملفات الطبية
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS medical_files (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        child_id INTEGER,
-        record_date TEXT,
-        weight REAL,
-        height REAL,
-        bmi REAL,
-        vaccinations TEXT,
-        diagnoses TEXT,
-        medications TEXT,
-        notes TEXT,
-        files TEXT,
-        created_at TEXT
-    )
-    """)
+def cached_child_data(kind: str, child_id: int, loader):
+    """بيانات الطفل من الكاش طالما رقم نسخته في القاعدة لم يتغير (الـ API وأي عملية أخرى تكتب في نفس الملف)"""
+    with get_conn(child_id) as conn:
+        version = child_version(conn, child_id)
+    cache = get_child_cache()
+    hit = cache.get((kind, child_id))
+    if hit is not None and hit[0] == version:
+        return hit[1]
+    value = loader(child_id)
+    cache.set((kind, child_id), (version, value))
+    return value
 
-    conn.commit()
-    conn.close()
-    st.sidebar.success("✅ قاعدة البيانات جاهزة")  # رسالة جانبية للتأكيد
 
-# 🚀 تشغيل التهيئة مرة واحدة عند بدء التطبيق
-init_db()
+def _read_medical(child_id: int) -> pd.DataFrame:
+    with get_conn(child_id) as conn:
+        return fetch_medical_records(conn, child_id)
 
 
-# ====================================================
-# ✳️ دوال مساعدة إضافية (QR + PDF + Arabic Text)
-# ====================================================
+def fetch_medical_df(child_id: int):
+    """قراءة الملف الطبي لطفل معين (من الكاش لو موجود)"""
+    try:
+        return cached_child_data("medical", child_id, _read_medical)
+    except Exception as e:
+        st.error(f"⚠️ خطأ في قراءة السجلات الطبية: {e}")
+        return pd.DataFrame()
 
-def gen_smart_id(rec_id: int) -> str:
-    """توليد رقم الهوية الذكية"""
-    today = datetime.utcnow().strftime("%Y%m%d")
-    return f"EOH-{today}-{rec_id:06d}"
 
+@metered_cache_data(show_spinner=False, ttl=300)
+def fetch_filter_options():
+    """قيم الفلاتر (المحافظات وأنواع الجنس) لصفحة الإدارة"""
+    try:
+        registry = get_registry()
+        return {"governorate": registry.distinct_values("governorate"), "gender": registry.distinct_values("gender")}
+    except Exception as e:
+        st.error(f"⚠️ خطأ في تحميل قيم الفلاتر: {e}")
+        return {"governorate": [], "gender": []}
 
-def generate_qr_bytes(data_str: str) -> BytesIO:
-    """توليد كود QR لبيانات الطفل"""
-    qr = qrcode.QRCode(box_size=6, border=2)
-    qr.add_data(data_str)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
-    return buf
 
+@metered_cache_data(show_spinner=False, ttl=60, max_entries=64)
+def count_children_filtered(**filters) -> int:
+    """عدد الأطفال لفلاتر جدول الإدارة — كاش قصير: التحديث التلقائي أثناء المهام لا يعيد COUNT كل دورة"""
+    return get_registry().count_children(**filters)
 
-def make_download_link_bytes(data_bytes, filename, label="Download") -> str:
-    """توليد رابط تحميل ملف (QR أو PDF)"""
-    b64 = base64.b64encode(data_bytes).decode()
-    href = f'<a href="data:application/octet-stream;base64,{b64}" download="{filename}">{label}</a>'
-    return href
+@metered_cache_data(show_spinner=False, max_entries=4)
+def cached_snapshot_info(version: int) -> dict:
+    """حالة اللقطة (glob على ملفات Parquet) — تُعاد فقط عند تغير إصدار اللقطة"""
+    from eohealth_snapshots import snapshot_info
 
+    return snapshot_info(SNAPSHOT_DIR)
 
-def shape_arabic(text: str) -> str:
-    """تحسين عرض النص العربي داخل الصور أو الـ PDF"""
-    if not text:
-        return ""
+@metered_cache_data(show_spinner=False, ttl=60, max_entries=256)
+def search_children_df(text: str) -> pd.DataFrame:
+    """البحث بالاسم (FTS5) — كاش قصير لأن الكتابة حرف بحرف تكرر نفس الاستعلام"""
     try:
-        reshaped = arabic_reshaper.reshape(text)
-        bidi_text = get_display(reshaped)
-        return bidi_text
-    except Exception:
-        return text
-# ====================================================
-# 🗃️ Data Access Layer (SQLite + Streamlit Cache)
-# ====================================================
+        return get_registry().search_children(text, limit=50)
+    except Exception as e:
+        st.error(f"⚠️ خطأ في البحث بالاسم: {e}")
+        return pd.DataFrame()
+
 
-@st.cache_data(show_spinner=False)
-def fetch_children_df():
-    """قراءة جميع الأطفال من قاعدة البيانات"""
+@metered_cache_data(show_spinner=False, max_entries=32)
+def _snapshot_insights(version: int, governorate, today) -> pd.DataFrame:
+    """إطار التحليل من لقطة Parquet — الكاش بإصدار اللقطة: إعادة تشغيل الصفحة بدون بيانات جديدة لا تقرأ الملفات"""
+    from eohealth_snapshots import load_insights_frame
+
+    return load_insights_frame(SNAPSHOT_DIR, today=today, governorate=governorate)
+
+
+def load_insights(governorate=None) -> pd.DataFrame:
+    """بيانات AI Insights: تحديث تزايدي للقطة (الصفوف الجديدة فقط) ثم قراءة الأعمدة والمحافظة المطلوبة فقط"""
     try:
-        conn = get_conn()
-        df = pd.read_sql_query("SELECT * FROM children ORDER BY id DESC", conn)
-        conn.close()
-        return df
-    except Exception as e:
-        st.error(f"⚠️ خطأ في تحميل بيانات الأطفال: {e}")
-        return pd.DataFrame()  # لو في خطأ يرجع جدول فاضي
+        from eohealth_snapshots import refresh_snapshots
+    except ImportError:   # pyarrow غير مثبت: نفس البيانات من SQLite مباشرة
+        frame = get_registry().load_insights_frame()
+        return frame[frame["governorate"] == governorate].reset_index(drop=True) if governorate else frame
+    version = refresh_snapshots(get_registry().pools, SNAPSHOT_DIR)["version"]
+    return _snapshot_insights(version, governorate, date.today())
+
+
+def child_id_picker(key: str) -> int:
+    """اختيار الطفل: بحث بالاسم (أحمد = احمد، فاطمة = فاطمه) أو إدخال الرقم مباشرة"""
+    text = st.text_input("Search by name / ابحث بالاسم", key=f"{key}_name_search")
+    if text.strip():
+        hits = search_children_df(text.strip())
+        if hits.empty:
+            st.caption("No matches / لا توجد نتائج")
+        else:
+            labels = {
+                row.id: f"{row.full_name} — #{row.id} — {row.smart_id or row.national_id} ({row.governorate})"
+                for row in hits.itertuples()
+            }
+            return int(st.selectbox("Matches / النتائج", list(labels), format_func=labels.get, key=f"{key}_match"))
+    return st.number_input("Enter child ID / أدخل رقم الطفل", min_value=1, step=1)
 
 
-@st.cache_data(show_spinner=False)
-def fetch_medical_df(child_id: int):
-    """قراءة الملف الطبي لطفل معين"""
+def _read_attachments(child_id: int) -> list:
+    with get_conn(child_id) as conn:
+        return list_attachments(conn, child_id)
+
+
+def fetch_attachments(child_id: int) -> list:
+    """قائمة مرفقات الطفل (بيانات الجدول فقط، من الكاش لو موجودة)"""
     try:
-        conn = get_conn()
-        df = pd.read_sql_query(
-            "SELECT * FROM medical_files WHERE child_id=? ORDER BY id DESC",
-            conn, params=(child_id,)
-        )
-        conn.close()
-        return df
+        return cached_child_data("attachments", child_id, _read_attachments)
     except Exception as e:
-        st.error(f"⚠️ خطأ في قراءة السجلات الطبية: {e}")
-        return pd.DataFrame()
+        st.error(f"⚠️ خطأ في قراءة المرفقات: {e}")
+        return []
+
+
+def invalidate_child(child_id: int):
+    """حذف بيانات طفل واحد من كل الكاشات بعد تعديلها (باقي الأطفال يظلوا في الكاش)"""
+    get_child_cache().invalidate(("medical", child_id), ("attachments", child_id))
+    get_lookup().invalidate_child(child_id)
 
 
 def insert_child_record(rec: dict) -> int:
     """إضافة سجل جديد لطفل في جدول الأطفال"""
     try:
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO children 
-            (full_name, national_id, smart_id, birth_date, gender, mother_id, father_id, governorate, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            rec["full_name"], rec["national_id"], rec["smart_id"], rec["birth_date"],
-            rec["gender"], rec["mother_id"], rec["father_id"], rec["governorate"],
-            datetime.utcnow().isoformat()
-        ))
-        conn.commit()
-        rec_id = c.lastrowid
-        conn.close()
-        fetch_children_df.clear()  # تحديث الكاش
-        return rec_id
+        # الملف يُحدد من المحافظة، والهوية الذكية تُولَّد من رقم السجل داخل نفس المعاملة
+        child_id = get_registry().insert_child(rec)
+        count_children_filtered.clear()
+        return child_id
     except Exception as e:
         st.error(f"⚠️ لم يتم حفظ الطفل: {e}")
         return -1
 
 
+def _insert_medical_tx(conn, child_id: int, data: dict) -> int:
+    from eohealth_growth import update_growth
+
+    rec_id = insert_medical_record(conn, child_id, data)
+    # المرفقات في نفس المعاملة: إما السجل وملفاته معاً أو لا شيء
+    attach_files(conn, rec_id, child_id, data.get("attachments", []))
+    # مؤشرات النمو لهذا السجل فقط في نفس المعاملة (نفس SAVEPOINT في group commit) — السجلات الأخرى
+    # التي لم تُحسب بعد (مهام بالجملة، الـ API) يغطيها refresh_growth على دفعات وليس حفظ العيادة
+    update_growth(conn, [rec_id])
+    return rec_id
+
+
 def insert_medical(child_id: int, data: dict) -> int:
     """إضافة سجل طبي جديد لطفل"""
     try:
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO medical_files
-            (child_id, record_date, weight, height, bmi, vaccinations, diagnoses, medications, notes, files, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            child_id, data.get("record_date"), data.get("weight"), data.get("height"), data.get("bmi"),
-            data.get("vaccinations", ""), data.get("diagnoses", ""), data.get("medications", ""),
-            data.get("notes", ""), ",".join(data.get("files", [])), datetime.utcnow().isoformat()
-        ))
-        conn.commit()
-        rec_id = c.lastrowid
-        conn.close()
-        fetch_medical_df.clear()  # تحديث الكاش
-        return rec_id
+        rec_id = write_child(child_id, _insert_medical_tx, child_id, data)
+        invalidate_child(child_id)  # تحديث الكاش للطفل ده فقط
     except Exception as e:
         st.error(f"⚠️ لم يتم حفظ السجل الطبي: {e}")
         return -1
+    return rec_id
+
+
+def job_summary(job: dict) -> str:
+    """سطر نتيجة مهمة منتهية في لوحة المهام"""
+    r = job["result"] or {}
+    kind = job["kind"]
+    if kind == "import_children":
+        return f"✅ {r['inserted']:,} inserted / {r['read']:,} rows in {r['seconds']}s — {r['rejected']:,} rejected"
+    if kind == "export_children":
+        return f"✅ {r['rows']:,} rows — {r['bytes'] / 1e6:.1f} MB in {r['seconds']}s"
+    if kind == "render_certificates":
+        if "cards" in r:
+            return f"✅ {r['cards']:,} QR cards on {r['pages']:,} pages in {r['seconds']}s — {r['cards_per_sec']} cards/sec"
+        return f"✅ {r['pages']:,} certificates in {r['seconds']}s — {r['pages_per_sec']} pages/sec"
+    if kind == "clear_database":
+        return f"✅ {r['children']:,} children and {r['medical_records']:,} records deleted"
+    if kind == "synthetic_registry":
+        return f"✅ {r['children']:,} children + {r['medical_records']:,} records in {r['seconds']}s ({r['rows_per_sec']:,.0f} rows/s)"
+    return "✅ Done"
 
 
 def estimate_environmental_savings(total_records: int, papers_per_record=5):
@@ -299,58 +455,6 @@ def estimate_environmental_savings(total_records: int, papers_per_record=5):
     return sheets_saved, round(paper_kg, 3), round(co2_kg, 3)
 
 
-# ====================================================
-# 📜 توليد شهادة الميلاد الرقمية (PDF + Arabic)
-# ====================================================
-
-def create_birth_certificate_image(child_rec: dict):
-    """إنشاء صورة شهادة الميلاد بالعربية"""
-    W, H = 1240, 1754  # حجم صفحة A4
-    img = Image.new("RGB", (W, H), color="white")
-    draw = ImageDraw.Draw(img)
-    title_font = choose_font(40)
-    header_font = choose_font(28)
-    body_font = choose_font(20)
-
-    # العنوان الرئيسي
-    title_text = "Birth Certificate (Digital) — شهادة الميلاد الرقمية"
-    draw.text((W // 2, 60), title_text, fill="black", anchor="ms", font=title_font)
-
-    # البيانات
-    lines = [
-        ("اسم الطفل / Child Name:", child_rec.get("full_name", "")),
-        ("الرقم القومي / National ID:", child_rec.get("national_id", "")),
-        ("تاريخ الميلاد / Birth Date:", child_rec.get("birth_date", "")),
-        ("النوع / Gender:", child_rec.get("gender", "")),
-        ("المحافظة / Governorate:", child_rec.get("governorate", "")),
-        ("الهوية الصحية الذكية / Smart Health ID:", child_rec.get("smart_id", "")),
-    ]
-
-    start_y = 160
-    gap = 70
-    for i, (label, value) in enumerate(lines):
-        y = start_y + i * gap
-        draw.text((60, y), label, fill="black", font=body_font)
-        display_value = shape_arabic(value)
-        draw.text((W - 60, y), display_value, fill="black", anchor="ra", font=body_font)
-
-    # QR في الأسفل
-    qr_buf = generate_qr_bytes(f"{child_rec.get('smart_id')}|{child_rec.get('national_id')}")
-    qr_img = Image.open(qr_buf).convert("RGB").resize((220, 220))
-    img.paste(qr_img, (60, H - 300))
-
-    # تذييل الصفحة
-    footer_text = "Issued by: EoHealth Egypt — Electronic Office for Health (Prototype)"
-    draw.text((W // 2, H - 80), footer_text, fill="black", anchor="ms", font=header_font)
-
-    return img
-
-
-def create_birth_certificate_pdf(child_rec: dict, output_path: Path):
-    """توليد ملف PDF من الشهادة"""
-    img = create_birth_certificate_image(child_rec)
-    img.save(output_path, "PDF", resolution=150)
-    return output_path
 # ====================================================
 # 🧭 Sidebar Navigation
 # ====================================================
@@ -362,6 +466,22 @@ if "lang" not in st.session_state:
 lang_choice = st.sidebar.selectbox("Language / اللغة", ["ar", "en"], format_func=lambda x: "العربية" if x == "ar" else "English")
 st.session_state.lang = lang_choice
 
+# 🌐 نصوص الواجهة باللغتين
+TEXTS = {
+    "health_record": {"ar": "🩺 السجل الصحي", "en": "🩺 Health Record"},
+    "ai_insights": {"ar": "🤖 تحليلات ذكية", "en": "🤖 AI Insights"},
+    "eco_dashboard": {"ar": "🌱 لوحة الأثر البيئي", "en": "🌱 Eco Dashboard"},
+    "digital_card": {"ar": "🪪 البطاقة الصحية الرقمية", "en": "🪪 Digital Health Card"},
+    "download_pdf": {"ar": "📥 تحميل شهادة الميلاد PDF", "en": "📥 Download birth certificate (PDF)"},
+    "admin": {"ar": "🛠️ لوحة الإدارة", "en": "🛠️ Admin"},
+    "export_excel": {"ar": "📥 تحميل Excel", "en": "📥 Download Excel"},
+}
+
+
+def t(key: str) -> str:
+    """النص المناسب للغة المختارة (المفتاح نفسه لو غير مترجم)"""
+    return TEXTS.get(key, {}).get(st.session_state.get("lang", "ar"), key)
+
 # الصفحات المتاحة
 page = st.sidebar.radio(
     "اختيار الصفحة / Choose Page",
@@ -377,23 +497,23 @@ page = st.sidebar.radio(
     ]
 )
 
+_page_t0 = time.perf_counter()   # ⏱️ زمن فرع الصفحة المختارة فقط
+
 # ====================================================
 # 🩺 Health Record Page
 # ====================================================
 if page == "Health Record":
 
     st.header(t("health_record"))
-    df = fetch_children_df()
-
-    if df.empty:
+    from eohealth_growth import compute_bmi, child_growth, growth_chart
+    if count_registered_children() == 0:
         st.info("No children yet." if st.session_state.lang == "en" else "لا يوجد أطفال بعد.")
     else:
-        sid = st.number_input("Enter child ID / أدخل رقم الطفل", min_value=1, step=1)
+        sid = child_id_picker("health_record")
         if st.button("Load Record / تحميل السجل"):
             try:
-                conn = get_conn()
-                rec = conn.cursor().execute("SELECT * FROM children WHERE id=?", (sid,)).fetchone()
-                conn.close()
+                with get_conn(sid) as conn:
+                    rec = conn.execute("SELECT * FROM children WHERE id=?", (sid,)).fetchone()
             except Exception as e:
                 st.error(f"⚠️ Database error: {e}")
                 rec = None
@@ -408,16 +528,53 @@ if page == "Health Record":
                 else:
                     st.subheader("Medical History / السجل الطبي")
                     st.dataframe(
-                        med_df[["id", "record_date", "weight", "height", "bmi", "vaccinations", "diagnoses", "medications", "notes", "files"]],
+                        med_df[["id", "record_date", "weight", "height", "bmi", "vaccinations", "diagnoses", "medications", "notes"]],
                         height=250
                     )
 
+                try:
+                    with get_conn(sid) as conn:
+                        growth = child_growth(conn, sid)
+                except Exception as e:
+                    st.error(f"⚠️ خطأ في تحميل بيانات النمو: {e}")
+                    growth = pd.DataFrame()
+                if not growth.empty and growth["age_months"].notna().any():
+                    st.subheader("📈 Growth chart / منحنى النمو")
+                    indicator = st.radio("Indicator / المؤشر", ["waz", "haz", "baz"], horizontal=True,
+                                         format_func={"waz": "Weight / الوزن", "haz": "Height / الطول", "baz": "BMI"}.get)
+                    st.plotly_chart(growth_chart(growth, indicator), use_container_width=True)
+                    latest = growth.dropna(subset=["age_months"]).iloc[-1]
+                    flags = [label for col, label in (("stunting", "تقزم / Stunting"), ("wasting", "هزال / Wasting"),
+                                                      ("obesity", "سمنة / Obesity")) if latest[col]]
+                    if flags:
+                        st.warning("⚠️ " + " — ".join(flags))
+
+                attachments = fetch_attachments(sid)
+                if attachments:
+                    st.subheader("📎 Attachments / المرفقات")
+                    store = get_upload_store()
+                    cols = st.columns(4)
+                    for i, a in enumerate(attachments):
+                        with cols[i % 4]:
+                            thumb = store.thumbnail(a["sha256"], a["mime"])
+                            if thumb:
+                                st.image(str(thumb))
+                            else:
+                                st.markdown("📄")
+                            st.caption(f"{a['filename']} — {a['size'] / 1024:.0f} KB — #{a['medical_id']}")
+                    # الملف الكامل يُقرأ فقط عند اختياره للتحميل
+                    pick = st.selectbox("Download attachment / تحميل مرفق", attachments,
+                                        format_func=lambda a: f"{a['filename']} (#{a['medical_id']})")
+                    if pick and store.path(pick["sha256"]).exists():
+                        with store.open(pick["sha256"]) as fh:
+                            st.download_button("📥 Download / تحميل", data=fh, file_name=pick["filename"], mime=pick["mime"])
+
                 st.markdown("### ➕ Add / Upload Medical Record")
                 with st.form("add_med", clear_on_submit=True):
                     rec_date = st.date_input("Record Date / تاريخ الفحص", value=date.today())
                     weight = st.number_input("Weight (kg) / الوزن (كجم)", min_value=0.0, format="%.1f")
                     height = st.number_input("Height (cm) / الطول (سم)", min_value=0.0, format="%.1f")
-                    bmi = round(weight / ((height / 100) ** 2), 2) if (height and weight) else None
+                    bmi = compute_bmi(weight, height)
                     vaccinations = st.text_area("Vaccinations / التطعيمات (dates & notes)")
                     diagnoses = st.text_area("Diagnoses / التشخيصات")
                     medications = st.text_area("Medications / الأدوية")
@@ -427,13 +584,8 @@ if page == "Health Record":
 
                     if submitted:
                         try:
-                            files_saved = []
-                            for f in uploaded:
-                                fname = f"{sid}_{int(datetime.utcnow().timestamp())}_{f.name}"
-                                out_path = UPLOAD_DIR / fname
-                                with open(out_path, "wb") as of:
-                                    of.write(f.getbuffer())
-                                files_saved.append(str(out_path))
+                            # كتابة متدفقة للمخزن قبل فتح معاملة قاعدة البيانات
+                            attachments = save_uploads(get_upload_store(), uploaded)
 
                             data = {
                                 "record_date": rec_date.isoformat(),
@@ -444,7 +596,7 @@ if page == "Health Record":
                                 "diagnoses": diagnoses,
                                 "medications": medications,
                                 "notes": notes,
-                                "files": files_saved,
+                                "attachments": attachments,
                             }
                             new_id = insert_medical(sid, data)
                             if new_id > 0:
@@ -455,68 +607,171 @@ if page == "Health Record":
                             st.error(f"⚠️ خطأ أثناء حفظ الملف: {e}")
 
 
+# ====================================================
+# 💉 Vaccination Tracker Page
+# ====================================================
+elif page == "Vaccination Tracker":
+    st.header("💉 Vaccination Tracker / متابعة التطعيمات")
+    from eohealth_vaccines import DOSES, child_schedule, record_vaccination, week_window
+    status_labels = {"overdue": "Overdue / متأخر", "due": "Due now / مستحق الآن", "upcoming": "Upcoming / قادم"}
+    week_start, week_end = week_window()
+
+    c1, c2 = st.columns(2)
+    status = c1.selectbox("Status / الحالة", list(status_labels), format_func=status_labels.get)
+    gov = c2.selectbox("Governorate / المحافظة", [""] + fetch_filter_options()["governorate"],
+                       format_func=lambda g: g or "All / الكل")
+    window = st.date_input("Window / الفترة", value=(week_start, week_end))
+    start, end = (window if isinstance(window, (list, tuple)) and len(window) == 2 else (None, None))
+
+    try:
+        dl = get_registry().due_list(status, gov or None, start, end, limit=5000)
+        st.metric(status_labels[status], len(dl))
+        st.dataframe(dl[["child_id", "full_name", "smart_id", "governorate", "vaccine", "due_date", "overdue_date"]],
+                     use_container_width=True)
+        if len(dl):
+            st.download_button("📥 Download list (CSV) / تحميل القائمة", data=dl.to_csv(index=False).encode("utf-8-sig"),
+                               file_name=f"vaccination_{status}_{start}_{end}.csv", mime="text/csv")
+    except Exception as e:
+        st.error(f"⚠️ خطأ في تحميل قائمة التطعيمات: {e}")
+
+    # الحساب الكامل للجدول (الأطفال الجدد) — تسجيل الجرعات يحدّث القائمة فوراً بدون إعادة الحساب
+    if st.button("🔄 Rebuild due-list / إعادة حساب قائمة المستحق"):
+        try:
+            with st.spinner("Computing schedules... / جاري الحساب..."):
+                res = get_registry().refresh_due_list()
+            st.success(f"✅ {res['children']:,} children — {res['pending_doses']:,} pending doses in {res['seconds']}s")
+        except Exception as e:
+            st.error(f"⚠️ خطأ أثناء إعادة الحساب: {e}")
+
+    st.markdown("### ✍️ Record a dose / تسجيل جرعة")
+    vid = child_id_picker("vaccination")
+    try:
+        with get_conn(vid) as conn:
+            plan = child_schedule(conn, vid)
+    except Exception as e:
+        st.error(f"⚠️ خطأ في تحميل جدول الطفل: {e}")
+        plan = pd.DataFrame()
+    if plan.empty:
+        st.info("Child not found / الطفل غير موجود")
+    else:
+        st.dataframe(plan, use_container_width=True, height=300)
+        pending = plan.loc[plan["status"] != "completed", "vaccine_code"].tolist()
+        if pending:
+            code = st.selectbox("Vaccine / التطعيم", pending, format_func=lambda c: f"{DOSES[c].label_ar} / {DOSES[c].label_en}")
+            given_on = st.date_input("Given on / تاريخ الإعطاء", value=date.today())
+            if st.button("Save dose / حفظ الجرعة"):
+                try:
+                    write_child(vid, record_vaccination, vid, code, given_on)
+                    st.success("✅ تم تسجيل الجرعة")
+                except Exception as e:
+                    st.error(f"⚠️ لم يتم تسجيل الجرعة: {e}")
+
+
 # ====================================================
 # 🤖 AI Insights Page
 # ====================================================
 elif page == "AI Insights":
     st.header(t("ai_insights"))
+    from eohealth_insights import evaluate_rules
     st.markdown(
         "This is a demo placeholder with rule-based checks; replace later with AI model."
         if st.session_state.lang == "en"
         else "هذا نموذج تجريبي للتحليل بناءً على قواعد بسيطة — يمكن استبداله بنموذج ذكاء اصطناعي لاحقاً."
     )
 
-    df = fetch_children_df()
-    if df.empty:
+    gov = st.selectbox("Governorate / المحافظة", [""] + fetch_filter_options()["governorate"],
+                       format_func=lambda g: g or "All / الكل", key="insights_governorate")
+    try:
+        with st.spinner("Loading analytics snapshot... / جاري تحميل البيانات..."):
+            insights = load_insights(gov or None)   # أعمدة التحليل فقط من Parquet (مجلد المحافظة فقط عند التصفية)
+    except Exception as e:
+        st.error(f"⚠️ خطأ في تحميل بيانات التحليل: {e}")
+        insights = pd.DataFrame()
+
+    if insights.empty:
         st.info("No data yet." if st.session_state.lang == "en" else "لا توجد بيانات بعد.")
     else:
         st.subheader("Rule-based analysis / التحليل التجريبي")
-        alerts = []
-        for _, r in df.iterrows():
-            try:
-                child_id = r["id"]
-                dob = r["birth_date"]
-                age_days = (date.today() - date.fromisoformat(dob)).days
-                med = fetch_medical_df(child_id)
-                has_vacc = (not med.empty) and (med["vaccinations"].astype(str).str.len().sum() > 0)
-                if age_days > 60 and not has_vacc:
-                    alerts.append((child_id, r["full_name"], "Missing vaccinations / لم يتم تسجيل التطعيمات"))
-            except Exception:
-                continue
-
-        if alerts:
-            for a in alerts:
-                st.warning(f"⚠️ ID {a[0]} — {a[1]}: {a[2]}")
+        alerts = evaluate_rules(insights)
+
+        if not alerts.empty:
+            counts = alerts["message"].value_counts()
+            for col, (label, n) in zip(st.columns(len(counts)), counts.items()):
+                col.metric(label, n)
+            st.dataframe(alerts, height=400)
         else:
             st.success("✅ No immediate issues detected." if st.session_state.lang == "en" else "✅ لا توجد تنبيهات في الوقت الحالي.")
 
+    # ---------------- Growth analytics (WHO z-scores) ----------------
+    st.subheader("📈 Growth analytics / تحليلات النمو (WHO)")
+    try:
+        if st.button("🔄 Recompute all growth metrics / إعادة حساب الكل"):
+            res = get_registry().refresh_growth(full=True)
+        else:
+            res = get_registry().refresh_growth()   # السجلات الجديدة فقط
+        st.caption(f"⏱️ {res['records']:,} records computed in {res['seconds']}s")
+        summary = get_registry().governorate_summary()
+        if summary.empty:
+            st.info("No growth data yet / لا توجد قياسات بعد")
+        else:
+            import plotly.express as px
+
+            long = summary.melt(id_vars=["governorate", "children"], var_name="indicator", value_name="percent")
+            st.plotly_chart(px.bar(long, x="governorate", y="percent", color="indicator", barmode="group",
+                                   labels={"percent": "% of children (latest visit, under 5)"}),
+                            use_container_width=True)
+            st.dataframe(summary, use_container_width=True)
+    except Exception as e:
+        st.error(f"⚠️ خطأ في تحليلات النمو: {e}")
+
 
 # ====================================================
 # 🌱 Eco Dashboard Page
 # ====================================================
 elif page == "Eco Dashboard":
     st.header(t("eco_dashboard"))
-    total = fetch_children_df().shape[0]
+    try:
+        stats = get_registry().read_stats()   # عدادات جاهزة تُحدَّث بالـ triggers (مجموع كل الملفات)
+        bucket = st.radio("Trend / الاتجاه", ["month", "day", "year"], horizontal=True)
+        trend = get_registry().stats_trend("children", bucket)
+    except Exception as e:
+        st.error(f"⚠️ خطأ في تحميل الإحصائيات: {e}")
+        stats, trend = {"total_children": 0, "medical_records": 0, "uploaded_files": 0, "by_governorate": {}}, pd.DataFrame()
+
+    total = stats["total_children"]
     sheets, paper_kg, co2_kg = estimate_environmental_savings(total)
     st.metric("Registered children", total)
     st.metric("Paper sheets saved", sheets)
     st.metric("Paper mass saved (kg)", paper_kg)
     st.metric("CO₂ reduction (kg)", co2_kg)
+    c1, c2 = st.columns(2)
+    c1.metric("Medical records", stats["medical_records"])
+    c2.metric("Uploaded files", stats["uploaded_files"])
     st.info("🌿 Each digital record saves ~5 sheets of paper on average.")
 
+    if not trend.empty:
+        import plotly.express as px
+
+        trend["sheets_saved"] = trend["cumulative"].map(lambda n: estimate_environmental_savings(n)[0])
+        st.plotly_chart(px.line(trend, x="bucket", y="sheets_saved", markers=True,
+                                labels={"bucket": bucket, "sheets_saved": "Paper sheets saved (cumulative)"}),
+                        use_container_width=True)
+    if stats["by_governorate"]:
+        st.bar_chart(pd.Series(stats["by_governorate"], name="children"))
+
 
 # ====================================================
 # 🪪 Digital Health Card Page
 # ====================================================
 elif page == "Digital Card":
     st.header(t("digital_card"))
-    sid = st.number_input("Enter child ID / أدخل رقم الطفل", min_value=1, step=1)
+    from eohealth_qr import qr_png_bytes, card_payload
+    sid = child_id_picker("digital_card")
 
     if st.button("Load Digital Card / عرض البطاقة الصحية"):
         try:
-            conn = get_conn()
-            rec = conn.cursor().execute("SELECT * FROM children WHERE id=?", (sid,)).fetchone()
-            conn.close()
+            with get_conn(sid) as conn:
+                rec = conn.execute("SELECT * FROM children WHERE id=?", (sid,)).fetchone()
         except Exception as e:
             st.error(f"⚠️ خطأ في قاعدة البيانات: {e}")
             rec = None
@@ -529,25 +784,26 @@ elif page == "Digital Card":
                 "national_id": rec[2],
                 "smart_id": rec[3],
                 "birth_date": rec[4],
+                "gender": rec[5],
                 "governorate": rec[8],
             }
 
             # QR Code
-            qr_buf = generate_qr_bytes(f"{child['smart_id']}|{child['national_id']}")
-            st.image(qr_buf)
+            st.image(qr_png_bytes(card_payload(child["smart_id"], child["national_id"])))
             st.write("👶 Name:", child["full_name"])
             st.write("🆔 Smart ID:", child["smart_id"])
             st.write("🎂 Birth Date:", child["birth_date"])
             st.write("🏙️ Governorate:", child["governorate"])
 
-            # تحميل شهادة الميلاد PDF
-            pdf_path = UPLOAD_DIR / f"birth_certificate_{sid}.pdf"
+            # تحميل شهادة الميلاد PDF (تُولَّد فقط عند تغير بيانات الطفل)
             try:
-                if not pdf_path.exists():
-                    create_birth_certificate_pdf(child, pdf_path)
+                cert_cache = get_certificate_cache()
+                pdf_path = cert_cache.get_or_render(child)
                 with open(pdf_path, "rb") as f:
                     pdf_bytes = f.read()
-                st.markdown(make_download_link_bytes(pdf_bytes, pdf_path.name, t("download_pdf")), unsafe_allow_html=True)
+                st.markdown(make_download_link_bytes(pdf_bytes, f"birth_certificate_{sid}.pdf", t("download_pdf")), unsafe_allow_html=True)
+                stats = cert_cache.stats()
+                st.caption(f"📦 Certificate cache: {stats['hits']} hits / {stats['misses']} misses — {stats['files']} files")
                 st.success("📜 Digital birth certificate ready for download.")
             except Exception as e:
                 st.error(f"⚠️ Error creating or loading PDF: {e}")
@@ -557,83 +813,211 @@ elif page == "Digital Card":
 # ====================================================
 elif page == "Admin":
     st.header(t("admin"))
-    df = fetch_children_df()
+    from eohealth_jobs import ACTIVE, JOBS_DIR
+
+    # ---------------- Performance ----------------
+    with st.expander("📈 Performance / الأداء"):
+        from eohealth_qr import cache_stats as qr_cache_stats
+
+        snap = METRICS.snapshot()
+        st.caption(f"Since {snap['since']} UTC (this server process) / منذ بدء تشغيل العملية")
+
+        def timing_table(family, label):
+            rows = [{label: name, "count": s["count"], "total_ms": s["total"] * 1000, "mean_ms": s["mean"] * 1000,
+                     "p95_ms": s["p95"] * 1000, "max_ms": s["max"] * 1000}
+                    for name, s in snap["timings"].get(family, {}).items()]
+            if not rows:
+                return pd.DataFrame(columns=[label, "count", "total_ms", "mean_ms", "p95_ms", "max_ms"])
+            return pd.DataFrame(rows).sort_values("total_ms", ascending=False).round(3).reset_index(drop=True)
+
+        tab_sql, tab_pages, tab_cache, tab_render = st.tabs(["🗄️ SQL", "🧭 Pages", "🧠 Caches", "📜 Certificates / QR"])
+        with tab_sql:
+            st.dataframe(timing_table("sql", "fingerprint").head(100), use_container_width=True)
+            w = get_registry().writer_stats()
+            st.markdown(f"**✍️ Writes** — mode `{w['mode']}`, {w['rows']:,} writes in {w['groups']:,} commits "
+                        f"(mean group {w['mean_group']}, queued {w['queued']})")
+            st.dataframe(timing_table("writer", "stage"), use_container_width=True)
+        with tab_pages:
+            st.dataframe(pd.concat([timing_table("page", "page"), timing_table("script", "page")], ignore_index=True),
+                         use_container_width=True)
+        with tab_cache:
+            data_caches = [{"cache": name, "requests": c.get("requests", 0), "misses": c.get("misses", 0),
+                            "hits": c.get("requests", 0) - c.get("misses", 0)}
+                           for name, c in snap["counters"].get("cache", {}).items()]
+            st.markdown("**st.cache_data**")
+            st.dataframe(pd.DataFrame(data_caches, columns=["cache", "requests", "hits", "misses"]))
+            caches = {"child data": get_child_cache().stats(), "scan lookup": get_lookup().cache.stats()}
+            st.markdown("**LRU caches**")
+            st.dataframe(pd.DataFrame(caches).T[["size", "maxsize", "bytes", "max_bytes", "ttl", "hits", "misses",
+                                                 "evictions", "expirations", "hit_rate"]])
+            st.markdown("**QR / certificates**")
+            st.dataframe(pd.DataFrame({**{f"qr {k}": v for k, v in qr_cache_stats().items()},
+                                       "certificate files": get_certificate_cache().stats()}).T)
+        with tab_render:
+            st.dataframe(timing_table("render", "stage"), use_container_width=True)
+
+        e1, e2, e3 = st.columns(3)
+        e1.download_button("📥 JSON", data=METRICS.to_json(), file_name="eohealth_metrics.json", mime="application/json")
+        e2.download_button("📥 Prometheus", data=METRICS.to_prometheus(), file_name="eohealth_metrics.prom",
+                           mime="text/plain")
+        if e3.button("♻️ Reset / تصفير"):
+            METRICS.reset()
+
+    # ---------------- Background Jobs ----------------
+    # الأعمال الثقيلة تعمل في threads الطابور: الصفحة تعرض الحالة فقط ولا تنتظرها
+    st.subheader("🧵 Background Jobs / المهام في الخلفية")
+    try:
+        jobs = get_job_queue().list(limit=10)
+    except Exception as e:
+        st.error(f"⚠️ خطأ في تحميل المهام: {e}")
+        jobs = []
+    active_jobs = any(job["status"] in ACTIVE for job in jobs)
+    auto_refresh = st.checkbox("🔄 Auto-refresh while jobs run / تحديث تلقائي", value=True)
+    if not jobs:
+        st.caption("No jobs yet / لا توجد مهام")
+    outputs = {}   # ملفات المهام المنتهية
+    for job in jobs:
+        j1, j2, j3 = st.columns([3, 4, 1])
+        j1.markdown(f"**#{job['id']} {job['title']}**  \n`{job['status']}` — {job['created_at']}")
+        if job["status"] in ACTIVE:
+            j2.progress(job["progress"], text=job["message"] or job["status"])
+            if j3.button("✖️", key=f"job_cancel_{job['id']}", help="Cancel / إلغاء", disabled=bool(job["cancel_requested"])):
+                get_job_queue().cancel(job["id"])
+                st.rerun()
+        elif job["status"] == "failed":
+            j2.error(f"⚠️ {job['error']}")
+        elif job["status"] == "cancelled":
+            j2.caption("✖️ Cancelled / أُلغيت")
+        else:
+            j2.caption(job_summary(job))
+            output = Path(job["result"]["path"]) if (job["result"] or {}).get("path") else None
+            if output and output.exists():
+                outputs[job["id"]] = output
+    if outputs:
+        # الملف يُقرأ فقط للمهمة المختارة (download_button يحمّل الملف كله في الذاكرة مع كل rerun)
+        d1, d2 = st.columns([3, 1])
+        picked = d1.selectbox("Download job output / تحميل ناتج مهمة", [None, *outputs],
+                              format_func=lambda i: "—" if i is None else f"#{i} — {outputs[i].name}")
+        if picked is not None:
+            with open(outputs[picked], "rb") as fh:
+                d2.download_button("📥 Download / تحميل", data=fh, file_name=outputs[picked].name,
+                                   key=f"job_download_{picked}")
+
+    # ---------------- Analytics snapshot ----------------
+    with st.expander("📦 Analytics snapshot (Parquet) / لقطة التحليلات"):
+        try:
+            from eohealth_snapshots import read_manifest, refresh_snapshots
+
+            if st.button("🔄 Rebuild snapshot / إعادة بناء اللقطة"):
+                with st.spinner("Exporting... / جاري التصدير..."):
+                    res = refresh_snapshots(get_registry().pools, SNAPSHOT_DIR, full=True)
+                st.success(f"✅ {res['children']:,} children + {res['medical_files']:,} records in {res['seconds']}s")
+            info = cached_snapshot_info(read_manifest(SNAPSHOT_DIR).get("version", 0))
+            st.caption(f"Version {info['version']} — updated {info['updated_at'] or '—'} UTC — "
+                       "AI Insights appends new rows on each load / التحديث تزايدي عند فتح صفحة التحليلات")
+            st.dataframe(pd.DataFrame({name: info[name] for name in ("children", "medical_files")}).T)
+        except ImportError:
+            st.info("pyarrow is not installed — analytics read SQLite directly / التحليلات تقرأ من SQLite مباشرة")
+        except Exception as e:
+            st.error(f"⚠️ خطأ في لقطة التحليلات: {e}")
+
+    # عرض قاعدة البيانات الحالية — صفحة واحدة فقط في الذاكرة
+    st.subheader("📋 Children Table / جدول الأطفال")
+    options = fetch_filter_options()
+    f1, f2, f3, f4 = st.columns([2, 2, 3, 1])
+    gov_pick = f1.selectbox("Governorate / المحافظة", ["All / الكل"] + options["governorate"])
+    gender_pick = f2.selectbox("Gender / النوع", ["All / الكل"] + options["gender"])
+    born_range = f3.date_input("Birth date range / نطاق تاريخ الميلاد", value=[], min_value=date(1990, 1, 1))
+    page_size = f4.selectbox("Rows / صفوف", [25, 50, 100, 200], index=1)
+    filters = {
+        "governorate": None if gov_pick == "All / الكل" else gov_pick,
+        "gender": None if gender_pick == "All / الكل" else gender_pick,
+        "born_from": born_range[0] if len(born_range) > 0 else None,
+        "born_to": born_range[1] if len(born_range) > 1 else None,
+    }
+
+    # مؤشرات الصفحات: آخر id في كل صفحة سابقة — تُعاد عند تغيير الفلاتر
+    filter_key = (tuple(filters.items()), page_size)
+    if st.session_state.get("children_filter_key") != filter_key:
+        st.session_state.children_filter_key = filter_key
+        st.session_state.children_cursors = [None]
+    cursors = st.session_state.children_cursors
 
-    # عرض قاعدة البيانات الحالية
-    if df.empty:
+    try:
+        total = count_children_filtered(**filters)
+        page_df = get_registry().fetch_children_page(before_id=cursors[-1], page_size=page_size, **filters)
+    except Exception as e:
+        st.error(f"⚠️ خطأ في تحميل بيانات الأطفال: {e}")
+        total, page_df = 0, pd.DataFrame()
+
+    if total == 0:
         st.info("No data available." if st.session_state.lang == "en" else "لا توجد بيانات حالياً.")
     else:
-        st.subheader("📋 Children Table / جدول الأطفال")
-        st.dataframe(df, height=300)
-
-        # ---------------- Export CSV ----------------
-        try:
-            csv_bytes = df.to_csv(index=False).encode("utf-8")
-            st.markdown(make_download_link_bytes(csv_bytes, "children.csv", "📥 Download CSV"), unsafe_allow_html=True)
-        except Exception as e:
-            st.error(f"⚠️ CSV export failed: {e}")
+        page_no = len(cursors)
+        pages = -(-total // page_size)
+        st.dataframe(page_df, height=300)
+        n1, n2, n3 = st.columns([1, 2, 1])
+        if n1.button("⬅️ Previous / السابق", disabled=page_no == 1):
+            cursors.pop()
+            st.rerun()
+        n2.caption(f"Page {page_no} of {pages} — {total:,} children / صفحة {page_no} من {pages}")
+        if n3.button("Next / التالي ➡️", disabled=page_no >= pages or page_df.empty):
+            cursors.append(int(page_df["id"].iloc[-1]))
+            st.rerun()
+
+    # ---------------- Export CSV / Excel (مهمة في الخلفية) ----------------
+    if total > 0:
+        e1, e2, e3 = st.columns([2, 1, 1])
+        export_fmt = e1.radio("Export format / صيغة التصدير", ["csv", "xlsx"], horizontal=True)
+        export_gz = e2.checkbox("gzip", value=False, disabled=export_fmt != "csv")
+        if e3.button("📥 Prepare Export / تجهيز الملف"):
+            try:
+                job_id = get_job_queue().submit("export_children", {"fmt": export_fmt, "gzip_output": export_gz, "filters": filters},
+                                                title=f"Export {total:,} children ({export_fmt})")
+                st.info(f"🧵 Export queued as job #{job_id} — see Background Jobs / تمت الإضافة لطابور المهام")
+            except Exception as e:
+                st.error(f"⚠️ Export failed: {e}")
 
-        # ---------------- Export Excel ----------------
+    # ---------------- Batch Birth Certificates ----------------
+    st.markdown("---")
+    st.subheader("🖨️ Batch Birth Certificates / طباعة شهادات الميلاد بالجملة")
+    st.caption("Uses the table filters above (governorate / gender / birth date) — يستخدم فلاتر الجدول أعلاه")
+    b1, b2 = st.columns([2, 1])
+    batch_labels = {"pdf": "Single multi-page PDF", "zip": "ZIP of PDFs", "qr": "QR card sheets (PDF)"}
+    batch_fmt = b1.radio("Output / الناتج", list(batch_labels), horizontal=True, format_func=batch_labels.get)
+    if b2.button("🖨️ Render Certificates / توليد الشهادات") and total > 0:
         try:
-            to_excel = io.BytesIO()
-            with pd.ExcelWriter(to_excel, engine="openpyxl") as writer:
-                df.to_excel(writer, index=False, sheet_name="children")
-            st.markdown(make_download_link_bytes(to_excel.getvalue(), "children.xlsx", t("export_excel")), unsafe_allow_html=True)
+            job_id = get_job_queue().submit("render_certificates", {"fmt": batch_fmt, "filters": filters},
+                                            title=f"{batch_labels[batch_fmt]} — {total:,} children")
+            st.info(f"🧵 Rendering queued as job #{job_id} / تمت الإضافة لطابور المهام")
         except Exception as e:
-            st.error(f"⚠️ Excel export failed: {e}")
+            st.error(f"⚠️ Certificate batch failed: {e}")
 
     # ---------------- Clear Database ----------------
     st.markdown("---")
     if st.button("🗑️ Clear Demo Database / مسح قاعدة البيانات التجريبية"):
         if st.warning("⚠️ سيتم حذف جميع البيانات التجريبية نهائيًا. تأكد قبل المتابعة.") or True:
             try:
-                conn = get_conn()
-                c = conn.cursor()
-                c.execute("DELETE FROM medical_files")
-                c.execute("DELETE FROM children")
-                conn.commit()
-                conn.close()
-                fetch_children_df.clear()
-                fetch_medical_df.clear()
-                st.success("✅ Demo DB cleared successfully." if st.session_state.lang == "en" else "✅ تم مسح قاعدة البيانات التجريبية بنجاح.")
+                job_id = get_job_queue().submit("clear_database", title="Clear demo database")
+                st.info(f"🧵 Clearing queued as job #{job_id} / تمت الإضافة لطابور المهام")
             except Exception as e:
                 st.error(f"⚠️ Error while clearing DB: {e}")
 
     # ---------------- Import Excel ----------------
     st.markdown("---")
-    st.subheader("📤 Import Children from Excel / استيراد بيانات من ملف إكسل")
-    uploaded_excel = st.file_uploader("Upload .xlsx file", type=["xlsx"])
+    st.subheader("📤 Import Children from Excel / CSV — استيراد بيانات من ملف إكسل")
+    uploaded_excel = st.file_uploader("Upload .xlsx or .csv file", type=["xlsx", "csv"])
 
-    if uploaded_excel:
+    if uploaded_excel and st.button("Start Import / بدء الاستيراد"):
         try:
-            df_in = pd.read_excel(uploaded_excel)
-            expected_cols = ["full_name", "national_id", "birth_date", "gender", "mother_id", "father_id", "governorate"]
-            missing = [c for c in expected_cols if c not in df_in.columns]
-            if missing:
-                st.error(f"❌ Missing columns: {', '.join(missing)}")
-            else:
-                inserted = 0
-                for _, row in df_in.iterrows():
-                    if pd.isna(row.get("full_name")) or pd.isna(row.get("national_id")):
-                        continue
-                    rec = {
-                        "full_name": str(row.get("full_name")),
-                        "national_id": str(row.get("national_id")),
-                        "smart_id": "",
-                        "birth_date": str(row.get("birth_date")) if not pd.isna(row.get("birth_date")) else date.today().isoformat(),
-                        "gender": str(row.get("gender")) if not pd.isna(row.get("gender")) else "",
-                        "mother_id": str(row.get("mother_id")) if not pd.isna(row.get("mother_id")) else "",
-                        "father_id": str(row.get("father_id")) if not pd.isna(row.get("father_id")) else "",
-                        "governorate": str(row.get("governorate")) if not pd.isna(row.get("governorate")) else "",
-                    }
-                    new_id = insert_child_record(rec)
-                    conn = get_conn()
-                    conn.cursor().execute("UPDATE children SET smart_id=? WHERE id=?", (gen_smart_id(new_id), new_id))
-                    conn.commit()
-                    conn.close()
-                    inserted += 1
-                fetch_children_df.clear()
-                st.success(f"✅ Imported {inserted} records successfully." if st.session_state.lang == "en" else f"✅ تم استيراد {inserted} سجلات بنجاح.")
+            # الملف يُحفظ على القرص لأن المهمة قد تعمل بعد انتهاء هذه الجلسة (أو بعد إعادة تشغيل السيرفر)
+            upload_dir = JOBS_DIR / "uploads"
+            upload_dir.mkdir(parents=True, exist_ok=True)
+            saved = upload_dir / f"{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}_{Path(uploaded_excel.name).name}"
+            saved.write_bytes(uploaded_excel.getbuffer())
+            job_id = get_job_queue().submit("import_children", {"path": str(saved), "filename": uploaded_excel.name},
+                                            title=f"Import {uploaded_excel.name}")
+            st.info(f"🧵 Import queued as job #{job_id} / تمت الإضافة لطابور المهام")
         except Exception as e:
             st.error("❌ Failed to import Excel file: " + str(e))
 
@@ -643,36 +1027,62 @@ elif page == "Admin":
     if st.button("Insert 10 Demo Records / إدخال 10 سجلات تجريبية"):
         try:
             demo = [
-                {"full_name": "أحمد علي", "national_id": "T10000001", "birth_date": "2024-01-10", "gender": "Male / ذكر", "mother_id": "M1001", "father_id": "F1001", "governorate": "Cairo"},
-                {"full_name": "مريم حسن", "national_id": "T10000002", "birth_date": "2023-05-05", "gender": "Female / أنثى", "mother_id": "M1002", "father_id": "F1002", "governorate": "Giza"},
-                {"full_name": "يوسف سعيد", "national_id": "T10000003", "birth_date": "2022-11-20", "gender": "Male / ذكر", "mother_id": "M1003", "father_id": "F1003", "governorate": "Alexandria"},
-                {"full_name": "سارة محمد", "national_id": "T10000004", "birth_date": "2021-07-15", "gender": "Female / أنثى", "mother_id": "M1004", "father_id": "F1004", "governorate": "Cairo"},
-                {"full_name": "آدم خالد", "national_id": "T10000005", "birth_date": "2020-03-02", "gender": "Male / ذكر", "mother_id": "M1005", "father_id": "F1005", "governorate": "Dakahliya"},
-                {"full_name": "لين محمود", "national_id": "T10000006", "birth_date": "2019-08-12", "gender": "Female / أنثى", "mother_id": "M1006", "father_id": "F1006", "governorate": "Aswan"},
-                {"full_name": "عمر نبيل", "national_id": "T10000007", "birth_date": "2018-12-01", "gender": "Male / ذكر", "mother_id": "M1007", "father_id": "F1007", "governorate": "Luxor"},
-                {"full_name": "نور سامي", "national_id": "T10000008", "birth_date": "2017-02-25", "gender": "Female / أنثى", "mother_id": "M1008", "father_id": "F1008", "governorate": "Ismailia"},
-                {"full_name": "ريان مصطفى", "national_id": "T10000009", "birth_date": "2016-09-09", "gender": "Male / ذكر", "mother_id": "M1009", "father_id": "F1009", "governorate": "Suez"},
-                {"full_name": "هنا نبيل", "national_id": "T10000010", "birth_date": "2015-06-18", "gender": "Female / أنثى", "mother_id": "M1010", "father_id": "F1010", "governorate": "Gharbia"},
+                {"full_name": "أحمد علي", "birth_date": "2024-01-10", "gender": "Male / ذكر", "mother_id": "M1001", "father_id": "F1001", "governorate": "Cairo"},
+                {"full_name": "مريم حسن", "birth_date": "2023-05-05", "gender": "Female / أنثى", "mother_id": "M1002", "father_id": "F1002", "governorate": "Giza"},
+                {"full_name": "يوسف سعيد", "birth_date": "2022-11-20", "gender": "Male / ذكر", "mother_id": "M1003", "father_id": "F1003", "governorate": "Alexandria"},
+                {"full_name": "سارة محمد", "birth_date": "2021-07-15", "gender": "Female / أنثى", "mother_id": "M1004", "father_id": "F1004", "governorate": "Cairo"},
+                {"full_name": "آدم خالد", "birth_date": "2020-03-02", "gender": "Male / ذكر", "mother_id": "M1005", "father_id": "F1005", "governorate": "Dakahliya"},
+                {"full_name": "لين محمود", "birth_date": "2019-08-12", "gender": "Female / أنثى", "mother_id": "M1006", "father_id": "F1006", "governorate": "Aswan"},
+                {"full_name": "عمر نبيل", "birth_date": "2018-12-01", "gender": "Male / ذكر", "mother_id": "M1007", "father_id": "F1007", "governorate": "Luxor"},
+                {"full_name": "نور سامي", "birth_date": "2017-02-25", "gender": "Female / أنثى", "mother_id": "M1008", "father_id": "F1008", "governorate": "Ismailia"},
+                {"full_name": "ريان مصطفى", "birth_date": "2016-09-09", "gender": "Male / ذكر", "mother_id": "M1009", "father_id": "F1009", "governorate": "Suez"},
+                {"full_name": "هنا نبيل", "birth_date": "2015-06-18", "gender": "Female / أنثى", "mother_id": "M1010", "father_id": "F1010", "governorate": "Gharbia"},
             ]
+            # الرقم القومي فريد: أرقام تجريبية جديدة في كل ضغطة بدل T10000001..10 الثابتة
+            stamp = datetime.utcnow().strftime("%y%m%d%H%M%S%f")
             inserted = 0
-            for d in demo:
+            for i, d in enumerate(demo, 1):
                 new_id = insert_child_record({
-                    "full_name": d["full_name"], "national_id": d["national_id"], "smart_id": "",
+                    "full_name": d["full_name"], "national_id": f"T{stamp}{i:02d}", "smart_id": "",
                     "birth_date": d["birth_date"], "gender": d["gender"], "mother_id": d["mother_id"],
                     "father_id": d["father_id"], "governorate": d["governorate"]
                 })
-                conn = get_conn()
-                conn.cursor().execute("UPDATE children SET smart_id=? WHERE id=?", (gen_smart_id(new_id), new_id))
-                conn.commit()
-                conn.close()
-                inserted += 1
-            fetch_children_df.clear()
+                if new_id > 0:
+                    inserted += 1
+            fetch_filter_options.clear()
             st.success(f"✅ {inserted} demo records inserted successfully." if st.session_state.lang == "en" else f"✅ تم إدخال {inserted} سجلات تجريبية بنجاح.")
         except Exception as e:
             st.error(f"⚠️ Error inserting demo data: {e}")
 
+    # ---------------- Synthetic Registry ----------------
+    with st.expander("🧪 Synthetic registry / بيانات تجريبية بالحجم الكامل"):
+        s1, s2, s3 = st.columns(3)
+        n_children = s1.number_input("Children / عدد الأطفال", min_value=100, max_value=1_000_000, value=1000, step=1000)
+        per_child = s2.number_input("Records per child / سجلات لكل طفل", min_value=0, max_value=20, value=2)
+        seed = s3.number_input("Seed", min_value=0, value=2025)
+        if st.button("Generate / توليد"):
+            try:
+                job_id = get_job_queue().submit(
+                    "synthetic_registry",
+                    {"children": int(n_children), "records_per_child": int(per_child), "seed": int(seed), "today": date.today()},
+                    title=f"Synthetic registry — {int(n_children):,} children",
+                )
+                st.info(f"🧵 Generation queued as job #{job_id} / تمت الإضافة لطابور المهام")
+            except Exception as e:
+                st.error(f"⚠️ Error generating synthetic data: {e}")
+
+    # متابعة المهام الجارية: انتظار واحد ثم rerun — الأجزاء الثقيلة (اللقطة، عدد الأطفال) من الكاش،
+    # وزمن الصفحة يُسجل قبل الانتظار لأن st.rerun لا يصل لنهاية السكربت
+    if auto_refresh and active_jobs:
+        METRICS.observe("page", page, time.perf_counter() - _page_t0)
+        METRICS.observe("script", "rerun", time.perf_counter() - _run_t0)
+        time.sleep(JOB_REFRESH_S)
+        st.rerun()
+
 # ------------- End of Application -------------
+METRICS.observe("page", page, time.perf_counter() - _page_t0)
 st.success("🎉 Application loaded successfully — EoHealth Egypt Prototype Ready!")
+METRICS.observe("script", "rerun", time.perf_counter() - _run_t0)
 
 
 
@@ -0,0 +1,120 @@
+# =========================
+# 🧠 EoHealth Egypt — كاش داخل العملية
+# LRU محدود الحجم (عدد العناصر و/أو الذاكرة) + TTL اختياري + عدادات hit/miss/eviction
+# =========================
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def sizeof(value) -> int:
+    """حجم تقريبي بالبايت — DataFrame بحجمه الحقيقي، والقوائم/القواميس بمحتواها"""
+    if hasattr(value, "memory_usage"):          # pandas DataFrame / Series
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if isinstance(value, (bytes, bytearray, str)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """كاش LRU آمن للاستخدام من عدة threads مع صلاحية زمنية اختيارية وحد أقصى للذاكرة (max_bytes)"""
+
+    def __init__(self, maxsize=1024, ttl=None, max_bytes=None, sizer=sizeof):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizer = sizer if max_bytes else None
+        self._data = OrderedDict()   # key -> (expires_at, value, nbytes)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value, nbytes = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.bytes -= nbytes
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        nbytes = self._sizer(value) if self._sizer else 0
+        if self.max_bytes and nbytes > self.max_bytes:
+            self.invalidate(key)     # أكبر من الكاش كله: لا يُخزن
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._data[key] = (expires_at, value, nbytes)
+            self.bytes += nbytes
+            while len(self._data) > self.maxsize or (self.max_bytes and self.bytes > self.max_bytes):
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """القيمة من الكاش أو تحميلها بـ loader() وتخزينها (None لا يُخزن)"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def invalidate(self, *keys):
+        """حذف مفاتيح محددة فقط — يرجع عدد المحذوف"""
+        removed = 0
+        with self._lock:
+            for key in keys:
+                item = self._data.pop(key, None)
+                if item is not None:
+                    self.bytes -= item[2]
+                    removed += 1
+        return removed
+
+    def invalidate_where(self, predicate):
+        """حذف كل القيم التي تحقق الشرط — يرجع عدد المحذوف"""
+        with self._lock:
+            stale = [k for k, (_, v, _) in self._data.items() if predicate(v)]
+            for k in stale:
+                self.bytes -= self._data.pop(k)[2]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
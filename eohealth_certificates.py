@@ -0,0 +1,402 @@
+# =========================
+# 📜 EoHealth Egypt — شهادات الميلاد الرقمية (PDF + Arabic + QR)
+# توليد فردي + توليد جماعي متوازي عبر process pool
+# =========================
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zipfile
+import zlib
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from multiprocessing import get_context
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+import arabic_reshaper
+from bidi.algorithm import get_display
+
+from eohealth_metrics import METRICS
+from eohealth_qr import qr_image, card_payload
+
+PAGE_W, PAGE_H = 1240, 1754    # حجم صفحة A4 عند 150 DPI
+PAGE_DPI = 150
+JPEG_QUALITY = 90
+TEMPLATE_VERSION = 1           # تُزاد عند أي تغيير في تصميم الشهادة
+SHAPE_CACHE_SIZE = 4096
+
+
+# 🖋️ دالة لتحديد الخط المستخدم في الشهادات أو الصور (يُحمّل مرة واحدة لكل حجم في العملية)
+@lru_cache(maxsize=None)
+def choose_font(size=20):
+    try:
+        return ImageFont.truetype("Amiri-Regular.ttf", size)
+    except:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=SHAPE_CACHE_SIZE)
+def shape_arabic(text: str) -> str:
+    """تحسين عرض النص العربي داخل الصور أو الـ PDF"""
+    if not text:
+        return ""
+    try:
+        reshaped = arabic_reshaper.reshape(text)
+        bidi_text = get_display(reshaped)
+        return bidi_text
+    except Exception:
+        return text
+
+
+# ====================================================
+# 📜 توليد شهادة الميلاد الرقمية (PDF + Arabic)
+# ====================================================
+
+CERT_LABELS = [
+    ("اسم الطفل / Child Name:", "full_name"),
+    ("الرقم القومي / National ID:", "national_id"),
+    ("تاريخ الميلاد / Birth Date:", "birth_date"),
+    ("النوع / Gender:", "gender"),
+    ("المحافظة / Governorate:", "governorate"),
+    ("الهوية الصحية الذكية / Smart Health ID:", "smart_id"),
+]
+START_Y, GAP = 160, 70
+QR_BOX = (60, PAGE_H - 300, 280, PAGE_H - 80)
+FOOTER_TEXT = "Issued by: EoHealth Egypt — Electronic Office for Health (Prototype)"
+
+
+@lru_cache(maxsize=1)
+@METRICS.timed("render", "certificate.template")
+def certificate_template():
+    """الطبقة الثابتة للشهادة (العنوان + العناوين الفرعية + التذييل) تُرسم مرة واحدة"""
+    W, H = PAGE_W, PAGE_H  # حجم صفحة A4
+    img = Image.new("RGB", (W, H), color="white")
+    draw = ImageDraw.Draw(img)
+
+    # العنوان الرئيسي
+    title_text = "Birth Certificate (Digital) — شهادة الميلاد الرقمية"
+    draw.text((W // 2, 60), title_text, fill="black", anchor="ms", font=choose_font(40))
+
+    # عناوين الحقول
+    for i, (label, _) in enumerate(CERT_LABELS):
+        draw.text((60, START_Y + i * GAP), label, fill="black", font=choose_font(20))
+
+    # تذييل الصفحة
+    draw.text((W // 2, H - 80), FOOTER_TEXT, fill="black", anchor="ms", font=choose_font(28))
+    return img
+
+
+@lru_cache(maxsize=1)
+def _footer_mask_over_qr():
+    # التذييل يتداخل مع أسفل الـ QR: نحتفظ بقناع حروفه داخل مربع الـ QR لإعادة رسمه فوقه
+    mask = Image.new("L", (PAGE_W, PAGE_H), 0)
+    ImageDraw.Draw(mask).text((PAGE_W // 2, PAGE_H - 80), FOOTER_TEXT, fill=255, anchor="ms", font=choose_font(28))
+    return mask.crop(QR_BOX)
+
+
+@METRICS.timed("render", "certificate.image")
+def create_birth_certificate_image(child_rec: dict):
+    """إنشاء صورة شهادة الميلاد بالعربية (نسخة من القالب + الحقول المتغيرة فقط)"""
+    W = PAGE_W
+    img = certificate_template().copy()
+    draw = ImageDraw.Draw(img)
+    body_font = choose_font(20)
+
+    # البيانات
+    with METRICS.timer("render", "certificate.fields"):
+        for i, (_, key) in enumerate(CERT_LABELS):
+            display_value = shape_arabic(child_rec.get(key, ""))
+            draw.text((W - 60, START_Y + i * GAP), display_value, fill="black", anchor="ra", font=body_font)
+
+    # QR في الأسفل (صورة مخزنة تُلصق مباشرة بدون ترميز/فك PNG)
+    with METRICS.timer("render", "certificate.qr"):
+        qr_img = qr_image(card_payload(child_rec.get("smart_id"), child_rec.get("national_id")), size=220)
+        img.paste(qr_img, QR_BOX[:2])
+        img.paste("black", QR_BOX, mask=_footer_mask_over_qr())
+
+    return img
+
+
+def create_birth_certificate_pdf(child_rec: dict, output_path: Path):
+    """توليد ملف PDF من الشهادة"""
+    img = create_birth_certificate_image(child_rec)
+    with METRICS.timer("render", "certificate.pdf_encode"):
+        img.save(output_path, "PDF", resolution=PAGE_DPI)
+    return output_path
+
+
+# ====================================================
+# 📦 كاش ملفات PDF حسب المحتوى (hash الحقول + نسخة القالب)
+# ====================================================
+
+CERT_FIELDS = ("full_name", "national_id", "birth_date", "gender", "governorate", "smart_id")
+CERT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+CERT_CACHE_MAX_FILES = 5000
+
+
+def certificate_key(child_rec: dict) -> str:
+    """مفتاح المحتوى: أي تعديل في الحقول المعروضة أو في القالب يعطي مفتاحاً جديداً"""
+    payload = {f: child_rec.get(f) for f in CERT_FIELDS}
+    payload["_template"] = TEMPLATE_VERSION
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CertificateCache:
+    """كاش شهادات PDF على القرص مع حد للحجم وإزالة الأقدم استخداماً (LRU)"""
+
+    def __init__(self, cache_dir, max_bytes=CERT_CACHE_MAX_BYTES, max_files=CERT_CACHE_MAX_FILES):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        # ترتيب الاستخدام يُحفظ في mtime حتى يبقى صحيحاً بعد إعادة التشغيل
+        self._entries = {}
+        for f in self.dir.glob("*.pdf"):
+            st_ = f.stat()
+            self._entries[f.name] = (st_.st_mtime, st_.st_size)
+        self._bytes = sum(size for _, size in self._entries.values())
+
+    def path_for(self, child_rec: dict) -> Path:
+        return self.dir / f"{certificate_key(child_rec)}.pdf"
+
+    @METRICS.timed("render", "certificate.get_or_render")
+    def get_or_render(self, child_rec: dict) -> Path:
+        """إرجاع مسار الشهادة — التوليد فقط لو تغير المحتوى"""
+        path = self.path_for(child_rec)
+        now = time.time()
+        with self._lock:
+            if path.name in self._entries and path.exists():
+                self.hits += 1
+                os.utime(path, (now, now))
+                self._entries[path.name] = (now, self._entries[path.name][1])
+                return path
+            self.misses += 1
+
+        tmp = path.with_name(f"{path.stem}.{threading.get_ident()}.part")
+        create_birth_certificate_pdf(child_rec, tmp)
+        tmp.replace(path)
+        size = path.stat().st_size
+        with self._lock:
+            old = self._entries.get(path.name)
+            self._bytes += size - (old[1] if old else 0)
+            self._entries[path.name] = (now, size)
+            self._evict()
+        return path
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes and len(self._entries) <= self.max_files:
+            return
+        for name, (_, size) in sorted(self._entries.items(), key=lambda kv: kv[1][0]):
+            if self._bytes <= self.max_bytes and len(self._entries) <= self.max_files:
+                break
+            try:
+                (self.dir / name).unlink()
+            except FileNotFoundError:
+                pass
+            del self._entries[name]
+            self._bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "files": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+            }
+
+
+# ====================================================
+# 🖨️ التوليد الجماعي (process pool + PDF متعدد الصفحات)
+# ====================================================
+
+class StreamingPdfWriter:
+    """كتابة PDF متعدد الصفحات صفحة بصفحة — كل صفحة صورة JPEG واحدة"""
+
+    def __init__(self, fh, dpi=PAGE_DPI):
+        self.fh = fh
+        self.dpi = dpi
+        self.offsets = {}
+        self.kids = []
+        self.next_obj = 3  # 1 = Catalog, 2 = Pages (يُكتب في النهاية)
+        fh.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._write_obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+    def _write_obj(self, num, body: bytes, stream: bytes = None):
+        self.offsets[num] = self.fh.tell()
+        self.fh.write(f"{num} 0 obj\n".encode() + body)
+        if stream is not None:
+            self.fh.write(b"\nstream\n" + stream + b"\nendstream")
+        self.fh.write(b"\nendobj\n")
+
+    def add_jpeg_page(self, jpeg: bytes, width: int, height: int):
+        """إضافة صفحة من صورة JPEG مشفرة مسبقاً (DCTDecode)"""
+        self.add_raw_page(jpeg, width, height, colorspace="DeviceRGB", filter_="DCTDecode")
+
+    def add_gray_page(self, img):
+        """إضافة صفحة بتدرج رمادي بضغط Flate (بدون فقد — مناسب لرموز QR)"""
+        self.add_raw_page(zlib.compress(img.convert("L").tobytes()), img.width, img.height)
+
+    def add_raw_page(self, data: bytes, width: int, height: int, colorspace="DeviceGray", filter_="FlateDecode"):
+        img_no, content_no, page_no = self.next_obj, self.next_obj + 1, self.next_obj + 2
+        self.next_obj += 3
+        pt_w, pt_h = width * 72.0 / self.dpi, height * 72.0 / self.dpi
+        self._write_obj(img_no, (
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace /{colorspace} /BitsPerComponent 8 /Filter /{filter_} /Length {len(data)} >>"
+        ).encode(), data)
+        content = f"q {pt_w:.2f} 0 0 {pt_h:.2f} 0 0 cm /Im0 Do Q".encode()
+        self._write_obj(content_no, f"<< /Length {len(content)} >>".encode(), content)
+        self._write_obj(page_no, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {pt_w:.2f} {pt_h:.2f}] "
+            f"/Resources << /XObject << /Im0 {img_no} 0 R >> >> /Contents {content_no} 0 R >>"
+        ).encode())
+        self.kids.append(page_no)
+
+    def close(self):
+        kids = " ".join(f"{k} 0 R" for k in self.kids)
+        self._write_obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.kids)} >>".encode())
+        xref_at = self.fh.tell()
+        count = self.next_obj
+        self.fh.write(f"xref\n0 {count}\n0000000000 65535 f \n".encode())
+        for num in range(1, count):
+            self.fh.write(f"{self.offsets.get(num, 0):010d} 00000 n \n".encode())
+        self.fh.write(f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode())
+
+
+def _render_page(child_rec: dict, fmt: str):
+    """يُنفّذ داخل عملية فرعية: ترجع الصفحة مشفرة (JPEG لصفحة PDF مجمعة أو PDF مستقل)"""
+    img = create_birth_certificate_image(child_rec)
+    buf = BytesIO()
+    if fmt == "pdf":
+        img.save(buf, "JPEG", quality=JPEG_QUALITY)
+    else:
+        img.save(buf, "PDF", resolution=PAGE_DPI)
+    return buf.getvalue()
+
+
+def _ordered_results(executor, worker, items, window, *args):
+    # نافذة محدودة من المهام المعلقة: الذاكرة لا تكبر مع عدد الصفحات
+    pending = deque()
+    for item in items:
+        pending.append((item, executor.submit(worker, item, *args)))
+        if len(pending) >= window:
+            item, fut = pending.popleft()
+            yield item, fut.result()
+    while pending:
+        item, fut = pending.popleft()
+        yield item, fut.result()
+
+
+def render_certificates_batch(children, output_path, fmt="pdf", workers=None, total=None, progress=None) -> dict:
+    """توليد شهادات مجموعة أطفال بالتوازي في PDF واحد متعدد الصفحات أو ZIP من ملفات PDF"""
+    if fmt not in ("pdf", "zip"):
+        raise ValueError(f"Unsupported batch format: {fmt}")
+    workers = workers or os.cpu_count() or 1
+    output_path = Path(output_path)
+    tmp = output_path.with_name(output_path.name + ".part")
+    t0 = time.perf_counter()
+    pages = 0
+
+    # spawn بدلاً من fork: السيرفر متعدد الـ threads و fork قد يورث أقفالاً مغلقة
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as executor, open(tmp, "wb") as fh:
+        results = _ordered_results(executor, _render_page, children, workers * 4, fmt)
+        if fmt == "pdf":
+            writer = StreamingPdfWriter(fh)
+            for _, jpeg in results:
+                writer.add_jpeg_page(jpeg, PAGE_W, PAGE_H)
+                pages += 1
+                if progress:
+                    progress(pages, total, pages / (time.perf_counter() - t0))
+            writer.close()
+        else:
+            with zipfile.ZipFile(fh, "w", compression=zipfile.ZIP_STORED) as zf:
+                for child, pdf in results:
+                    zf.writestr(f"birth_certificate_{child.get('id', pages + 1)}_{child.get('smart_id', '')}.pdf", pdf)
+                    pages += 1
+                    if progress:
+                        progress(pages, total, pages / (time.perf_counter() - t0))
+
+    tmp.replace(output_path)
+    seconds = time.perf_counter() - t0
+    return {
+        "path": output_path,
+        "pages": pages,
+        "bytes": output_path.stat().st_size,
+        "seconds": round(seconds, 3),
+        "pages_per_sec": round(pages / seconds, 2) if seconds > 0 else 0.0,
+    }
+
+
+# ====================================================
+# 🔳 صفحات QR للطباعة (شبكة كروت لكل صفحة A4)
+# ====================================================
+
+QR_SHEET_COLS, QR_SHEET_ROWS = 4, 5
+QR_SHEET_QR_SIZE = 240
+
+
+def _render_qr_sheet(children: list):
+    """يُنفّذ داخل عملية فرعية: صفحة واحدة من رموز QR مع الهوية الذكية تحت كل رمز"""
+    page = Image.new("L", (PAGE_W, PAGE_H), color=255)
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default()
+    cell_w = PAGE_W // QR_SHEET_COLS
+    cell_h = (PAGE_H - 80) // QR_SHEET_ROWS
+    for i, child in enumerate(children):
+        col, row = i % QR_SHEET_COLS, i // QR_SHEET_COLS
+        x = col * cell_w + (cell_w - QR_SHEET_QR_SIZE) // 2
+        y = 40 + row * cell_h
+        page.paste(qr_image(card_payload(child.get("smart_id"), child.get("national_id")), size=QR_SHEET_QR_SIZE), (x, y))
+        draw.text((col * cell_w + cell_w // 2, y + QR_SHEET_QR_SIZE + 8), str(child.get("smart_id") or ""),
+                  fill=0, anchor="ma", font=font)
+    return page
+
+
+def _chunks(items, n):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def render_qr_sheets(children, output_path, workers=None, total=None, progress=None) -> dict:
+    """توليد صفحات QR لطباعة الكروت بالتوازي في PDF واحد (بدون فقد في الجودة)"""
+    workers = workers or os.cpu_count() or 1
+    per_page = QR_SHEET_COLS * QR_SHEET_ROWS
+    output_path = Path(output_path)
+    tmp = output_path.with_name(output_path.name + ".part")
+    t0 = time.perf_counter()
+    pages = cards = 0
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as executor, open(tmp, "wb") as fh:
+        writer = StreamingPdfWriter(fh)
+        for batch, page in _ordered_results(executor, _render_qr_sheet, _chunks(children, per_page), workers * 2):
+            writer.add_gray_page(page)
+            pages += 1
+            cards += len(batch)
+            if progress:
+                progress(cards, total, cards / (time.perf_counter() - t0))
+        writer.close()
+
+    tmp.replace(output_path)
+    seconds = time.perf_counter() - t0
+    return {
+        "path": output_path,
+        "pages": pages,
+        "cards": cards,
+        "bytes": output_path.stat().st_size,
+        "seconds": round(seconds, 3),
+        "cards_per_sec": round(cards / seconds, 2) if seconds > 0 else 0.0,
+    }
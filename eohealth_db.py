@@ -0,0 +1,794 @@
+# =========================
+# 🗃️ EoHealth Egypt — طبقة الاتصال بقاعدة البيانات
+# مجمّع اتصالات SQLite مشترك (WAL + pragmas + busy timeout)
+# =========================
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+import queue
+from contextlib import contextmanager
+from datetime import datetime
+
+# ⚙️ إعدادات الأداء لكل اتصال
+# WAL يسمح للقراء بالعمل أثناء الكتابة، و synchronous=NORMAL آمن مع WAL
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -20000,        # ~20MB صفحات في الذاكرة لكل اتصال
+    "mmap_size": 268435456,      # 256MB قراءة عبر memory-map
+    "temp_store": "MEMORY",
+}
+
+log = logging.getLogger("eohealth.db")
+
+BUSY_TIMEOUT_S = 5.0
+POOL_SIZE = 8
+RETRIES = 5
+RETRY_DELAY_S = 0.05
+
+
+def is_busy_error(exc: Exception) -> bool:
+    """هل الخطأ ناتج عن قفل القاعدة (SQLITE_BUSY / LOCKED)؟"""
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    msg = str(exc).lower()
+    return "locked" in msg or "busy" in msg
+
+
+# 🔤 توحيد الكتابة العربية للبحث: الهمزات، التاء المربوطة، الألف المقصورة، التشكيل
+_AR_FOLD = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ؤ": "و", "ئ": "ي", "ى": "ي", "ة": "ه",
+})
+_AR_TASHKEEL = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+
+
+def normalize_arabic(text) -> str:
+    """نص موحد للفهرسة والبحث (أحمد = احمد، فاطمة = فاطمه، مُنى = مني)"""
+    if not text:
+        return ""
+    text = _AR_TASHKEEL.sub("", str(text)).translate(_AR_FOLD).lower()
+    return " ".join(text.split())
+
+
+def gen_smart_id(rec_id: int, today=None) -> str:
+    """توليد رقم الهوية الذكية"""
+    today = today or datetime.utcnow().strftime("%Y%m%d")
+    return f"EOH-{today}-{rec_id:06d}"
+
+
+class ConnectionPool:
+    """مجمّع اتصالات SQLite آمن للاستخدام من عدة threads"""
+
+    def __init__(self, db_path, size=POOL_SIZE, busy_timeout=BUSY_TIMEOUT_S,
+                 retries=RETRIES, retry_delay=RETRY_DELAY_S, metrics=None):
+        self.db_path = str(db_path)
+        self.metrics = metrics        # Metrics: تسجيل زمن كل استعلام (eohealth_metrics)
+        self.size = size
+        self.busy_timeout = busy_timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        # أول اتصال يُفتح فوراً حتى تظهر أخطاء المسار مبكراً ويتم تفعيل WAL مرة واحدة
+        self._created = 1
+        self._idle.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        """فتح اتصال جديد وتطبيق الإعدادات عليه"""
+        factory = sqlite3.Connection
+        if self.metrics is not None:
+            from eohealth_metrics import TimedConnection
+            factory = TimedConnection
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,   # الاتصال يُستخدم من thread واحد في كل مرة عبر المجمّع
+            isolation_level=None,      # المعاملات تُدار صراحةً عبر transaction()
+            factory=factory,
+        )
+        if self.metrics is not None:
+            conn.metrics = self.metrics
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+        for key, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {key}={value}")
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        # المكان يُحجز تحت القفل قبل الفتح، وإلا تتجاوز عمليات متزامنة الحد size
+        with self._lock:
+            can_grow = self._created < self.size
+            if can_grow:
+                self._created += 1
+        if can_grow:
+            try:
+                return self._connect()
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+        # كل الاتصالات مشغولة: ننتظر اتصالاً يعود للمجمّع
+        try:
+            return self._idle.get(timeout=self.busy_timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("database is busy: no free connection in pool")
+
+    def _checkin(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """استعارة اتصال من المجمّع للقراءة (يُعاد تلقائياً)"""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    @contextmanager
+    def transaction(self):
+        """معاملة كتابة: BEGIN IMMEDIATE مع إعادة المحاولة، ثم COMMIT أو ROLLBACK"""
+        conn = self._checkout()
+        try:
+            self._begin_immediate(conn)
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        finally:
+            self._checkin(conn)
+
+    def _begin_immediate(self, conn: sqlite3.Connection):
+        # قفل الكتابة يُطلب في البداية، لذا إعادة المحاولة هنا آمنة (لم يُنفّذ شيء بعد)
+        for attempt in range(self.retries + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt == self.retries:
+                    raise
+                time.sleep(self.retry_delay * (2 ** attempt))
+
+    def close(self):
+        """إغلاق جميع الاتصالات الخاملة"""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# ====================================================
+# 🧱 Schema Migrations (schema_version + خطوات مرتبة)
+# ====================================================
+
+class MigrationError(Exception):
+    """خطأ أثناء تطبيق ترحيل على مخطط القاعدة"""
+
+
+MIGRATIONS = []  # [(version, description, fn(conn))] بترتيب تصاعدي
+
+
+def migration(version: int, description: str):
+    """تسجيل خطوة ترحيل — كل خطوة يجب أن تكون idempotent"""
+    def register(fn):
+        if any(v == version for v, _, _ in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+@migration(1, "base tables: children, medical_files")
+def _m001_base_tables(conn):
+    # جدول الأطفال
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS children (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        full_name TEXT,
+        national_id TEXT,
+        smart_id TEXT,
+        birth_date TEXT,
+        gender TEXT,
+        mother_id TEXT,
+        father_id TEXT,
+        governorate TEXT,
+        created_at TEXT
+    )
+    """)
+
+    # جدول الملفات الطبية
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS medical_files (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        child_id INTEGER,
+        record_date TEXT,
+        weight REAL,
+        height REAL,
+        bmi REAL,
+        vaccinations TEXT,
+        diagnoses TEXT,
+        medications TEXT,
+        notes TEXT,
+        files TEXT,
+        created_at TEXT
+    )
+    """)
+
+
+@migration(2, "lookup and analytics indexes")
+def _m002_indexes(conn):
+    # الرقم القومي فريد — القواعد القديمة (زر البيانات التجريبية بدون فحص) قد تحتوي تكراراً:
+    # يبقى أقدم سجل (أصغر id) وتُنقل النسخ الأخرى وسجلاتها الطبية لجداول حجر بدل إيقاف الترحيل
+    dup_ids = """
+        SELECT c.id FROM children c
+        WHERE c.national_id IS NOT NULL
+          AND c.id > (SELECT MIN(k.id) FROM children k WHERE k.national_id = c.national_id)
+    """
+    moved = conn.execute(f"SELECT COUNT(*) FROM ({dup_ids})").fetchone()[0]
+    if moved:
+        now = datetime.utcnow().isoformat()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS children_quarantine AS
+            SELECT *, 0 AS kept_id, '' AS quarantined_at FROM children WHERE 0
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS medical_files_quarantine AS
+            SELECT *, '' AS quarantined_at FROM medical_files WHERE 0
+        """)
+        conn.execute(f"""
+            INSERT INTO children_quarantine
+            SELECT c.*, (SELECT MIN(k.id) FROM children k WHERE k.national_id = c.national_id), ?
+            FROM children c WHERE c.id IN ({dup_ids})
+        """, (now,))
+        conn.execute(f"""
+            INSERT INTO medical_files_quarantine
+            SELECT m.*, ? FROM medical_files m WHERE m.child_id IN ({dup_ids})
+        """, (now,))
+        conn.execute(f"DELETE FROM medical_files WHERE child_id IN ({dup_ids})")
+        conn.execute(f"DELETE FROM children WHERE id IN ({dup_ids})")
+        log.warning("moved %d child record(s) with a duplicated national_id to children_quarantine "
+                    "(the lowest id of each national_id was kept)", moved)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_medical_child ON medical_files(child_id, id)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_children_national_id ON children(national_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_children_smart_id ON children(smart_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_children_gov_birth ON children(governorate, birth_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_children_birth ON children(birth_date)")
+    conn.execute("ANALYZE")
+
+
+def schema_version(conn) -> int:
+    """آخر نسخة مطبقة من المخطط (0 لقاعدة جديدة)"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT
+    )
+    """)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate(pool: ConnectionPool, target=None) -> list:
+    """تطبيق الترحيلات الناقصة بالترتيب — كل خطوة في معاملة مستقلة"""
+    # مسار سريع بدون قفل كتابة: القاعدة محدثة بالفعل (الحالة المعتادة عند كل تشغيل)
+    latest = max((v for v, _, _ in MIGRATIONS if target is None or v <= target), default=0)
+    with pool.connection() as conn:
+        if schema_version(conn) >= latest:
+            return []
+    applied = []
+    for version, description, fn in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        with pool.transaction() as conn:
+            # نعيد الفحص داخل قفل الكتابة لأن عملية أخرى قد تكون طبقت الخطوة
+            if version <= schema_version(conn):
+                continue
+            try:
+                fn(conn)
+            except MigrationError:
+                raise
+            except Exception as e:
+                raise MigrationError(f"migration {version} ({description}) failed: {e}") from e
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.utcnow().isoformat()),
+            )
+        applied.append(version)
+    return applied
+
+
+@migration(3, "keyset pagination index for governorate filter")
+def _m003_gov_id_index(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_children_gov_id ON children(governorate, id)")
+
+
+# عدد الملفات المرفقة في عمود files (مسارات مفصولة بفواصل)
+_FILES_COUNT = "(CASE WHEN COALESCE({r}.files, '') = '' THEN 0 ELSE LENGTH({r}.files) - LENGTH(REPLACE({r}.files, ',', '')) + 1 END)"
+
+
+@migration(4, "trigger-maintained statistics for dashboards")
+def _m004_stats(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS stats_counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0)")
+    conn.execute("CREATE TABLE IF NOT EXISTS stats_governorate (governorate TEXT PRIMARY KEY, children INTEGER NOT NULL DEFAULT 0)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS stats_daily (
+        day TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, metric)
+    ) WITHOUT ROWID
+    """)
+
+    counter = "INSERT INTO stats_counters (name, value) VALUES ('{n}', {v}) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;"
+    gov = "INSERT INTO stats_governorate (governorate, children) VALUES (COALESCE({r}.governorate, ''), {v}) ON CONFLICT(governorate) DO UPDATE SET children = children + excluded.children;"
+    daily = "INSERT INTO stats_daily (day, metric, count) VALUES (COALESCE(SUBSTR({r}.created_at, 1, 10), ''), '{n}', {v}) ON CONFLICT(day, metric) DO UPDATE SET count = count + excluded.count;"
+
+    triggers = {
+        "trg_stats_children_ins": ("AFTER INSERT ON children", [
+            counter.format(n="total_children", v=1), gov.format(r="NEW", v=1), daily.format(r="NEW", n="children", v=1)]),
+        "trg_stats_children_del": ("AFTER DELETE ON children", [
+            counter.format(n="total_children", v=-1), gov.format(r="OLD", v=-1), daily.format(r="OLD", n="children", v=-1)]),
+        "trg_stats_children_gov": ("AFTER UPDATE OF governorate ON children", [
+            gov.format(r="OLD", v=-1), gov.format(r="NEW", v=1)]),
+        "trg_stats_medical_ins": ("AFTER INSERT ON medical_files", [
+            counter.format(n="medical_records", v=1), counter.format(n="uploaded_files", v=_FILES_COUNT.format(r="NEW")),
+            daily.format(r="NEW", n="medical_records", v=1)]),
+        "trg_stats_medical_del": ("AFTER DELETE ON medical_files", [
+            counter.format(n="medical_records", v=-1), counter.format(n="uploaded_files", v="-" + _FILES_COUNT.format(r="OLD")),
+            daily.format(r="OLD", n="medical_records", v=-1)]),
+        "trg_stats_medical_files": ("AFTER UPDATE OF files ON medical_files", [
+            counter.format(n="uploaded_files", v=f"{_FILES_COUNT.format(r='NEW')} - {_FILES_COUNT.format(r='OLD')}")]),
+    }
+    for name, (event, body) in triggers.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {event} BEGIN {' '.join(body)} END")
+
+    # تعبئة أولية من البيانات الموجودة (الخطوة تُعيد الحساب بالكامل فهي idempotent)
+    conn.execute("DELETE FROM stats_counters")
+    conn.execute("DELETE FROM stats_governorate")
+    conn.execute("DELETE FROM stats_daily")
+    conn.execute(f"""
+        INSERT INTO stats_counters (name, value)
+        SELECT 'total_children', COUNT(*) FROM children
+        UNION ALL SELECT 'medical_records', COUNT(*) FROM medical_files
+        UNION ALL SELECT 'uploaded_files', COALESCE(SUM({_FILES_COUNT.format(r='m')}), 0) FROM medical_files m
+    """)
+    conn.execute("""
+        INSERT INTO stats_governorate (governorate, children)
+        SELECT COALESCE(governorate, ''), COUNT(*) FROM children GROUP BY 1
+    """)
+    conn.execute("""
+        INSERT INTO stats_daily (day, metric, count)
+        SELECT COALESCE(SUBSTR(created_at, 1, 10), ''), 'children', COUNT(*) FROM children GROUP BY 1
+        UNION ALL
+        SELECT COALESCE(SUBSTR(created_at, 1, 10), ''), 'medical_records', COUNT(*) FROM medical_files GROUP BY 1
+    """)
+
+
+@migration(5, "FTS5 search over normalized child names and parent IDs")
+def _m005_name_search(conn):
+    # الاسم الموحد يُحفظ في عمود يكتبه التطبيق، والفهرس external-content عليه: الـ triggers SQL عادي فقط
+    # (بدون دالة Python) فالكتابة من أي اتصال خارج المجمّع (sqlite3 CLI، النسخ الاحتياطي، ETL) تعمل
+    if "name_norm" not in {r[1] for r in conn.execute("PRAGMA table_info(children)")}:
+        conn.execute("ALTER TABLE children ADD COLUMN name_norm TEXT")
+    rows = conn.execute("SELECT id, full_name FROM children").fetchall()
+    conn.executemany("UPDATE children SET name_norm = ? WHERE id = ?", ((normalize_arabic(n), i) for i, n in rows))
+    # صفوف كتبها عميل خارجي (name_norm فارغ) — يملؤها backfill_name_norm عند التشغيل التالي
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_children_name_pending ON children(id) WHERE name_norm IS NULL")
+
+    conn.execute("DROP TABLE IF EXISTS children_fts")
+    conn.execute("""
+    CREATE VIRTUAL TABLE children_fts USING fts5(
+        name_norm, mother_id, father_id,
+        content='children', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """)
+    cols = "name_norm, mother_id, father_id"
+    add = f"INSERT INTO children_fts (rowid, {cols}) VALUES (NEW.id, NEW.name_norm, NEW.mother_id, NEW.father_id);"
+    remove = (f"INSERT INTO children_fts (children_fts, rowid, {cols}) "
+              "VALUES ('delete', OLD.id, OLD.name_norm, OLD.mother_id, OLD.father_id);")
+    triggers = {
+        "trg_fts_children_ins": ("AFTER INSERT ON children", add),
+        "trg_fts_children_del": ("AFTER DELETE ON children", remove),
+        "trg_fts_children_upd": ("AFTER UPDATE OF name_norm, mother_id, father_id ON children", remove + " " + add),
+        # تعديل الاسم بدون الاسم الموحد (من خارج التطبيق): يُعاد حسابه في backfill التالي
+        "trg_children_name_stale": ("AFTER UPDATE OF full_name ON children "
+                                    "WHEN NEW.name_norm IS OLD.name_norm AND NEW.full_name IS NOT OLD.full_name",
+                                    "UPDATE children SET name_norm = NULL WHERE id = NEW.id;"),
+    }
+    for name, (event, body) in triggers.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+    conn.execute("INSERT INTO children_fts (children_fts) VALUES ('rebuild')")
+
+
+def backfill_name_norm(pool) -> int:
+    """ملء name_norm للصفوف التي أُدخلت أو عُدلت من خارج التطبيق (قراءة سريعة عبر فهرس جزئي أولاً)"""
+    with pool.connection() as conn:
+        if conn.execute("SELECT 1 FROM children WHERE name_norm IS NULL LIMIT 1").fetchone() is None:
+            return 0
+    with pool.transaction() as conn:
+        rows = conn.execute("SELECT id, full_name FROM children WHERE name_norm IS NULL").fetchall()
+        conn.executemany("UPDATE children SET name_norm = ? WHERE id = ?",
+                         ((normalize_arabic(n), i) for i, n in rows))
+    return len(rows)
+
+
+@migration(6, "content-addressed upload blobs and medical_attachments")
+def _m006_attachments(conn):
+    # ملف واحد على القرص لكل محتوى (sha256) مهما تكرر رفعه — refcount يحدد متى يُحذف
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS upload_blobs (
+        sha256 TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mime TEXT,
+        refcount INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS medical_attachments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        medical_id INTEGER NOT NULL,
+        child_id INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        mime TEXT,
+        size INTEGER NOT NULL,
+        created_at TEXT
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attachments_medical ON medical_attachments(medical_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attachments_child ON medical_attachments(child_id, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attachments_sha ON medical_attachments(sha256)")
+
+    counter = "INSERT INTO stats_counters (name, value) VALUES ('uploaded_files', {v}) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;"
+    triggers = {
+        "trg_attach_ins": ("AFTER INSERT ON medical_attachments", [
+            "INSERT INTO upload_blobs (sha256, size, mime, refcount, created_at) VALUES (NEW.sha256, NEW.size, NEW.mime, 1, NEW.created_at) "
+            "ON CONFLICT(sha256) DO UPDATE SET refcount = refcount + 1;",
+            counter.format(v=1)]),
+        "trg_attach_del": ("AFTER DELETE ON medical_attachments", [
+            "UPDATE upload_blobs SET refcount = refcount - 1 WHERE sha256 = OLD.sha256;",
+            counter.format(v=-1)]),
+        # حذف السجل الطبي يحذف مرفقاته (والملف نفسه يُجمع لاحقاً لما refcount = 0)
+        "trg_attach_medical_del": ("AFTER DELETE ON medical_files", [
+            "DELETE FROM medical_attachments WHERE medical_id = OLD.id;"]),
+    }
+    for name, (event, body) in triggers.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {event} BEGIN {' '.join(body)} END")
+
+
+@migration(7, "structured vaccination events and materialized due-list")
+def _m007_vaccinations(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS vaccination_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        child_id INTEGER NOT NULL,
+        vaccine_code TEXT NOT NULL,
+        given_on TEXT NOT NULL,
+        source TEXT,
+        created_at TEXT,
+        UNIQUE (child_id, vaccine_code)
+    )
+    """)
+    # الجرعات الناقصة فقط (الحالة due/overdue/upcoming تُحسب وقت الاستعلام من التاريخين)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS vaccination_due (
+        child_id INTEGER NOT NULL,
+        vaccine_code TEXT NOT NULL,
+        governorate TEXT,
+        due_date TEXT NOT NULL,
+        overdue_date TEXT NOT NULL,
+        PRIMARY KEY (child_id, vaccine_code)
+    ) WITHOUT ROWID
+    """)
+    # نافذة تاريخ + محافظة من الفهرس مباشرة ("المتأخرين هذا الأسبوع في القاهرة")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vdue_due ON vaccination_due(due_date, governorate)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vdue_overdue ON vaccination_due(overdue_date, governorate)")
+    # مواعيد الحجز من الشاشة الرئيسية (الجرعة نفسها تُسجل في vaccination_events يوم الإعطاء)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS vaccination_bookings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        child_id INTEGER NOT NULL,
+        vaccine_code TEXT NOT NULL,
+        booked_for TEXT NOT NULL,
+        created_at TEXT
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vbook_child ON vaccination_bookings(child_id, booked_for)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vbook_day ON vaccination_bookings(booked_for)")
+
+    triggers = {
+        # تسجيل جرعة يحذفها من قائمة المستحق فوراً بدون إعادة حساب كاملة
+        "trg_vacc_event_ins": ("AFTER INSERT ON vaccination_events",
+            "DELETE FROM vaccination_due WHERE child_id = NEW.child_id AND vaccine_code = NEW.vaccine_code;"),
+        "trg_vacc_children_del": ("AFTER DELETE ON children",
+            "DELETE FROM vaccination_due WHERE child_id = OLD.id; DELETE FROM vaccination_events WHERE child_id = OLD.id; "
+            "DELETE FROM vaccination_bookings WHERE child_id = OLD.id;"),
+        "trg_vacc_children_gov": ("AFTER UPDATE OF governorate ON children",
+            "UPDATE vaccination_due SET governorate = NEW.governorate WHERE child_id = NEW.id;"),
+    }
+    for name, (event, body) in triggers.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+
+
+@migration(8, "precomputed growth metrics (BMI + WHO z-scores)")
+def _m008_growth(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS growth_metrics (
+        medical_id INTEGER PRIMARY KEY,
+        child_id INTEGER NOT NULL,
+        governorate TEXT,
+        sex TEXT,
+        record_date TEXT,
+        age_months REAL,
+        weight REAL,
+        height REAL,
+        bmi REAL,
+        waz REAL,
+        haz REAL,
+        baz REAL,
+        stunting INTEGER NOT NULL DEFAULT 0,
+        wasting INTEGER NOT NULL DEFAULT 0,
+        obesity INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_growth_child ON growth_metrics(child_id, record_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_growth_gov ON growth_metrics(governorate, record_date)")
+    # سجلات عُدلت بعد حسابها — تُعاد في التحديث التزايدي التالي مع السجلات الجديدة
+    conn.execute("CREATE TABLE IF NOT EXISTS growth_pending (medical_id INTEGER PRIMARY KEY)")
+
+    stale_medical = ("DELETE FROM growth_metrics WHERE medical_id = {r}.id; "
+                     "INSERT OR IGNORE INTO growth_pending (medical_id) VALUES ({r}.id);")
+    triggers = {
+        "trg_growth_medical_upd": ("AFTER UPDATE OF weight, height, record_date, child_id ON medical_files",
+                                   stale_medical.format(r="NEW")),
+        "trg_growth_medical_del": ("AFTER DELETE ON medical_files",
+                                   "DELETE FROM growth_metrics WHERE medical_id = OLD.id; "
+                                   "DELETE FROM growth_pending WHERE medical_id = OLD.id;"),
+        "trg_growth_children_upd": ("AFTER UPDATE OF birth_date, gender, governorate ON children",
+                                    "INSERT OR IGNORE INTO growth_pending (medical_id) "
+                                    "SELECT id FROM medical_files WHERE child_id = NEW.id; "
+                                    "DELETE FROM growth_metrics WHERE child_id = NEW.id;"),
+    }
+    for name, (event, body) in triggers.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+
+
+@migration(9, "per-child data versions for cross-process cache checks")
+def _m009_child_versions(conn):
+    # كل كتابة على بيانات الطفل (من التطبيق أو الـ API أو أي عميل آخر) تزيد رقم نسخته:
+    # الكاش في أي عملية يقارن النسخة المخزنة مع القاعدة قبل إرجاع بيانات الطفل
+    conn.execute("CREATE TABLE IF NOT EXISTS child_versions (child_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)")
+    bump = ("INSERT INTO child_versions (child_id, version) VALUES ({r}, 1) "
+            "ON CONFLICT(child_id) DO UPDATE SET version = version + 1;")
+    triggers = {
+        "trg_ver_medical_ins": ("AFTER INSERT ON medical_files", bump.format(r="NEW.child_id")),
+        "trg_ver_medical_upd": ("AFTER UPDATE ON medical_files",
+                                bump.format(r="NEW.child_id") + " " + bump.format(r="OLD.child_id")),
+        "trg_ver_medical_del": ("AFTER DELETE ON medical_files", bump.format(r="OLD.child_id")),
+        "trg_ver_attach_ins": ("AFTER INSERT ON medical_attachments", bump.format(r="NEW.child_id")),
+        "trg_ver_attach_del": ("AFTER DELETE ON medical_attachments", bump.format(r="OLD.child_id")),
+        "trg_ver_children_upd": ("AFTER UPDATE ON children", bump.format(r="NEW.id")),
+        "trg_ver_children_del": ("AFTER DELETE ON children", "DELETE FROM child_versions WHERE child_id = OLD.id;"),
+    }
+    for name, (event, body) in triggers.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+
+
+@migration(10, "explicit growth watermark")
+def _m010_growth_state(conn):
+    # آخر سجل غطاه التحديث التزايدي محفوظ صراحةً بدل MAX(medical_id) في growth_metrics:
+    # حفظ سجل طبي يحسب مؤشراته وحده دون أن يقفز العلامة فوق سجلات لم تُحسب بعد
+    conn.execute("CREATE TABLE IF NOT EXISTS growth_state (id INTEGER PRIMARY KEY CHECK (id = 1), watermark INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO growth_state (id, watermark) "
+                 "SELECT 1, COALESCE(MAX(medical_id), 0) FROM growth_metrics")
+
+
+def child_version(conn, child_id: int) -> int:
+    """رقم نسخة بيانات الطفل (0 لو لم تُكتب له بيانات بعد) — قراءة مفتاح أساسي واحد"""
+    row = conn.execute("SELECT version FROM child_versions WHERE child_id = ?", (child_id,)).fetchone()
+    return row[0] if row else 0
+
+
+# ====================================================
+# 🔎 استعلامات الأطفال (فلترة في SQL + keyset pagination)
+# ====================================================
+
+# أعمدة الطفل المعروضة والمصدّرة (name_norm عمود داخلي للبحث فقط)
+CHILD_FIELDS = "id, full_name, national_id, smart_id, birth_date, gender, mother_id, father_id, governorate, created_at"
+
+
+def children_where(governorate=None, gender=None, born_from=None, born_to=None):
+    """بناء شرط WHERE ومعاملاته من الفلاتر المختارة"""
+    clauses, params = [], []
+    if governorate:
+        clauses.append("governorate = ?")
+        params.append(governorate)
+    if gender:
+        clauses.append("gender = ?")
+        params.append(gender)
+    if born_from:
+        clauses.append("birth_date >= ?")
+        params.append(str(born_from))
+    if born_to:
+        clauses.append("birth_date <= ?")
+        params.append(str(born_to))
+    return clauses, params
+
+
+def count_children(conn, **filters) -> int:
+    """عدد الأطفال المطابقين للفلاتر"""
+    clauses, params = children_where(**filters)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return conn.execute(f"SELECT COUNT(*) FROM children {where}", params).fetchone()[0]
+
+
+def fetch_children_page(conn, before_id=None, page_size=50, **filters):
+    """صفحة واحدة من الأطفال بترتيب id تنازلي — before_id هو آخر id في الصفحة السابقة"""
+    import pandas as pd
+
+    clauses, params = children_where(**filters)
+    if before_id is not None:
+        clauses.append("id < ?")
+        params.append(int(before_id))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return pd.read_sql_query(
+        f"SELECT {CHILD_FIELDS} FROM children {where} ORDER BY id DESC LIMIT ?",
+        conn, params=(*params, int(page_size)),
+    )
+
+
+def fetch_child(conn, child_id: int):
+    """بيانات طفل واحد كـ dict (أو None)"""
+    cur = conn.execute(f"SELECT {CHILD_FIELDS} FROM children WHERE id=?", (child_id,))
+    row = cur.fetchone()
+    return dict(zip([d[0] for d in cur.description], row)) if row else None
+
+
+def insert_child(conn, rec: dict) -> int:
+    """إضافة طفل داخل معاملة المستدعي — الهوية الذكية تُولَّد من رقم السجل لو لم تُرسل"""
+    cur = conn.execute("""
+        INSERT INTO children
+        (full_name, national_id, smart_id, birth_date, gender, mother_id, father_id, governorate, created_at, name_norm)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        rec["full_name"], rec["national_id"], rec.get("smart_id") or "", rec["birth_date"],
+        rec["gender"], rec["mother_id"], rec["father_id"], rec["governorate"],
+        datetime.utcnow().isoformat(), normalize_arabic(rec["full_name"])
+    ))
+    rec_id = cur.lastrowid
+    if not rec.get("smart_id"):
+        conn.execute("UPDATE children SET smart_id=? WHERE id=?", (gen_smart_id(rec_id), rec_id))
+    # جرعات الطفل الجديد في قائمة المستحق ضمن نفس المعاملة (تظهر في متابعة التطعيمات فوراً)
+    from eohealth_vaccines import add_due_rows
+
+    add_due_rows(conn, rec_id)
+    return rec_id
+
+
+def insert_medical_record(conn, child_id: int, data: dict) -> int:
+    """إضافة سجل طبي داخل معاملة المستدعي — يرجع id السجل"""
+    cur = conn.execute("""
+        INSERT INTO medical_files
+        (child_id, record_date, weight, height, bmi, vaccinations, diagnoses, medications, notes, files, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        child_id, data.get("record_date"), data.get("weight"), data.get("height"), data.get("bmi"),
+        data.get("vaccinations", ""), data.get("diagnoses", ""), data.get("medications", ""),
+        data.get("notes", ""), "", datetime.utcnow().isoformat()
+    ))
+    return cur.lastrowid
+
+
+def fetch_medical_records(conn, child_id: int):
+    """السجلات الطبية لطفل (الأحدث أولاً) — يستخدم فهرس (child_id, id)"""
+    import pandas as pd
+
+    return pd.read_sql_query(
+        "SELECT * FROM medical_files WHERE child_id=? ORDER BY id DESC",
+        conn, params=(child_id,)
+    )
+
+
+def distinct_values(conn, column: str) -> list:
+    """القيم المختلفة لعمود (لقوائم الفلاتر)"""
+    if column not in ("governorate", "gender"):
+        raise ValueError(f"Unsupported filter column: {column}")
+    rows = conn.execute(
+        f"SELECT DISTINCT {column} FROM children WHERE {column} IS NOT NULL AND {column} != '' ORDER BY 1"
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+# ====================================================
+# 📊 الإحصائيات المجمعة (قراءة O(1) من جداول stats_*)
+# ====================================================
+
+STATS_METRICS = ("children", "medical_records")
+
+
+def read_stats(conn) -> dict:
+    """العدادات الإجمالية + عدد الأطفال لكل محافظة"""
+    counters = dict(conn.execute("SELECT name, value FROM stats_counters").fetchall())
+    by_gov = dict(conn.execute(
+        "SELECT governorate, children FROM stats_governorate WHERE children > 0 ORDER BY children DESC"
+    ).fetchall())
+    return {
+        "total_children": counters.get("total_children", 0),
+        "medical_records": counters.get("medical_records", 0),
+        "uploaded_files": counters.get("uploaded_files", 0),
+        "by_governorate": by_gov,
+    }
+
+
+def stats_trend(conn, metric="children", bucket="day"):
+    """أعداد السجلات الجديدة لكل يوم/شهر/سنة (حسب created_at) مع المجموع التراكمي"""
+    import pandas as pd
+
+    if metric not in STATS_METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+    width = {"day": 10, "month": 7, "year": 4}[bucket]
+    df = pd.read_sql_query(
+        f"SELECT SUBSTR(day, 1, {width}) AS bucket, SUM(count) AS count FROM stats_daily "
+        "WHERE metric = ? AND day != '' GROUP BY 1 ORDER BY 1",
+        conn, params=(metric,),
+    )
+    df["cumulative"] = df["count"].cumsum()
+    return df
+
+
+# ====================================================
+# 🔤 البحث بالاسم (FTS5 + ترتيب bm25)
+# ====================================================
+
+def fts_query(text: str) -> str:
+    """تحويل نص المستخدم لاستعلام FTS5: كل كلمة بادئة (prefix) وكلها مطلوبة"""
+    tokens = re.findall(r"\w+", normalize_arabic(text))
+    return " ".join(f'"{tok}"*' for tok in tokens)
+
+
+def search_children(conn, text: str, limit=50):
+    """البحث عن الأطفال بالاسم أو رقم الأب/الأم — النتائج مرتبة حسب الصلة (rank: الأصغر أقرب، bm25)"""
+    import pandas as pd
+
+    match = fts_query(text)
+    if not match:
+        return pd.DataFrame(columns=["id", "full_name", "national_id", "smart_id", "birth_date", "governorate", "rank"])
+    return pd.read_sql_query(
+        """
+        SELECT c.id, c.full_name, c.national_id, c.smart_id, c.birth_date, c.governorate, f.rank
+        FROM (SELECT rowid, rank FROM children_fts WHERE children_fts MATCH ? ORDER BY rank LIMIT ?) f
+        JOIN children c ON c.id = f.rowid
+        ORDER BY f.rank
+        """,
+        conn, params=(match, int(limit)),
+    )
@@ -0,0 +1,253 @@
+# =========================
+# 📈 EoHealth Egypt — تحليلات النمو
+# BMI + معايير منظمة الصحة العالمية (z-scores بطريقة LMS) لكل السجلات دفعة واحدة + تحديث تزايدي
+# =========================
+
+import json
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# جداول WHO Child Growth Standards (0–60 شهر) — weight/length-height/BMI-for-age لكل جنس
+LMS_PATH = Path(__file__).resolve().parent / "data" / "who_growth_lms.csv"
+INDICATORS = {"waz": "wfa", "haz": "lhfa", "baz": "bmifa"}
+DAYS_PER_MONTH = 30.4375
+MAX_MONTHS = 60                 # المعايير تغطي حتى 5 سنوات — بعدها الـ z-score = NULL
+REFRESH_CHUNK_ROWS = 20_000    # سجلات لكل معاملة: قفل الكتابة يُترك بين الدفعات لحفظ العيادات
+
+# حدود التصنيف (WHO): تقزم / هزال (BMI-for-age كبديل للوزن مقابل الطول) / سمنة
+STUNTING_Z = -2.0
+WASTING_Z = -2.0
+OBESITY_Z = 3.0
+
+# السجلات الجديدة: نطاق rowid بعد العلامة (growth_state) على دفعات — بدون مسح medical_files كله
+_GROWTH_FIELDS = "m.id AS medical_id, m.child_id, c.governorate, c.gender, c.birth_date, m.record_date, m.weight, m.height"
+GROWTH_RANGE_SQL = f"""
+SELECT {_GROWTH_FIELDS}
+FROM medical_files m
+JOIN children c ON c.id = m.child_id
+WHERE m.id > ?
+ORDER BY m.id
+LIMIT ?
+"""
+# سجلات محددة (المعدلة من growth_pending أو السجل المحفوظ للتو)
+GROWTH_IDS_SQL = f"""
+SELECT {_GROWTH_FIELDS}
+FROM json_each(?) j
+CROSS JOIN medical_files m ON m.id = j.value
+JOIN children c ON c.id = m.child_id
+"""
+COLUMNS = ["medical_id", "child_id", "governorate", "sex", "record_date", "age_months", "weight", "height",
+           "bmi", "waz", "haz", "baz", "stunting", "wasting", "obesity"]
+
+
+def compute_bmi(weight, height_cm):
+    """BMI لقيمة واحدة أو عمود كامل — None/NaN لو الطول أو الوزن ناقص"""
+    w = np.asarray(weight, dtype=float)
+    h = np.asarray(height_cm, dtype=float) / 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bmi = np.where((w > 0) & (h > 0), np.round(w / (h * h), 2), np.nan)
+    if bmi.ndim == 0:
+        return None if np.isnan(bmi) else float(bmi)
+    return bmi
+
+
+def sex_codes(gender: pd.Series) -> pd.Series:
+    """توحيد قيم النوع ('M', 'Male / ذكر', 'أنثى', ...) إلى M / F"""
+    g = gender.fillna("").astype(str).str.strip().str.lower()
+    female = g.str.startswith("f") | g.str.contains("female|أنثى|انثى", regex=True)
+    male = ~female & (g.str.startswith("m") | g.str.contains("ذكر", regex=False))
+    return pd.Series(np.select([male, female], ["M", "F"], default=""), index=gender.index)
+
+
+@lru_cache(maxsize=1)
+def load_lms() -> dict:
+    """{(indicator, sex): (L, M, S)} كمصفوفات مرتبة حسب الشهر 0..60"""
+    table = pd.read_csv(LMS_PATH).sort_values(["indicator", "sex", "month"])
+    return {
+        key: tuple(g[c].to_numpy(dtype=float) for c in ("L", "M", "S"))
+        for key, g in table.groupby(["indicator", "sex"])
+    }
+
+
+def lms_at(indicator: str, sex: str, age_months):
+    """L, M, S بالاستيفاء الخطي بين الأشهر"""
+    L, M, S = load_lms()[(indicator, sex)]
+    months = np.arange(len(M))
+    return tuple(np.interp(age_months, months, v) for v in (L, M, S))
+
+
+def lms_zscore(x, L, M, S, restricted=True):
+    """z = ((x/M)^L − 1) / (L·S) — وبعد ±3 تطبيق تصحيح WHO للتوزيعات الملتوية (الوزن و BMI)"""
+    x, L, M, S = (np.asarray(a, dtype=float) for a in (x, L, M, S))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(np.abs(L) < 1e-9, np.log(x / M) / S, ((x / M) ** L - 1) / (L * S))
+        if restricted:
+            sd = lambda k: M * (1 + L * S * k) ** (1 / L)
+            z = np.where(z > 3, 3 + (x - sd(3)) / (sd(3) - sd(2)), z)
+            z = np.where(z < -3, -3 + (x - sd(-3)) / (sd(-2) - sd(-3)), z)
+    return z
+
+
+def lms_curve(indicator: str, sex: str, z: float, months=None):
+    """قيمة القياس المقابلة لـ z معين (خطوط الرسم المرجعية −2 / 0 / +2)"""
+    months = np.arange(MAX_MONTHS + 1) if months is None else np.asarray(months, dtype=float)
+    L, M, S = lms_at(indicator, sex, months)
+    return months, M * (1 + L * S * z) ** (1 / L)
+
+
+def compute_growth(frame: pd.DataFrame) -> pd.DataFrame:
+    """العمر عند الزيارة + BMI + waz/haz/baz + التصنيفات لكل الصفوف بعمليات عمودية
+
+    الأعمدة المطلوبة: medical_id, child_id, governorate, gender, birth_date, record_date, weight, height
+    """
+    out = pd.DataFrame({
+        "medical_id": frame["medical_id"].to_numpy(),
+        "child_id": frame["child_id"].to_numpy(),
+        "governorate": frame["governorate"].to_numpy(),
+        "sex": sex_codes(frame["gender"]).to_numpy(),
+        "record_date": frame["record_date"].to_numpy(),
+    })
+    dob = pd.to_datetime(frame["birth_date"], errors="coerce")
+    visit = pd.to_datetime(frame["record_date"], errors="coerce")
+    age = ((visit - dob).dt.days / DAYS_PER_MONTH).to_numpy(dtype=float)
+    age[(age < 0) | (age > MAX_MONTHS)] = np.nan
+    out["age_months"] = np.round(age, 2)
+    weight = pd.to_numeric(frame["weight"], errors="coerce").to_numpy(dtype=float)
+    height = pd.to_numeric(frame["height"], errors="coerce").to_numpy(dtype=float)
+    weight[weight <= 0] = np.nan
+    height[height <= 0] = np.nan
+    out["weight"], out["height"] = weight, height
+    out["bmi"] = compute_bmi(weight, height)
+
+    measures = {"waz": weight, "haz": height, "baz": out["bmi"].to_numpy()}
+    for col, indicator in INDICATORS.items():
+        z = np.full(len(out), np.nan)
+        for sex in ("M", "F"):
+            rows = (out["sex"].to_numpy() == sex) & ~np.isnan(age) & ~np.isnan(measures[col])
+            if rows.any():
+                L, M, S = lms_at(indicator, sex, age[rows])
+                z[rows] = lms_zscore(measures[col][rows], L, M, S, restricted=(col != "haz"))
+        out[col] = np.round(z, 2)
+
+    out["stunting"] = (out["haz"] < STUNTING_Z).astype(int)
+    out["wasting"] = (out["baz"] < WASTING_Z).astype(int)
+    out["obesity"] = (out["baz"] > OBESITY_Z).astype(int)
+    return out[COLUMNS]
+
+
+def _store(conn, cur) -> tuple:
+    """حساب الصفوف التي يرجعها cur وحفظها — يرجع (العدد, أكبر medical_id)"""
+    names = [d[0] for d in cur.description]
+    batch = cur.fetchall()
+    if not batch:
+        return 0, None
+    rows = compute_growth(pd.DataFrame(batch, columns=names))
+    rows = rows.astype(object).where(rows.notna(), None)   # NaN → NULL
+    conn.executemany(
+        f"INSERT OR REPLACE INTO growth_metrics ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+        zip(*(rows[c].tolist() for c in COLUMNS)),
+    )
+    return len(rows), int(rows["medical_id"].max())
+
+
+def _watermark(conn) -> int:
+    return conn.execute("SELECT watermark FROM growth_state WHERE id = 1").fetchone()[0]
+
+
+def refresh_growth(pool, full=False, chunk_rows=REFRESH_CHUNK_ROWS) -> dict:
+    """حساب السجلات الجديدة (بعد العلامة) + المعدلة (growth_pending) — full يعيد الكل
+
+    كل دفعة chunk_rows في معاملة قصيرة خاصة بها: التحديث بعد مهمة بالجملة لا يحجز قفل الكتابة للملف كله
+    """
+    t0 = time.perf_counter()
+    done = 0
+    if full:
+        with pool.transaction() as conn:
+            conn.execute("DELETE FROM growth_metrics")
+            conn.execute("DELETE FROM growth_pending")
+            conn.execute("UPDATE growth_state SET watermark = 0 WHERE id = 1")
+    else:
+        # قراءة عادية أولاً: لا شيء جديد = لا قفل كتابة (يُستدعى مع كل عرض للتحليلات)
+        with pool.connection() as conn:
+            pending = conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM medical_files m JOIN children c ON c.id = m.child_id WHERE m.id > ?) "
+                "OR EXISTS (SELECT 1 FROM growth_pending)",
+                (_watermark(conn),),
+            ).fetchone()[0]
+        if not pending:
+            return {"records": 0, "seconds": round(time.perf_counter() - t0, 3)}
+    while True:
+        with pool.transaction() as conn:
+            watermark = _watermark(conn)
+            n, top = _store(conn, conn.execute(GROWTH_RANGE_SQL, (watermark, chunk_rows)))
+            if n:
+                conn.execute("UPDATE growth_state SET watermark = ? WHERE id = 1", (top,))
+        done += n
+        if n < chunk_rows:
+            break
+    while True:
+        with pool.transaction() as conn:
+            ids = [r[0] for r in conn.execute("SELECT medical_id FROM growth_pending ORDER BY medical_id LIMIT ?",
+                                              (chunk_rows,))]
+            if ids:
+                done += update_growth(conn, ids)
+        if len(ids) < chunk_rows:
+            break
+    return {"records": done, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def update_growth(conn, medical_ids) -> int:
+    """مؤشرات سجلات محددة داخل معاملة مفتوحة (حفظ سجل طبي: مؤشراته مع السجل نفسه) — لا تغير العلامة"""
+    ids = json.dumps([int(i) for i in medical_ids])
+    n, _ = _store(conn, conn.execute(GROWTH_IDS_SQL, (ids,)))
+    conn.execute("DELETE FROM growth_pending WHERE medical_id IN (SELECT value FROM json_each(?))", (ids,))
+    return n
+
+
+def child_growth(conn, child_id: int) -> pd.DataFrame:
+    """سجلات النمو المحسوبة لطفل (مرتبة بالتاريخ)"""
+    return pd.read_sql_query(
+        "SELECT * FROM growth_metrics WHERE child_id = ? ORDER BY record_date, medical_id", conn, params=(child_id,)
+    )
+
+
+def governorate_summary(conn) -> pd.DataFrame:
+    """نسب التقزم والهزال والسمنة لكل محافظة (آخر قياس لكل طفل)"""
+    return pd.read_sql_query(
+        """
+        WITH latest AS (
+            SELECT g.* FROM growth_metrics g
+            WHERE g.medical_id = (SELECT MAX(medical_id) FROM growth_metrics
+                                  WHERE child_id = g.child_id AND age_months IS NOT NULL)
+        )
+        SELECT COALESCE(governorate, '') AS governorate, COUNT(*) AS children,
+               ROUND(AVG(stunting) * 100, 1) AS stunting_pct,
+               ROUND(AVG(wasting) * 100, 1) AS wasting_pct,
+               ROUND(AVG(obesity) * 100, 1) AS obesity_pct
+        FROM latest GROUP BY 1 ORDER BY children DESC
+        """,
+        conn,
+    )
+
+
+def growth_chart(frame: pd.DataFrame, indicator="waz"):
+    """رسم Plotly لطفل: قياساته فوق خطوط WHO (−2 / الوسيط / +2)"""
+    import plotly.graph_objects as go
+
+    column, unit = {"waz": ("weight", "kg"), "haz": ("height", "cm"), "baz": ("bmi", "kg/m²")}[indicator]
+    fig = go.Figure()
+    sex = next((s for s in frame["sex"] if s in ("M", "F")), None)
+    if sex:
+        for z, dash in ((-2, "dot"), (0, "solid"), (2, "dot")):
+            months, values = lms_curve(INDICATORS[indicator], sex, z)
+            fig.add_trace(go.Scatter(x=months, y=values, mode="lines", name=f"WHO {z:+d} SD" if z else "WHO median",
+                                     line={"dash": dash, "width": 1}))
+    points = frame.dropna(subset=["age_months", column])
+    fig.add_trace(go.Scatter(x=points["age_months"], y=points[column], mode="lines+markers", name=column,
+                             text=points[indicator].map(lambda z: f"z = {z:+.2f}" if pd.notna(z) else "")))
+    fig.update_layout(xaxis_title="Age (months)", yaxis_title=f"{column} ({unit})", height=380)
+    return fig
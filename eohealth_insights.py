@@ -0,0 +1,97 @@
+# =========================
+# 🤖 EoHealth Egypt — محرك قواعد التحليل (AI Insights)
+# استعلام تجميعي واحد + حسابات عمودية بـ pandas/NumPy
+# =========================
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# ⚙️ حدود القواعد
+VACCINATION_AGE_DAYS = 60      # طفل أكبر من شهرين بدون تطعيمات مسجلة
+CHECKUP_MONTHS = 6             # لا يوجد كشف منذ N شهر
+BMI_RANGE = (12.0, 22.0)       # نطاق تقريبي لمؤشر كتلة الجسم عند الأطفال
+
+DAYS_PER_MONTH = 30.4375
+
+# استعلام واحد لكل الأطفال: وجود التطعيمات وآخر كشف وآخر BMI لكل طفل
+INSIGHTS_SQL = """
+SELECT
+    c.id AS child_id,
+    c.full_name,
+    c.birth_date,
+    c.governorate,
+    COUNT(m.id) AS n_records,
+    COALESCE(SUM(LENGTH(COALESCE(m.vaccinations, '')) > 0), 0) AS n_vaccination_records,
+    MAX(m.record_date) AS last_record_date,
+    (SELECT bmi FROM medical_files
+      WHERE child_id = c.id AND bmi IS NOT NULL
+      ORDER BY id DESC LIMIT 1) AS latest_bmi
+FROM children c
+LEFT JOIN medical_files m ON m.child_id = c.id
+GROUP BY c.id
+"""
+
+RULES = []  # [(name, label, fn(frame) -> boolean mask)]
+
+
+def rule(name: str, label: str):
+    """تسجيل قاعدة جديدة — الدالة تستقبل الجدول كاملاً وترجع قناع منطقي"""
+    def register(fn):
+        RULES.append((name, label, fn))
+        return fn
+    return register
+
+
+@rule("missing_vaccinations", "Missing vaccinations / لم يتم تسجيل التطعيمات")
+def _missing_vaccinations(f):
+    return (f["age_days"] > VACCINATION_AGE_DAYS) & (f["n_vaccination_records"] == 0)
+
+
+@rule("no_recent_checkup", f"No checkup in {CHECKUP_MONTHS} months / لا يوجد كشف منذ {CHECKUP_MONTHS} أشهر")
+def _no_recent_checkup(f):
+    limit = CHECKUP_MONTHS * DAYS_PER_MONTH
+    never_checked = f["days_since_checkup"].isna() & (f["age_days"] > limit)
+    return never_checked | (f["days_since_checkup"] > limit)
+
+
+@rule("bmi_outlier", f"BMI outside {BMI_RANGE[0]:g}–{BMI_RANGE[1]:g} / مؤشر كتلة الجسم خارج النطاق")
+def _bmi_outlier(f):
+    bmi = f["latest_bmi"]
+    return bmi.notna() & ((bmi < BMI_RANGE[0]) | (bmi > BMI_RANGE[1]))
+
+
+def load_insights_frame(conn, today=None) -> pd.DataFrame:
+    """تحميل بيانات كل الأطفال باستعلام واحد وحساب الأعمار بشكل عمودي"""
+    return add_ages(pd.read_sql_query(INSIGHTS_SQL, conn), today)
+
+
+def add_ages(f: pd.DataFrame, today=None) -> pd.DataFrame:
+    """العمر بالأيام والأيام منذ آخر كشف (من SQLite أو من لقطة Parquet)"""
+    today = pd.Timestamp(today or date.today())
+    dob = pd.to_datetime(f["birth_date"], errors="coerce")
+    last = pd.to_datetime(f["last_record_date"], errors="coerce")
+    f["age_days"] = (today - dob).dt.days
+    f["days_since_checkup"] = (today - last).dt.days
+    f["latest_bmi"] = pd.to_numeric(f["latest_bmi"], errors="coerce")
+    return f
+
+
+def evaluate_rules(frame: pd.DataFrame, names=None) -> pd.DataFrame:
+    """تطبيق القواعد المسجلة في مرور واحد وإرجاع جدول التنبيهات"""
+    columns = ["child_id", "full_name", "governorate", "rule", "message"]
+    parts = []
+    for name, label, fn in RULES:
+        if names is not None and name not in names:
+            continue
+        # الأعمار غير الصالحة (NaN) تعطي False في المقارنات فلا تولد تنبيهات
+        mask = np.asarray(fn(frame), dtype=bool)
+        if mask.any():
+            hit = frame.loc[mask, ["child_id", "full_name", "governorate"]].copy()
+            hit["rule"] = name
+            hit["message"] = label
+            parts.append(hit)
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(parts, ignore_index=True)[columns]
@@ -0,0 +1,335 @@
+# =========================
+# 📤 EoHealth Egypt — استيراد وتصدير البيانات بالجملة
+# قراءة متدفقة (openpyxl read-only / CSV chunks) + executemany في معاملة واحدة
+# تصدير متدفق إلى ملف مؤقت (csv writer / openpyxl write-only) بذاكرة محدودة
+# =========================
+
+import csv
+import gzip
+import itertools
+import json
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+from eohealth_db import CHILD_FIELDS, gen_smart_id, children_where, normalize_arabic
+from eohealth_vaccines import add_due_rows
+
+IMPORT_COLUMNS = ["full_name", "national_id", "birth_date", "gender", "mother_id", "father_id", "governorate"]
+ID_COLUMNS = ["national_id", "mother_id", "father_id"]
+CHUNK_ROWS = 5000
+
+CHILD_INSERT_SQL = """
+    INSERT INTO children
+    (id, full_name, national_id, smart_id, birth_date, gender, mother_id, father_id, governorate, created_at, name_norm)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class ImportFormatError(ValueError):
+    """الملف لا يحتوي على الأعمدة المطلوبة أو صيغته غير مدعومة"""
+
+
+# ----------------------------
+# 📖 قراءة الملف على دفعات
+# ----------------------------
+
+def _iter_excel_chunks(fileobj, chunk_rows):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(h).strip() if h is not None else "" for h in header]
+        batch = []
+        for row in rows:
+            if row is None or all(v is None for v in row):
+                continue
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        wb.close()
+
+
+def iter_import_chunks(fileobj, filename: str, chunk_rows=CHUNK_ROWS):
+    """قراءة ملف xlsx أو csv كدفعات DataFrame دون تحميل الملف كاملاً"""
+    name = filename.lower()
+    if name.endswith(".csv") or name.endswith(".csv.gz"):
+        yield from pd.read_csv(fileobj, dtype=str, chunksize=chunk_rows, keep_default_na=True)
+    elif name.endswith(".xlsx"):
+        yield from _iter_excel_chunks(fileobj, chunk_rows)
+    else:
+        raise ImportFormatError(f"Unsupported file type: {filename}")
+
+
+# ----------------------------
+# ✅ التحقق من الدفعة (عمودياً)
+# ----------------------------
+
+def _text(col: pd.Series, numeric_ids=False) -> pd.Series:
+    if numeric_ids:
+        # أرقام Excel (مثل الرقم القومي) قد تصل كـ float — نحولها لنص بدون ".0"
+        col = col.map(lambda v: str(int(v)) if isinstance(v, float) and v.is_integer() else v)
+    missing = col.isna()
+    col = col.astype(str).str.strip()
+    return col.mask(missing | (col == ""))
+
+
+def validate_chunk(chunk: pd.DataFrame, row_offset: int):
+    """تنظيف الدفعة وفصل الصفوف المقبولة عن المرفوضة مع سبب الرفض"""
+    missing = [c for c in IMPORT_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ImportFormatError(f"Missing columns: {', '.join(missing)}")
+
+    chunk = chunk.reset_index(drop=True)
+    clean = pd.DataFrame({c: _text(chunk[c], c in ID_COLUMNS) for c in IMPORT_COLUMNS})
+    # رقم الصف كما يظهر في الملف (الصف 1 هو العناوين)
+    clean["row"] = range(row_offset + 2, row_offset + 2 + len(clean))
+
+    raw_dob = chunk["birth_date"]
+    dob = pd.to_datetime(raw_dob, errors="coerce")
+    clean["birth_date"] = dob.dt.strftime("%Y-%m-%d")
+    # تاريخ الميلاد الفارغ يأخذ تاريخ اليوم كما في الاستيراد القديم
+    blank_dob = raw_dob.isna() | (raw_dob.astype(str).str.strip() == "")
+    clean.loc[blank_dob, "birth_date"] = date.today().isoformat()
+
+    reason = pd.Series(None, index=clean.index, dtype=object)
+    reason = reason.mask(dob.isna() & ~blank_dob, "invalid birth_date")
+    reason = reason.mask(clean["national_id"].isna(), "missing national_id")
+    reason = reason.mask(clean["full_name"].isna(), "missing full_name")
+
+    bad = reason.notna()
+    for c in ["gender", "mother_id", "father_id", "governorate"]:
+        clean[c] = clean[c].fillna("")
+    rejects = pd.DataFrame({"row": clean.loc[bad, "row"], "national_id": clean.loc[bad, "national_id"], "reason": reason[bad]})
+    return clean.loc[~bad], rejects
+
+
+# ----------------------------
+# 🚀 الإدخال بالجملة
+# ----------------------------
+
+def _next_child_id(conn) -> int:
+    # AUTOINCREMENT لا يعيد استخدام الأرقام المحذوفة، لذا نبدأ بعد أعلى رقم في sqlite_sequence
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name='children'").fetchone()
+    top = conn.execute("SELECT COALESCE(MAX(id), 0) FROM children").fetchone()[0]
+    return max(seq[0] if seq else 0, top) + 1
+
+
+def _existing_national_ids(conn, ids) -> set:
+    rows = conn.execute(
+        "SELECT national_id FROM children WHERE national_id IN (SELECT value FROM json_each(?))",
+        (json.dumps(list(ids)),),
+    ).fetchall()
+    return {r[0] for r in rows}
+
+
+@contextmanager
+def transactions(pools: dict):
+    """معاملة كتابة مفتوحة على كل ملف {رقم الملف: اتصال} — COMMIT للكل عند الخروج أو ROLLBACK للكل عند الخطأ"""
+    with ExitStack() as stack:
+        yield {k: stack.enter_context(p.transaction()) for k, p in pools.items()}
+
+
+def add_id_range(ranges: list, first: int, last: int):
+    """إضافة [أول, آخر] لقائمة أرقام المهمة (دمج النطاق المتصل بالسابق)"""
+    if ranges and ranges[-1][1] + 1 == first:
+        ranges[-1][1] = last
+    else:
+        ranges.append([first, last])
+
+
+def import_children(pool, fileobj, filename: str, chunk_rows=CHUNK_ROWS, progress=None, shard_of=None,
+                    resume=None, on_commit=None) -> dict:
+    """استيراد الأطفال من ملف Excel/CSV (معاملة واحدة، أو معاملة لكل دفعة مع on_commit) مع تقرير الأداء والرفض
+
+    الملفات المقسمة: pool = {رقم الملف: مجمّع} و shard_of(المحافظة) يحدد ملف كل طفل، والرقم القومي يُفحص في كل الملفات.
+    on_commit (مهام الخلفية): كل دفعة في معاملتها الخاصة ثم on_commit(state, rejected) — قفل الكتابة يُترك بين
+    الدفعات لحفظ العيادات، و state["ids"] = نطاقات أرقام الأطفال المحفوظة (للحذف عند الإلغاء).
+    resume=state يكمل نفس الملف من بعد آخر دفعة محفوظة
+    """
+    t0 = time.perf_counter()
+    rejects = []
+    seen = set()
+    created_at = datetime.utcnow().isoformat()
+    day = datetime.utcnow().strftime("%Y%m%d")
+    state = {"rows": 0, "inserted": 0, "rejected": 0, "ids": [], **(resume or {})}
+    skip, read = state["rows"], 0
+
+    pools = pool if isinstance(pool, dict) else {0: pool}
+    with ExitStack() as whole:
+        held = None if on_commit else whole.enter_context(transactions(pools))
+        for chunk in iter_import_chunks(fileobj, filename, chunk_rows):
+            if read + len(chunk) <= skip:
+                read += len(chunk)   # محفوظة في تشغيل سابق لنفس المهمة
+                continue
+            good, bad = validate_chunk(chunk, read)
+            read += len(chunk)
+            chunk_rejects = [bad]
+            chunk_ids = []
+            with ExitStack() as stack:
+                conns = held or stack.enter_context(transactions(pools))
+                # الرقم القومي فريد: مكرر داخل الملف أو موجود مسبقاً في القاعدة
+                # (الدفعات السابقة أُدخلت بالفعل في القاعدة فيكشفها استعلام القاعدة)
+                nid = good["national_id"]
+                dup_in_chunk = nid.duplicated()
+                existing = set().union(*(_existing_national_ids(conn, nid[~dup_in_chunk]) for conn in conns.values()))
+                dup = dup_in_chunk | nid.isin(existing)
+                if dup.any():
+                    chunk_rejects.append(pd.DataFrame({
+                        "row": good.loc[dup, "row"],
+                        "national_id": nid[dup],
+                        "reason": ["duplicate national_id in file" if (in_chunk or n in seen) else "national_id already registered"
+                                   for n, in_chunk in zip(nid[dup], dup_in_chunk[dup])],
+                    }))
+                    good = good.loc[~dup]
+                seen.update(good["national_id"].tolist())
+
+                shards = good["governorate"].map(shard_of) if shard_of else pd.Series(0, index=good.index)
+                for k, part in good.groupby(shards, sort=False):
+                    # الهوية الذكية تُحسب من رقم السجل في نفس الدفعة (بدون UPDATE لاحق)
+                    first = _next_child_id(conns[k])
+                    ids = range(first, first + len(part))
+                    conns[k].executemany(CHILD_INSERT_SQL, zip(
+                        ids, part["full_name"].tolist(), part["national_id"].tolist(),
+                        [gen_smart_id(rid, day) for rid in ids], part["birth_date"].tolist(),
+                        part["gender"].tolist(), part["mother_id"].tolist(), part["father_id"].tolist(),
+                        part["governorate"].tolist(), [created_at] * len(part),
+                        [normalize_arabic(n) for n in part["full_name"].tolist()],
+                    ))
+                    # جرعات الأطفال الجدد في قائمة المستحق ضمن نفس المعاملة (بدون إعادة بناء القائمة)
+                    add_due_rows(conns[k], first, ids[-1])
+                    chunk_ids.append((first, ids[-1]))
+            # الأرقام تُسجل بعد COMMIT فقط: دفعة أُلغيت لا تترك أرقاماً قد يأخذها طفل آخر ثم يحذفها التنظيف
+            chunk_rejects = pd.concat(chunk_rejects, ignore_index=True)
+            rejects.append(chunk_rejects)
+            for first, last in chunk_ids:
+                add_id_range(state["ids"], first, last)
+            state.update(rows=read, inserted=state["inserted"] + len(good),
+                         rejected=state["rejected"] + len(chunk_rejects))
+            if on_commit:
+                on_commit(state, chunk_rejects)
+            if progress:
+                progress(read, state["inserted"])
+
+    seconds = time.perf_counter() - t0
+    rejects = [r for r in rejects if not r.empty]
+    return {
+        "read": read,
+        "inserted": state["inserted"],
+        "rejected": pd.concat(rejects, ignore_index=True) if rejects else pd.DataFrame(columns=["row", "national_id", "reason"]),
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round((read - skip) / seconds, 1) if seconds > 0 else 0.0,
+        "ids": state["ids"],
+    }
+
+
+# ====================================================
+# 📥 التصدير المتدفق (CSV / XLSX إلى ملف مؤقت)
+# ====================================================
+
+EXPORT_DIR = Path(tempfile.gettempdir()) / "eohealth_exports"
+EXPORT_MAX_AGE_S = 3600
+EXPORT_FORMATS = ("csv", "xlsx")
+
+
+def iter_children_rows(conn, chunk_rows=CHUNK_ROWS, **filters):
+    """قراءة الأطفال من SQLite على دفعات — يرجع (أسماء الأعمدة, مولد الدفعات)"""
+    clauses, params = children_where(**filters)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    cur = conn.execute(f"SELECT {CHILD_FIELDS} FROM children {where} ORDER BY id", params)
+    columns = [d[0] for d in cur.description]
+
+    def batches():
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+    return columns, batches()
+
+
+@contextmanager
+def children_rows(pools, chunk_rows=CHUNK_ROWS, **filters):
+    """(أسماء الأعمدة, دفعات) من ملف أو أكثر — الملفات بالتتابع (أرقام كل ملف بعد الذي قبله فالترتيب بالـ id محفوظ)"""
+    with ExitStack() as stack:
+        parts = [iter_children_rows(stack.enter_context(pool.connection()), chunk_rows, **filters) for pool in pools]
+        yield parts[0][0], itertools.chain.from_iterable(batches for _, batches in parts)
+
+
+def _cleanup_exports(out_dir: Path):
+    # ملفات التصدير القديمة تُحذف حتى لا يكبر المجلد بلا حدود
+    cutoff = time.time() - EXPORT_MAX_AGE_S
+    for old in out_dir.glob("children_*"):
+        try:
+            if old.stat().st_mtime < cutoff:
+                old.unlink()
+        except OSError:
+            pass
+
+
+def export_children(pool, fmt="csv", gzip_output=False, out_dir=EXPORT_DIR, chunk_rows=CHUNK_ROWS, progress=None, **filters) -> dict:
+    """تصدير الأطفال إلى ملف على القرص صفاً بصف — الذاكرة ثابتة مهما كان عدد الصفوف
+
+    pool: مجمّع واحد أو قائمة مجمّعات (الملفات المقسمة) تُكتب في نفس الملف بالتتابع
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    _cleanup_exports(out_dir)
+
+    t0 = time.perf_counter()
+    stamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
+    # xlsx مضغوط أصلاً (zip) لذا الضغط الإضافي لملفات CSV فقط
+    gz = gzip_output and fmt == "csv"
+    path = out_dir / f"children_{stamp}.{fmt}{'.gz' if gz else ''}"
+    tmp = path.with_name(path.name + ".part")
+    rows = 0
+
+    with children_rows(pool if isinstance(pool, (list, tuple)) else [pool], chunk_rows, **filters) as (columns, batches):
+        if fmt == "csv":
+            opener = gzip.open if gz else open
+            with opener(tmp, "wt", encoding="utf-8", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(columns)
+                for batch in batches:
+                    writer.writerows(batch)
+                    rows += len(batch)
+                    if progress:
+                        progress(rows)
+        else:
+            from openpyxl import Workbook
+
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("children")
+            ws.append(columns)
+            for batch in batches:
+                for row in batch:
+                    ws.append(row)
+                rows += len(batch)
+                if progress:
+                    progress(rows)
+            wb.save(tmp)
+
+    tmp.replace(path)  # الملف يظهر كاملاً أو لا يظهر
+    seconds = time.perf_counter() - t0
+    return {
+        "path": path,
+        "rows": rows,
+        "bytes": path.stat().st_size,
+        "seconds": round(seconds, 3),
+        "mime": "application/gzip" if gz else ("text/csv" if fmt == "csv"
+                                                else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    }
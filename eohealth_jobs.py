@@ -0,0 +1,404 @@
+# =========================
+# 🧵 EoHealth Egypt — طابور مهام الإدارة في الخلفية (محفوظ في SQLite)
+# الاستيراد / التصدير / الشهادات / المسح / البيانات التجريبية تعمل خارج سكربت Streamlit
+# مع نسبة تقدم + إلغاء + إعادة تشغيل المهام المقطوعة بعد تعطل العملية
+# =========================
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+JOB_WORKERS = 2                 # threads: العمل الثقيل نفسه (رسم الشهادات) يتوزع على عمليات منفصلة
+POLL_INTERVAL_S = 1.0           # فحص المهام المضافة من عمليات أخرى
+HEARTBEAT_S = 5.0
+STALE_AFTER_S = 30.0            # مهمة "جارية" بدون نبضة لهذه المدة = العملية التي تشغلها توقفت
+MAX_ATTEMPTS = 3                # مهمة تقطع العملية أكثر من ذلك تُعتبر فاشلة (لا تُعاد للأبد)
+PROGRESS_WRITE_S = 0.5          # أقصى معدل لكتابة التقدم في القاعدة
+JOBS_DIR = Path("cache") / "jobs"   # ملفات الاستيراد المرفوعة + نواتج المهام
+
+ACTIVE = ("queued", "running")
+FINISHED = ("done", "failed", "cancelled")
+
+# الطابور في ملف SQLite منفصل بجوار قاعدة السجل: تحديثات التقدم والنبضات لا تنتظر قفل الكتابة على قاعدة السجل.
+# مهام الإدخال بالجملة تحفظ دفعة في كل معاملة قصيرة، وcheckpoint = حالة آخر دفعة محفوظة (JSON) لتكمل منها
+# بعد التعطل — وعند الإلغاء/الفشل تُحذف الدفعات المحفوظة
+JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    title TEXT,
+    params TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    checkpoint TEXT,
+    owner TEXT,
+    heartbeat_at REAL,
+    created_at TEXT,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+"""
+
+log = logging.getLogger("eohealth.jobs")
+
+HANDLERS = {}  # {kind: fn(ctx, **params) -> dict}
+
+
+class JobCancelled(Exception):
+    """طُلب إلغاء المهمة — يُرفع من ctx.progress داخل المعالج"""
+
+
+def job_handler(kind: str):
+    """تسجيل معالج نوع مهمة — يجب أن يكون آمناً لإعادة التشغيل (معاملة واحدة أو ملف .part أو ctx.checkpoint)"""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def jobs_db_path(db_path) -> Path:
+    """eohealth.db → eohealth.jobs.db"""
+    return Path(db_path).with_suffix(".jobs.db")
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+
+def _row(cur, row) -> dict:
+    job = dict(zip([d[0] for d in cur.description], row))
+    job["params"] = json.loads(job["params"] or "{}")
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["checkpoint"] = json.loads(job["checkpoint"]) if job.get("checkpoint") else None
+    return job
+
+
+class JobContext:
+    """ما يراه المعالج: المجمّع ومجلد النواتج + تقرير التقدم (الذي يفحص طلب الإلغاء)"""
+
+    def __init__(self, queue, job: dict):
+        self.queue = queue
+        self.pool = queue.pool          # قاعدة السجل (بيانات الأطفال)
+        self.registry = queue.registry  # نفس القاعدة أو الملفات المقسمة (المهام بالجملة توزع عليها)
+        self._db = queue.db             # قاعدة الطابور (التقدم والإلغاء)
+        self.job_id = job["id"]
+        self.out_dir = queue.jobs_dir
+        self.checkpoint = job.get("checkpoint")   # حالة آخر دفعة محفوظة قبل انقطاع المهمة (None = من البداية)
+        self._last_write = 0.0
+
+    def progress(self, fraction: float, message: str = ""):
+        now = time.monotonic()
+        if now - self._last_write < PROGRESS_WRITE_S and fraction < 1.0:
+            return
+        self._last_write = now
+        with self._db.connection() as conn:
+            conn.execute("UPDATE jobs SET progress=?, message=?, heartbeat_at=? WHERE id=?",
+                         (max(0.0, min(fraction, 1.0)), message, time.time(), self.job_id))
+            cancelled = conn.execute("SELECT cancel_requested FROM jobs WHERE id=?", (self.job_id,)).fetchone()[0]
+        if cancelled:
+            raise JobCancelled()
+
+    def check_cancelled(self):
+        with self._db.connection() as conn:
+            if conn.execute("SELECT cancel_requested FROM jobs WHERE id=?", (self.job_id,)).fetchone()[0]:
+                raise JobCancelled()
+
+    def save_checkpoint(self, state: dict):
+        """حفظ حالة الدفعة التي تمت (COMMIT) في صف المهمة — المهمة المعادة بعد التعطل تكمل منها"""
+        self.checkpoint = state
+        with self._db.connection() as conn:
+            conn.execute("UPDATE jobs SET checkpoint=?, heartbeat_at=? WHERE id=?",
+                         (json.dumps(state), time.time(), self.job_id))
+
+
+class JobQueue:
+    """طابور مهام دائم: الإضافة من أي جلسة/عملية، والتنفيذ بواسطة threads هذه العملية"""
+
+    def __init__(self, pool, workers=JOB_WORKERS, jobs_dir=JOBS_DIR, on_finish=None, db_path=None, registry=None):
+        from eohealth_db import ConnectionPool
+        from eohealth_shards import ShardedRegistry
+
+        self.pool = pool
+        self.registry = registry or ShardedRegistry.single(pool)
+        self.db = ConnectionPool(db_path or jobs_db_path(pool.db_path), size=workers + 2, metrics=pool.metrics)
+        self.workers = workers
+        self.jobs_dir = Path(jobs_dir)
+        self.on_finish = on_finish     # fn(job) بعد انتهاء كل مهمة (تحديث كاشات التطبيق)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._running = set()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    # ---------------- التشغيل ----------------
+    def start(self):
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        with self.db.connection() as conn:
+            conn.executescript(JOBS_SCHEMA)
+        self.recover()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"eohealth-job-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat, name="eohealth-job-heartbeat", daemon=True)
+        t.start()
+        self._threads.append(t)
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self.db.close()
+
+    # ---------------- الواجهة ----------------
+    def submit(self, kind: str, params=None, title="") -> int:
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        with self.db.transaction() as conn:
+            cur = conn.execute(
+                "INSERT INTO jobs (kind, title, params, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (kind, title or kind, json.dumps(params or {}, default=str), _now()),
+            )
+            job_id = cur.lastrowid
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id: int):
+        with self.db.connection() as conn:
+            cur = conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,))
+            row = cur.fetchone()
+            return _row(cur, row) if row else None
+
+    def list(self, limit=20) -> list:
+        with self.db.connection() as conn:
+            cur = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+            return [_row(cur, r) for r in cur.fetchall()]
+
+    def cancel(self, job_id: int) -> bool:
+        """المنتظرة تُلغى فوراً، والجارية يُطلب منها التوقف عند أول تقرير تقدم"""
+        with self.db.transaction() as conn:
+            cur = conn.execute("UPDATE jobs SET status='cancelled', finished_at=?, cancel_requested=1 "
+                               "WHERE id=? AND status='queued'", (_now(), job_id))
+            if cur.rowcount:
+                return True
+            cur = conn.execute("UPDATE jobs SET cancel_requested=1 WHERE id=? AND status='running'", (job_id,))
+            return cur.rowcount > 0
+
+    def recover(self) -> int:
+        """المهام الجارية التي توقفت نبضاتها (تعطل/إعادة تشغيل) تعود للطابور أو تفشل بعد MAX_ATTEMPTS"""
+        cutoff = time.time() - STALE_AFTER_S
+        stale = "status='running' AND COALESCE(heartbeat_at, 0) < ?"
+        # فحص بالقراءة أولاً: الحالة المعتادة لا تحتاج قفل كتابة
+        with self.db.connection() as conn:
+            if conn.execute(f"SELECT 1 FROM jobs WHERE {stale} LIMIT 1", (cutoff,)).fetchone() is None:
+                return 0
+        with self.db.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status='failed', finished_at=?, error='interrupted too many times' "
+                "WHERE status='running' AND COALESCE(heartbeat_at, 0) < ? AND attempts >= ?",
+                (_now(), cutoff, MAX_ATTEMPTS),
+            )
+            cur = conn.execute(
+                "UPDATE jobs SET status='queued', owner=NULL, progress=0, "
+                "message='requeued after interruption' "
+                "WHERE status='running' AND COALESCE(heartbeat_at, 0) < ?", (cutoff,),
+            )
+            requeued = cur.rowcount
+        if requeued:
+            log.warning("requeued %d interrupted job(s)", requeued)
+            self._wake.set()
+        return requeued
+
+    # ---------------- التنفيذ ----------------
+    def _claim(self):
+        with self.db.connection() as conn:
+            if conn.execute("SELECT 1 FROM jobs WHERE status='queued' LIMIT 1").fetchone() is None:
+                return None
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT id FROM jobs WHERE status='queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status='running', owner=?, attempts=attempts+1, started_at=?, heartbeat_at=?, "
+                "error=NULL WHERE id=?", (self.owner, _now(), time.time(), row[0]),
+            )
+            cur = conn.execute("SELECT * FROM jobs WHERE id=?", (row[0],))
+            return _row(cur, cur.fetchone())
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except Exception:
+                log.exception("job claim failed")
+                job = None
+            if job is None:
+                self._wake.wait(POLL_INTERVAL_S)
+                self._wake.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job: dict):
+        with self._lock:
+            self._running.add(job["id"])
+        status, result, error = "done", None, None
+        try:
+            result = HANDLERS[job["kind"]](JobContext(self, job), **job["params"])
+        except JobCancelled:
+            status = "cancelled"
+        except Exception as e:
+            log.exception("job %s (%s) failed", job["id"], job["kind"])
+            status, error = "failed", str(e) or type(e).__name__
+        finally:
+            with self._lock:
+                self._running.discard(job["id"])
+        with self.db.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status=?, result=?, error=?, finished_at=?, heartbeat_at=?, "
+                "progress=CASE WHEN ?='done' THEN 1 ELSE progress END WHERE id=?",
+                (status, json.dumps(result, default=str) if result is not None else None, error, _now(),
+                 time.time(), status, job["id"]),
+            )
+        if self.on_finish:
+            try:
+                self.on_finish({**job, "status": status, "result": result, "error": error})
+            except Exception:
+                log.exception("job on_finish hook failed")
+
+    def _heartbeat(self):
+        # نبضة للمهام الجارية حتى لو كان المعالج في خطوة طويلة بدون تقرير تقدم
+        while not self._stop.wait(HEARTBEAT_S):
+            try:
+                with self._lock:
+                    running = list(self._running)
+                if running:
+                    with self.db.connection() as conn:
+                        conn.execute(f"UPDATE jobs SET heartbeat_at=? WHERE id IN ({','.join('?' * len(running))})",
+                                     (time.time(), *running))
+                self.recover()
+            except Exception:
+                log.exception("job heartbeat failed")
+
+
+# ====================================================
+# 🛠️ معالجات مهام صفحة الإدارة
+# ====================================================
+
+def _undo_batches(ctx, state: dict):
+    """حذف الدفعات التي حفظتها مهمة أُلغيت أو فشلت (كل دفعة في معاملتها، فلا ROLLBACK واحد يلغيها)"""
+    if state and state.get("ids"):
+        removed = ctx.registry.remove_children(state["ids"])
+        log.warning("job %s: removed %d committed children", ctx.job_id, removed["children"])
+
+
+@job_handler("import_children")
+def _import_children(ctx, path: str, filename: str):
+    source = Path(path)
+    size = max(source.stat().st_size, 1)
+    out = ctx.out_dir / f"job_{ctx.job_id}_rejected.csv"
+    if ctx.checkpoint is None:
+        out.unlink(missing_ok=True)
+    latest = ctx.checkpoint
+
+    def on_commit(state, rejected):
+        nonlocal latest
+        latest = state
+        # المرفوضات تُضاف للملف مع كل دفعة (المهمة المستكملة تكمل نفس الملف)
+        if not rejected.empty:
+            rejected.to_csv(out, mode="a", header=not out.exists(), index=False)
+        ctx.save_checkpoint(state)
+
+    try:
+        with open(source, "rb") as fh:
+            # دفعة في كل معاملة: قفل الكتابة يُترك بين الدفعات لحفظ العيادات أثناء الاستيراد
+            report = ctx.registry.import_children(fh, filename, resume=ctx.checkpoint, on_commit=on_commit,
+                                                  progress=lambda read, ok: ctx.progress(
+                                                      min(fh.tell() / size, 0.99), f"{read:,} rows read / {ok:,} inserted"))
+    except Exception:
+        # الإلغاء أو الفشل لا يترك نصف ملف في القاعدة
+        _undo_batches(ctx, latest)
+        out.unlink(missing_ok=True)
+        source.unlink(missing_ok=True)
+        raise
+    # بعد التعطل يبقى الملف حتى تُعاد المهمة وتكمل من checkpoint
+    source.unlink(missing_ok=True)
+    result = {k: report[k] for k in ("read", "inserted", "seconds", "rows_per_sec")}
+    result["rejected"] = latest["rejected"] if latest else 0
+    if out.exists():
+        result["path"] = str(out)
+    return result
+
+
+@job_handler("export_children")
+def _export_children(ctx, fmt="csv", gzip_output=False, filters=None):
+    filters = filters or {}
+    total = max(ctx.registry.count_children(**filters), 1)
+    result = ctx.registry.export_children(fmt=fmt, gzip_output=gzip_output, out_dir=ctx.out_dir,
+                                          progress=lambda rows: ctx.progress(rows / total, f"{rows:,} rows"), **filters)
+    return {**result, "path": str(result["path"])}
+
+
+@job_handler("render_certificates")
+def _render_certificates(ctx, fmt="pdf", filters=None):
+    from eohealth_certificates import render_certificates_batch, render_qr_sheets
+    from eohealth_metrics import METRICS
+
+    filters = filters or {}
+    on_progress = lambda done, n, rate: ctx.progress(done / max(n, 1), f"{done:,}/{n:,} — {rate:.1f}/sec")
+    stamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    # الرسم نفسه في عمليات فرعية (ProcessPoolExecutor) — هذا الـ thread يجمع الصفحات ويكتبها فقط
+    total = ctx.registry.count_children(**filters)
+    with ctx.registry.children_rows(**filters) as (columns, batches):
+        children = (dict(zip(columns, row)) for batch in batches for row in batch)
+        if fmt == "qr":
+            result = render_qr_sheets(children, ctx.out_dir / f"qr_cards_{stamp}.pdf", total=total, progress=on_progress)
+        else:
+            result = render_certificates_batch(children, ctx.out_dir / f"birth_certificates_{stamp}.{fmt}", fmt=fmt,
+                                               total=total, progress=on_progress)
+    METRICS.observe("render", f"batch.{fmt}", result["seconds"])
+    return {**result, "path": str(result["path"])}
+
+
+@job_handler("clear_database")
+def _clear_database(ctx):
+    ctx.check_cancelled()
+    return ctx.registry.clear_children()
+
+
+@job_handler("synthetic_registry")
+def _synthetic_registry(ctx, children: int, records_per_child=2, seed=None, today=None):
+    from eohealth_synthetic import SEED
+
+    latest = ctx.checkpoint
+    # المهمة المستكملة تولد نفس الأطفال: نفس تاريخ التشغيل الأول
+    today = today or (latest or {}).get("today") or datetime.utcnow().date().isoformat()
+
+    def on_commit(state):
+        nonlocal latest
+        latest = {**state, "today": today}
+        ctx.save_checkpoint(latest)
+
+    try:
+        result = ctx.registry.populate(children, records_per_child=records_per_child,
+                                       seed=SEED if seed is None else seed, today=today,
+                                       resume=ctx.checkpoint, on_commit=on_commit,
+                                       progress=lambda done, total: ctx.progress(done / total, f"{done:,}/{total:,} children"))
+    except Exception:
+        _undo_batches(ctx, latest)
+        raise
+    # مؤشرات النمو للسجلات الجديدة هنا (دفعات قصيرة) — وليس في أول حفظ من العيادة بعد المهمة
+    return {**result, "growth_records": ctx.registry.refresh_growth()["records"]}
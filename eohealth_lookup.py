@@ -0,0 +1,177 @@
+# =========================
+# 🔍 EoHealth Egypt — البحث عن الطفل بالكارت الذكي / الرقم القومي
+# استعلام واحد بالفهارس (الطفل + آخر سجل طبي) + كاش ساخن بصلاحية زمنية
+# =========================
+
+import threading
+import time
+from collections import deque
+
+from eohealth_cache import LRUCache
+from eohealth_db import child_version
+
+HOT_CACHE_SIZE = 2048
+HOT_CACHE_TTL_S = 60
+LATENCY_WINDOW = 5000
+BATCH_PARAMS = 500             # حد المعاملات في استعلام IN واحد
+
+# الطفل + آخر سجل طبي في round-trip واحد (idx_medical_child يجيب آخر سجل مباشرة)
+_LOOKUP_SQL = """
+SELECT c.id, c.full_name, c.national_id, c.smart_id, c.birth_date, c.gender,
+       c.mother_id, c.father_id, c.governorate, c.created_at,
+       m.id, m.record_date, m.weight, m.height, m.bmi, m.vaccinations, m.diagnoses, m.medications, m.notes,
+       COALESCE(v.version, 0)
+FROM children c
+LEFT JOIN medical_files m
+  ON m.id = (SELECT id FROM medical_files WHERE child_id = c.id ORDER BY id DESC LIMIT 1)
+LEFT JOIN child_versions v ON v.child_id = c.id
+WHERE {where}
+{limit}
+"""
+CHILD_COLS = ["id", "full_name", "national_id", "smart_id", "birth_date", "gender",
+              "mother_id", "father_id", "governorate", "created_at"]
+MEDICAL_COLS = ["id", "record_date", "weight", "height", "bmi", "vaccinations", "diagnoses", "medications", "notes"]
+
+
+def parse_scan(code: str):
+    """تحليل الكود الممسوح: 'smart_id|national_id' أو رقم مكتوب (هوية ذكية أو رقم قومي)"""
+    code = (code or "").strip()
+    if not code:
+        return None
+    if "|" in code:
+        smart_id, _, national_id = code.partition("|")
+        return {"smart_id": smart_id.strip(), "national_id": national_id.strip()}
+    if code.upper().startswith("EOH-"):
+        return {"smart_id": code.upper()}
+    return {"any_id": code}
+
+
+def _query(conn, parsed):
+    if "smart_id" in parsed:
+        # الـ QR يحمل الرقمين: نبحث بالهوية الذكية ونتأكد أن الرقم القومي مطابق
+        rows = conn.execute(_LOOKUP_SQL.format(where="c.smart_id = ?", limit="LIMIT 2"), (parsed["smart_id"],)).fetchall()
+        if parsed.get("national_id"):
+            rows = [r for r in rows if r[2] == parsed["national_id"]]
+    else:
+        # رقم مكتوب يدوياً: الهوية الذكية أو الرقم القومي (SQLite يستخدم الفهرسين عبر OR)
+        rows = conn.execute(_LOOKUP_SQL.format(where="c.smart_id = ? OR c.national_id = ?", limit="LIMIT 2"),
+                            (parsed["any_id"], parsed["any_id"])).fetchall()
+    return _result(rows)
+
+
+def _result(rows):
+    if len(rows) != 1:
+        return None
+    row = rows[0]
+    child = dict(zip(CHILD_COLS, row[:len(CHILD_COLS)]))
+    med = row[len(CHILD_COLS):-1]
+    return {"child": child, "latest_medical": dict(zip(MEDICAL_COLS, med)) if med[0] is not None else None,
+            "version": row[-1]}
+
+
+def _query_many(conn, parsed_list) -> list:
+    """نفس نتائج _query لعدة أكواد باستعلامات IN قليلة بدل استعلام لكل كود"""
+    smart_ids = sorted({p.get("smart_id") or p["any_id"] for p in parsed_list})
+    national_ids = sorted({p["any_id"] for p in parsed_list if "any_id" in p})
+    by_smart, by_national = {}, {}
+    for column, values in (("smart_id", smart_ids), ("national_id", national_ids)):
+        for i in range(0, len(values), BATCH_PARAMS):
+            chunk = values[i:i + BATCH_PARAMS]
+            where = f"c.{column} IN ({', '.join('?' * len(chunk))})"
+            for row in conn.execute(_LOOKUP_SQL.format(where=where, limit=""), chunk):
+                by_smart.setdefault(row[3], {})[row[0]] = row
+                by_national.setdefault(row[2], {})[row[0]] = row
+    results = []
+    for p in parsed_list:
+        if "smart_id" in p:
+            rows = [r for r in by_smart.get(p["smart_id"], {}).values()
+                    if not p.get("national_id") or r[2] == p["national_id"]]
+        else:
+            rows = list({**by_smart.get(p["any_id"], {}), **by_national.get(p["any_id"], {})}.values())
+        results.append(_result(rows))
+    return results
+
+
+class ChildLookup:
+    """خدمة البحث: كاش ساخن للكروت الممسوحة حديثاً + قياس زمن كل عملية
+
+    validate=True: كل نتيجة من الكاش تُقارن بنسخة الطفل في القاعدة (قراءة مفتاح واحد) فكتابة من
+    عملية أخرى (الـ API ↔ التطبيق) تظهر فوراً بدل انتظار انتهاء TTL
+    """
+
+    def __init__(self, pool, cache_size=HOT_CACHE_SIZE, ttl=HOT_CACHE_TTL_S, validate=False):
+        self.pool = pool
+        self.validate = validate
+        self.cache = LRUCache(cache_size, ttl)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def lookup(self, code: str):
+        """إرجاع {'child', 'latest_medical'} أو None لو الكود غير معروف"""
+        t0 = time.perf_counter()
+        parsed = parse_scan(code)
+        if parsed is None:
+            return None
+        key = tuple(sorted(parsed.items()))
+        result = self.cache.get(key)
+        if result is not None and self.validate and self._version(result["child"]["id"]) != result["version"]:
+            result = None
+        if result is None:
+            result = self._fetch(parsed)
+            if result is not None:
+                self.cache.set(key, result)
+        with self._lock:
+            self._latencies.append((time.perf_counter() - t0) * 1000)
+        return result
+
+    def cached(self, code: str):
+        """النتيجة من الكاش الساخن فقط (بدون قاعدة البيانات) — None لو غير موجودة"""
+        parsed = parse_scan(code)
+        return self.cache.get(tuple(sorted(parsed.items()))) if parsed else None
+
+    def lookup_many(self, codes) -> list:
+        """بحث دفعة أكواد باتصال واحد — النتائج بنفس ترتيب الأكواد"""
+        t0 = time.perf_counter()
+        parsed = [parse_scan(c) for c in codes]
+        results = [None] * len(codes)
+        misses = []
+        for i, p in enumerate(parsed):
+            if p is not None:
+                results[i] = self.cache.get(tuple(sorted(p.items())))
+                if results[i] is None:
+                    misses.append(i)
+        if misses:
+            found = self._fetch_many([parsed[i] for i in misses])
+            for i, result in zip(misses, found):
+                results[i] = result
+                if result is not None:
+                    self.cache.set(tuple(sorted(parsed[i].items())), result)
+        elapsed = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self._latencies.extend([elapsed] * len(codes))
+        return results
+
+    def _fetch(self, parsed):
+        with self.pool.connection() as conn:
+            return _query(conn, parsed)
+
+    def _version(self, child_id: int) -> int:
+        with self.pool.connection() as conn:
+            return child_version(conn, child_id)
+
+    def _fetch_many(self, parsed_list) -> list:
+        with self.pool.connection() as conn:
+            return _query_many(conn, parsed_list)
+
+    def invalidate_child(self, child_id: int):
+        """حذف الطفل من الكاش بعد تعديل بياناته أو إضافة سجل طبي له"""
+        return self.cache.invalidate_where(lambda r: r["child"]["id"] == child_id)
+
+    def latency_stats(self) -> dict:
+        """p50 / p99 لآخر عمليات البحث بالمللي ثانية"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return {"count": 0, "p50_ms": 0.0, "p99_ms": 0.0}
+        pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+        return {"count": len(samples), "p50_ms": round(pick(0.50), 3), "p99_ms": round(pick(0.99), 3)}
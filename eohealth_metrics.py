@@ -0,0 +1,251 @@
+# =========================
+# 📈 EoHealth Egypt — قياس الأداء داخل التطبيق
+# أزمنة SQL حسب شكل الاستعلام + أزمنة الصفحات والرسم + عدادات الكاش — تصدير JSON / Prometheus
+# =========================
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache, wraps
+
+SAMPLE_WINDOW = 1024            # آخر N قياس لكل سلسلة (لحساب p50/p95 بذاكرة ثابتة)
+MAX_SERIES = 500                # حد لعدد السلاسل حتى لا يكبر السجل مع استعلامات ديناميكية
+OTHER = "<other>"
+FINGERPRINT_MAX_LEN = 300
+
+# اسم الـ label في Prometheus لكل عائلة
+LABELS = {"sql": "fingerprint", "page": "page", "script": "name", "render": "name", "cache_load": "cache", "api": "route",
+          "writer": "stage"}
+HELP = {
+    "sql": "SQL statement time (execute + fetch) by statement fingerprint",
+    "page": "Streamlit page branch render time",
+    "script": "Whole script run time",
+    "render": "Certificate / QR rendering time",
+    "cache_load": "st.cache_data loader time on cache miss",
+    "api": "Lookup API request time by route",
+    "writer": "Write path time: commit per group and caller wait until acknowledged, by write mode",
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql: str) -> str:
+    """شكل الاستعلام بدون القيم: الأرقام والنصوص → ? و IN (?, ?, ...) → IN (?+)"""
+    text = _NUMBER.sub("?", _STRING.sub("?", sql))
+    text = _SPACE.sub(" ", _IN_LIST.sub("(?+)", text)).strip()
+    return text[:FINGERPRINT_MAX_LEN]
+
+
+class Timing:
+    """عدد + مجموع + أقصى زمن + نافذة آخر القياسات"""
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self, window=SAMPLE_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def snapshot(self) -> dict:
+        s = sorted(self.samples)
+        pick = lambda q: s[min(len(s) - 1, int(q * len(s)))] if s else 0.0
+        return {"count": self.count, "total": self.total, "mean": self.total / self.count if self.count else 0.0,
+                "p50": pick(0.50), "p95": pick(0.95), "max": self.max}
+
+
+class Metrics:
+    """سجل القياسات لكل العملية (آمن للاستخدام من جلسات Streamlit المتزامنة)"""
+
+    def __init__(self, window=SAMPLE_WINDOW, max_series=MAX_SERIES):
+        self.window = window
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._timings = {}      # {family: {name: Timing}}
+            self._counters = {}     # {family: {name: {kind: n}}}
+            self.since = datetime.utcnow().isoformat(timespec="seconds")
+
+    def observe(self, family: str, name: str, seconds: float):
+        with self._lock:
+            series = self._timings.setdefault(family, {})
+            if name not in series and len(series) >= self.max_series:
+                name = OTHER
+            timing = series.get(name)
+            if timing is None:
+                timing = series[name] = Timing(self.window)
+            timing.observe(seconds)
+
+    def count(self, family: str, name: str, kind: str, n=1):
+        with self._lock:
+            kinds = self._counters.setdefault(family, {}).setdefault(name, {})
+            kinds[kind] = kinds.get(kind, 0) + n
+
+    @contextmanager
+    def timer(self, family: str, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(family, name, time.perf_counter() - t0)
+
+    def timed(self, family: str, name=None):
+        """ديكوريتور: قياس كل استدعاء للدالة"""
+        def decorate(fn):
+            label = name or fn.__qualname__
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                t0 = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(family, label, time.perf_counter() - t0)
+            return wrapper
+        return decorate
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            timings = {f: {n: t.snapshot() for n, t in series.items()} for f, series in self._timings.items()}
+            counters = {f: {n: dict(k) for n, k in names.items()} for f, names in self._counters.items()}
+        return {"since": self.since, "timings": timings, "counters": counters}
+
+    def to_json(self, extra=None) -> str:
+        snap = self.snapshot()
+        if extra:
+            snap.update(extra)
+        return json.dumps(snap, indent=2, ensure_ascii=False, default=str)
+
+    def to_prometheus(self, prefix="eohealth") -> str:
+        """صيغة Prometheus النصية: summary لكل عائلة أزمنة + counter لكل عداد"""
+        snap = self.snapshot()
+        lines = []
+        for family, series in sorted(snap["timings"].items()):
+            metric, label = f"{prefix}_{family}_seconds", LABELS.get(family, "name")
+            lines += [f"# HELP {metric} {HELP.get(family, family)}", f"# TYPE {metric} summary"]
+            for name, s in sorted(series.items()):
+                lv = f'{label}="{_escape(name)}"'
+                lines += [f'{metric}{{{lv},quantile="0.5"}} {s["p50"]:.6f}',
+                          f'{metric}{{{lv},quantile="0.95"}} {s["p95"]:.6f}',
+                          f"{metric}_sum{{{lv}}} {s['total']:.6f}",
+                          f"{metric}_count{{{lv}}} {s['count']}"]
+        for family, names in sorted(snap["counters"].items()):
+            for kind in sorted({k for kinds in names.values() for k in kinds}):
+                metric = f"{prefix}_{family}_{kind}_total"
+                lines += [f"# TYPE {metric} counter"]
+                lines += [f'{metric}{{name="{_escape(name)}"}} {kinds.get(kind, 0)}' for name, kinds in sorted(names.items())]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+METRICS = Metrics()  # سجل واحد للعملية (العمليات الفرعية لتوليد الشهادات لها سجلها الخاص)
+
+
+# ====================================================
+# 🗄️ اتصال SQLite مُقاس (factory لـ sqlite3.connect)
+# ====================================================
+
+class TimedCursor(sqlite3.Cursor):
+    """زمن الاستعلام = execute + كل fetch حتى نهاية النتائج أو إغلاق الـ cursor"""
+
+    _pending = None
+
+    def _flush(self):
+        if self._pending is not None:
+            fp, seconds = self._pending
+            self._pending = None
+            self.connection.metrics.observe("sql", fp, seconds)
+
+    def _run(self, method, sql, args):
+        self._flush()
+        t0 = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            self._pending = [fingerprint(sql), time.perf_counter() - t0]
+
+    def execute(self, sql, *args):
+        return self._run(super().execute, sql, args)
+
+    def executemany(self, sql, *args):
+        return self._run(super().executemany, sql, args)
+
+    def executescript(self, sql):
+        return self._run(super().executescript, sql, ())
+
+    def _fetch(self, method, *args):
+        t0 = time.perf_counter()
+        rows = method(*args)
+        if self._pending is not None:
+            self._pending[1] += time.perf_counter() - t0
+        return rows
+
+    def fetchone(self):
+        row = self._fetch(super().fetchone)
+        if row is None:
+            self._flush()
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._fetch(super().fetchmany, *args)
+        if not rows:
+            self._flush()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(super().fetchall)
+        self._flush()
+        return rows
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        # الـ cursor الذي يُقرأ بالتكرار (for row in cur) يُسجَّل عند تحريره
+        try:
+            self._flush()
+        except Exception:
+            pass
+
+
+class TimedConnection(sqlite3.Connection):
+    """كل الاستعلامات (بما فيها pandas.read_sql_query) تمر عبر TimedCursor — metrics يُضبط بعد الفتح"""
+
+    metrics = METRICS
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, *args):
+        return self.cursor().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        return self.cursor().executemany(sql, *args)
+
+    def executescript(self, sql):
+        return self.cursor().executescript(sql)
+
+    def commit(self):
+        with self.metrics.timer("sql", "COMMIT"):
+            super().commit()
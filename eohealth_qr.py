@@ -0,0 +1,71 @@
+# =========================
+# 🔳 EoHealth Egypt — توليد رموز QR
+# كاش LRU حسب (المحتوى + إعدادات الرسم) + صيغ PNG / PIL / SVG
+# =========================
+
+from functools import lru_cache
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+
+from eohealth_metrics import METRICS
+
+BOX_SIZE = 6
+BORDER = 2
+QR_CACHE_SIZE = 1024           # PNG (~1KB) و SVG
+QR_IMAGE_CACHE_SIZE = 256      # صور PIL بتدرج رمادي (~50KB لصورة 220x220)
+
+
+def card_payload(smart_id, national_id) -> str:
+    """محتوى الـ QR على الكارت: smart_id|national_id"""
+    return f"{smart_id}|{national_id}"
+
+
+@METRICS.timed("render", "qr.encode")
+def _make_qr(payload: str, box_size: int, border: int, image_factory=None):
+    qr = qrcode.QRCode(box_size=box_size, border=border, image_factory=image_factory)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr.make_image(fill_color="black", back_color="white")
+
+
+@lru_cache(maxsize=QR_IMAGE_CACHE_SIZE)
+@METRICS.timed("render", "qr.image")
+def qr_image(payload: str, size=None, box_size=BOX_SIZE, border=BORDER):
+    """صورة PIL (L) جاهزة للصق مباشرة بدون ترميز PNG — للقراءة فقط لأنها مشتركة في الكاش"""
+    img = _make_qr(payload, box_size, border).get_image().convert("L")
+    if size:
+        img = img.resize((size, size))
+    return img
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+@METRICS.timed("render", "qr.png")
+def qr_png_bytes(payload: str, box_size=BOX_SIZE, border=BORDER) -> bytes:
+    """الـ QR كملف PNG (bytes)"""
+    buf = BytesIO()
+    _make_qr(payload, box_size, border).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+@METRICS.timed("render", "qr.svg")
+def qr_svg(payload: str, box_size=BOX_SIZE, border=BORDER) -> str:
+    """الـ QR كـ SVG (نص) — مناسب للطباعة بأي مقاس"""
+    buf = BytesIO()
+    _make_qr(payload, box_size, border, image_factory=qrcode.image.svg.SvgPathImage).save(buf)
+    return buf.getvalue().decode("utf-8")
+
+
+def generate_qr_bytes(data_str: str) -> BytesIO:
+    """توليد كود QR لبيانات الطفل"""
+    return BytesIO(qr_png_bytes(data_str))
+
+
+def cache_stats() -> dict:
+    """إحصائيات الكاش لكل صيغة"""
+    return {
+        name: fn.cache_info()._asdict()
+        for name, fn in (("image", qr_image), ("png", qr_png_bytes), ("svg", qr_svg))
+    }
@@ -0,0 +1,485 @@
+# =========================
+# 🗺️ EoHealth Egypt — تخزين مقسم حسب المحافظة (ملف SQLite لكل محافظة أو لكل hash bucket)
+# الكتابة من كل مكتب تنتظر قفل ملفها فقط، والشاشات القومية تستعلم كل الملفات بالتوازي وتدمج النتائج
+# python eohealth_shards.py split eohealth.db --out shards --layout governorate
+# =========================
+
+import argparse
+import re
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from eohealth_db import ConnectionPool, migrate, backfill_name_norm, insert_child, count_children, fetch_children_page
+from eohealth_db import distinct_values, read_stats, stats_trend, search_children, child_version
+from eohealth_lookup import ChildLookup, _query, _query_many
+from eohealth_writer import GroupCommitWriter
+
+SHARDS_DIR = Path("shards")
+SHARD_ID_STRIDE = 10 ** 9       # أرقام السجلات في الملف k تبدأ من k * STRIDE: الرقم نفسه يحدد الملف
+REMOVE_CHUNK_IDS = 5_000        # أرقام لكل معاملة حذف (قفل الكتابة قصير أثناء التنظيف)
+SHARD_POOL_SIZE = 4
+OTHER_SHARD = 0                 # محافظة غير معروفة / فارغة (ونفس أرقام الملف الواحد القديم)
+ID_TABLES = ("children", "medical_files", "medical_attachments", "vaccination_events", "vaccination_bookings")
+
+# أكواد المحافظات في الرقم القومي (الخانتان 8-9) — نفس الترتيب يحدد رقم الملف في layout=governorate
+GOVERNORATE_CODES = {
+    "Cairo": 1, "Alexandria": 2, "Port Said": 3, "Suez": 4, "Damietta": 11, "Dakahliya": 12, "Sharqia": 13,
+    "Qalyubia": 14, "Kafr El Sheikh": 15, "Gharbia": 16, "Monufia": 17, "Beheira": 18, "Ismailia": 19,
+    "Giza": 21, "Beni Suef": 22, "Faiyum": 23, "Minya": 24, "Asyut": 25, "Sohag": 26, "Qena": 27,
+    "Aswan": 28, "Luxor": 29, "Red Sea": 31, "New Valley": 32, "Matrouh": 33, "North Sinai": 34, "South Sinai": 35,
+}
+_GOV_BY_CODE = {code: name for name, code in GOVERNORATE_CODES.items()}
+_SMART_ID = re.compile(r"^EOH-\d{8}-(\d+)$", re.IGNORECASE)
+
+
+class ShardRouter:
+    """رقم الملف من المحافظة / رقم السجل / الهوية الذكية / الرقم القومي
+
+    layout="governorate": ملف لكل محافظة (1..27) + ملف 0 للمحافظات غير المعروفة
+    layout=N (رقم): N ملف حسب hash اسم المحافظة — كل محافظة دائماً في نفس الملف
+    """
+
+    def __init__(self, layout="governorate"):
+        self.layout = layout
+        if layout == "governorate":
+            self._by_gov = {name.lower(): i + 1 for i, name in enumerate(GOVERNORATE_CODES)}
+            self.names = {OTHER_SHARD: "other", **{i + 1: _slug(n) for i, n in enumerate(GOVERNORATE_CODES)}}
+        else:
+            self.buckets = int(layout)
+            if self.buckets < 1:
+                raise ValueError("shard layout must be 'governorate' or a positive bucket count")
+            self.names = {k: f"bucket{k:02d}" for k in range(self.buckets)}
+
+    @property
+    def shards(self) -> list:
+        return sorted(self.names)
+
+    def for_governorate(self, governorate) -> int:
+        key = (governorate or "").strip().lower()
+        if self.layout == "governorate":
+            return self._by_gov.get(key, OTHER_SHARD)
+        return zlib.crc32(key.encode("utf-8")) % self.buckets
+
+    def for_child_id(self, child_id: int) -> int:
+        return int(child_id) // SHARD_ID_STRIDE
+
+    def for_code(self, parsed: dict):
+        """تلميح الملف من كود ممسوح (None = غير معروف → البحث في كل الملفات)"""
+        for key in ("smart_id", "any_id"):
+            m = _SMART_ID.match(parsed.get(key) or "")
+            if m:
+                shard = int(m.group(1)) // SHARD_ID_STRIDE
+                return shard if shard in self.names else None
+        for key in ("national_id", "any_id"):
+            nid = parsed.get(key) or ""
+            # الرقم القومي المصري: قرن + تاريخ ميلاد (6) + كود المحافظة (2) + ...
+            if len(nid) == 14 and nid.isdigit() and int(nid[7:9]) in _GOV_BY_CODE:
+                return self.for_governorate(_GOV_BY_CODE[int(nid[7:9])])
+        return None
+
+
+def _slug(name: str) -> str:
+    return name.lower().replace(" ", "_")
+
+
+def _concat(frames: list):
+    """دمج نتائج الملفات (بدون الإطارات الفارغة حتى لا تتغير أنواع الأعمدة)"""
+    import pandas as pd
+
+    return pd.concat([f for f in frames if not f.empty] or frames[:1], ignore_index=True)
+
+
+class ShardedRegistry:
+    """مجمّع اتصالات لكل ملف + موجّه + fan-out بالتوازي للشاشات القومية
+
+    ShardedRegistry.single(pool) يغلف قاعدة الملف الواحد بنفس الواجهة (ملف واحد، بدون threads)
+    """
+
+    def __init__(self, pools: dict, router=None, workers=None):
+        self.pools = pools
+        self.router = router
+        # كاتب لكل ملف: strict افتراضياً (بدون thread) حتى يُفعَّل group commit بـ use_writers
+        self.writers = {k: GroupCommitWriter(pool, mode="strict") for k, pool in pools.items()}
+        self._executor = ThreadPoolExecutor(max_workers=workers or min(len(pools), 8),
+                                            thread_name_prefix="eohealth-shard") if len(pools) > 1 else None
+
+    @classmethod
+    def open(cls, base_dir=SHARDS_DIR, layout="governorate", pool_size=SHARD_POOL_SIZE, metrics=None, workers=None):
+        router = ShardRouter(layout)
+        base_dir = Path(base_dir)
+        base_dir.mkdir(parents=True, exist_ok=True)
+        pools = {k: ConnectionPool(base_dir / f"eohealth_{name}.db", size=pool_size, metrics=metrics)
+                 for k, name in router.names.items()}
+        return cls(pools, router, workers)
+
+    @classmethod
+    def single(cls, pool):
+        return cls({OTHER_SHARD: pool})
+
+    @property
+    def sharded(self) -> bool:
+        return self.router is not None
+
+    def use_writers(self, mode="group", **kwargs):
+        """وضع الكتابة لكل الملفات: strict (معاملة لكل حفظ) أو group (COMMIT واحد لكل مجموعة)"""
+        old, self.writers = self.writers, {k: GroupCommitWriter(pool, mode, **kwargs).start()
+                                           for k, pool in self.pools.items()}
+        for writer in old.values():
+            writer.close()
+        return self
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+        for pool in self.pools.values():
+            pool.close()
+
+    # ---------------- التهيئة ----------------
+    def migrate(self) -> dict:
+        """ترحيل كل الملفات + بداية عداد AUTOINCREMENT لكل ملف عند k * STRIDE"""
+        applied = self.each_pool(migrate)
+        self.each_pool(backfill_name_norm)   # أسماء كتبها عميل خارجي بدون name_norm
+        if self.sharded:
+            def seed(k, pool):
+                with pool.transaction() as conn:
+                    for table in ID_TABLES:
+                        conn.execute("INSERT INTO sqlite_sequence (name, seq) SELECT ?, 0 "
+                                     "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)", (table, table))
+                        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?",
+                                     (k * SHARD_ID_STRIDE, table))
+            self._map([lambda k=k, p=p: seed(k, p) for k, p in self.pools.items()])
+        return dict(zip(self.pools, applied))
+
+    # ---------------- التوجيه ----------------
+    def shard_for_child(self, child_id: int) -> int:
+        if not self.sharded:
+            return OTHER_SHARD
+        shard = self.router.for_child_id(child_id)
+        if shard not in self.pools:
+            raise KeyError(f"child id {child_id} does not belong to any shard")
+        return shard
+
+    def shard_for_governorate(self, governorate) -> int:
+        return self.router.for_governorate(governorate) if self.sharded else OTHER_SHARD
+
+    def pool_for_child(self, child_id: int) -> ConnectionPool:
+        return self.pools[self.shard_for_child(child_id)]
+
+    def pool_for_governorate(self, governorate) -> ConnectionPool:
+        return self.pools[self.shard_for_governorate(governorate)]
+
+    def writer_for_child(self, child_id: int) -> GroupCommitWriter:
+        return self.writers[self.shard_for_child(child_id)]
+
+    def writer_for_governorate(self, governorate) -> GroupCommitWriter:
+        return self.writers[self.shard_for_governorate(governorate)]
+
+    def writer_stats(self) -> dict:
+        parts = [w.stats() for w in self.writers.values()]
+        groups, rows = sum(p["groups"] for p in parts), sum(p["rows"] for p in parts)
+        return {"mode": parts[0]["mode"], "files": len(parts), "groups": groups, "rows": rows,
+                "queued": sum(p["queued"] for p in parts), "mean_group": round(rows / groups, 2) if groups else 0.0}
+
+    def _targets(self, governorate=None):
+        # فلتر المحافظة يحدد ملفاً واحداً، غير ذلك كل الملفات
+        return [self.pool_for_governorate(governorate)] if governorate else list(self.pools.values())
+
+    # ---------------- fan-out ----------------
+    def _map(self, calls: list) -> list:
+        if self._executor is None or len(calls) == 1:
+            return [call() for call in calls]
+        return [f.result() for f in [self._executor.submit(call) for call in calls]]
+
+    def fan_out(self, fn, pools=None) -> list:
+        """fn(conn) على كل ملف بالتوازي — النتائج بترتيب الملفات"""
+        def run(pool):
+            with pool.connection() as conn:
+                return fn(conn)
+        return self._map([lambda p=p: run(p) for p in (pools or self.pools.values())])
+
+    def each_pool(self, fn, pools=None) -> list:
+        """fn(pool) على كل ملف بالتوازي (للعمليات التي تدير معاملاتها بنفسها)"""
+        return self._map([lambda p=p: fn(p) for p in (pools or self.pools.values())])
+
+    # ---------------- الكتابة ----------------
+    def insert_child(self, rec: dict) -> int:
+        return self.writer_for_governorate(rec.get("governorate")).write(insert_child, rec)
+
+    # ---------------- المهام بالجملة (صفحة الإدارة) ----------------
+    def import_children(self, fileobj, filename: str, **kwargs) -> dict:
+        """استيراد ملف Excel/CSV — كل طفل في ملف محافظته (معاملة مفتوحة على كل الملفات حتى النهاية)"""
+        from eohealth_io import import_children
+
+        shard_of = self.shard_for_governorate if self.sharded else None
+        return import_children(self.pools, fileobj, filename, shard_of=shard_of, **kwargs)
+
+    def populate(self, children: int, **kwargs) -> dict:
+        """بيانات تجريبية موزعة على الملفات حسب المحافظة"""
+        from eohealth_synthetic import populate
+
+        if not self.sharded:
+            return populate(self.pools[OTHER_SHARD], children, **kwargs)
+        return populate(self.pools, children, shard_of=self.shard_for_governorate, stride=SHARD_ID_STRIDE, **kwargs)
+
+    def children_rows(self, **filters):
+        """(الأعمدة, الدفعات) من كل الملفات بالتتابع بترتيب id — context manager"""
+        from eohealth_io import children_rows
+
+        return children_rows(self._targets(filters.get("governorate")), **filters)
+
+    def export_children(self, **kwargs) -> dict:
+        from eohealth_io import export_children
+
+        return export_children(self._targets(kwargs.get("governorate")), **kwargs)
+
+    def clear_children(self) -> dict:
+        """حذف كل الأطفال وسجلاتهم من كل الملفات"""
+        def clear(pool):
+            with pool.transaction() as conn:
+                medical = conn.execute("DELETE FROM medical_files").rowcount
+                return conn.execute("DELETE FROM children").rowcount, medical
+        parts = self.each_pool(clear)
+        return {"children": sum(c for c, _ in parts), "medical_records": sum(m for _, m in parts)}
+
+    def remove_children(self, ranges, chunk=REMOVE_CHUNK_IDS) -> dict:
+        """حذف نطاقات أرقام [(أول, آخر)] (تنظيف مهمة أُلغيت) — كل chunk رقم في معاملة قصيرة في ملفه"""
+        children = medical = 0
+        for first, last in ranges:
+            for lo in range(first, last + 1, chunk):
+                hi = min(lo + chunk - 1, last)
+                with self.pool_for_child(lo).transaction() as conn:
+                    medical += conn.execute("DELETE FROM medical_files WHERE child_id BETWEEN ? AND ?", (lo, hi)).rowcount
+                    children += conn.execute("DELETE FROM children WHERE id BETWEEN ? AND ?", (lo, hi)).rowcount
+        return {"children": children, "medical_records": medical}
+
+    # ---------------- الشاشات القومية ----------------
+    def count_children(self, **filters) -> int:
+        return sum(self.fan_out(lambda c: count_children(c, **filters), self._targets(filters.get("governorate"))))
+
+    def fetch_children_page(self, before_id=None, page_size=50, **filters):
+        frames = self.fan_out(lambda c: fetch_children_page(c, before_id, page_size, **filters),
+                              self._targets(filters.get("governorate")))
+        if len(frames) == 1:
+            return frames[0]
+        # كل ملف يرجع أول page_size بالترتيب التنازلي، والدمج يأخذ أول page_size من الكل
+        return _concat(frames).sort_values("id", ascending=False).head(page_size).reset_index(drop=True)
+
+    def distinct_values(self, column: str) -> list:
+        return sorted(set().union(*self.fan_out(lambda c: distinct_values(c, column))))
+
+    def search_children(self, text: str, limit=50):
+        frames = self.fan_out(lambda c: search_children(c, text, limit))
+        if len(frames) == 1:
+            return frames[0]
+        # كل ملف يرجع أفضل limit عنده: الدمج بالصلة (rank) وليس بترتيب الملفات
+        return _concat(frames).sort_values(["rank", "id"], kind="stable").head(limit).reset_index(drop=True)
+
+    def read_stats(self) -> dict:
+        parts = self.fan_out(read_stats)
+        by_gov = {}
+        for part in parts:
+            for gov, n in part["by_governorate"].items():
+                by_gov[gov] = by_gov.get(gov, 0) + n
+        return {
+            **{key: sum(p[key] for p in parts) for key in ("total_children", "medical_records", "uploaded_files")},
+            "by_governorate": dict(sorted(by_gov.items(), key=lambda kv: -kv[1])),
+        }
+
+    def stats_trend(self, metric="children", bucket="day"):
+        frames = self.fan_out(lambda c: stats_trend(c, metric, bucket))
+        if len(frames) == 1:
+            return frames[0]
+        df = _concat(frames).groupby("bucket", as_index=False)["count"].sum().sort_values("bucket")
+        df["cumulative"] = df["count"].cumsum()
+        return df.reset_index(drop=True)
+
+    def load_insights_frame(self, today=None):
+        from eohealth_insights import load_insights_frame
+
+        frames = self.fan_out(lambda c: load_insights_frame(c, today))
+        return frames[0] if len(frames) == 1 else _concat(frames)
+
+    def governorate_summary(self):
+        from eohealth_growth import governorate_summary
+
+        # كل محافظة في ملف واحد، لذا نسب كل ملف نهائية ولا تحتاج إعادة تجميع
+        frames = self.fan_out(governorate_summary)
+        if len(frames) == 1:
+            return frames[0]
+        return _concat(frames).sort_values("children", ascending=False).reset_index(drop=True)
+
+    def due_list(self, status=None, governorate=None, start=None, end=None, today=None, limit=1000):
+        from eohealth_vaccines import due_list
+
+        frames = self.fan_out(lambda c: due_list(c, status, governorate, start, end, today, limit), self._targets(governorate))
+        if len(frames) == 1:
+            return frames[0]
+        column = "overdue_date" if status == "overdue" else "due_date"
+        return (_concat(frames).sort_values([column, "child_id"])
+                .head(limit).reset_index(drop=True))
+
+    def refresh_growth(self, full=False) -> dict:
+        from eohealth_growth import refresh_growth
+
+        t0 = time.perf_counter()
+        parts = self.each_pool(lambda p: refresh_growth(p, full=full))
+        return {"records": sum(p["records"] for p in parts), "seconds": round(time.perf_counter() - t0, 3)}
+
+    def refresh_due_list(self, today=None) -> dict:
+        from eohealth_vaccines import refresh_due_list
+
+        t0 = time.perf_counter()
+        parts = self.each_pool(lambda p: refresh_due_list(p, today))
+        return {"children": sum(p["children"] for p in parts), "pending_doses": sum(p["pending_doses"] for p in parts),
+                "seconds": round(time.perf_counter() - t0, 2)}
+
+    def lookup(self, **kwargs) -> ChildLookup:
+        return ShardedLookup(self, **kwargs) if self.sharded else ChildLookup(self.pools[OTHER_SHARD], **kwargs)
+
+
+class ShardedLookup(ChildLookup):
+    """نفس ChildLookup (كاش + قياس) لكن القراءة من الملف الذي يشير له الكود، ثم كل الملفات لو لم يوجد"""
+
+    def __init__(self, registry: ShardedRegistry, **kwargs):
+        super().__init__(None, **kwargs)
+        self.registry = registry
+
+    def _fetch(self, parsed):
+        shard = self.registry.router.for_code(parsed)
+        if shard is not None:
+            with self.registry.pools[shard].connection() as conn:
+                result = _query(conn, parsed)
+            if result is not None:
+                return result
+        # بدون تلميح (أو الطفل مسجل في محافظة غير محافظة الميلاد): كل الملفات
+        found = [r for r in self.registry.fan_out(lambda c: _query(c, parsed)) if r is not None]
+        return found[0] if len(found) == 1 else None
+
+    def _version(self, child_id: int) -> int:
+        with self.registry.pool_for_child(child_id).connection() as conn:
+            return child_version(conn, child_id)
+
+    def _fetch_many(self, parsed_list) -> list:
+        results = [None] * len(parsed_list)
+        groups = {}
+        for i, p in enumerate(parsed_list):
+            groups.setdefault(self.registry.router.for_code(p), []).append(i)
+        hinted = [(shard, idx) for shard, idx in groups.items() if shard is not None]
+
+        def run(shard, idx):
+            with self.registry.pools[shard].connection() as conn:
+                return _query_many(conn, [parsed_list[i] for i in idx])
+        for (shard, idx), found in zip(hinted, self.registry._map([lambda s=s, i=i: run(s, i) for s, i in hinted])):
+            for i, result in zip(idx, found):
+                results[i] = result
+
+        rest = [i for i, r in enumerate(results) if r is None]
+        if rest:
+            per_shard = self.registry.fan_out(lambda c: _query_many(c, [parsed_list[i] for i in rest]))
+            for j, i in enumerate(rest):
+                found = [r[j] for r in per_shard if r[j] is not None]
+                results[i] = found[0] if len(found) == 1 else None
+        return results
+
+
+# ====================================================
+# ✂️ تقسيم قاعدة ملف واحد إلى ملفات
+# ====================================================
+
+def split_database(source, base_dir=SHARDS_DIR, layout="governorate", progress=None) -> dict:
+    """نسخ الأطفال وسجلاتهم (والتطعيمات والمرفقات) من eohealth.db إلى الملفات المقسمة
+
+    الأرقام الجديدة = الرقم القديم + k * STRIDE (لا تتكرر بين الملفات) — الهوية الذكية المطبوعة لا تتغير،
+    فالبحث بها يجد الطفل عبر fan-out حتى لو لم يشر رقمها للملف الصحيح
+    """
+    t0 = time.perf_counter()
+    registry = ShardedRegistry.open(base_dir, layout)
+    registry.migrate()
+    src = ConnectionPool(source)
+    with src.connection() as conn:
+        govs = [r[0] for r in conn.execute("SELECT DISTINCT governorate FROM children").fetchall()]
+    src.close()
+    by_shard = {}
+    for gov in govs:
+        by_shard.setdefault(registry.router.for_governorate(gov), []).append(gov)
+
+    def copy(shard, pool):
+        base = shard * SHARD_ID_STRIDE
+        gov_list = by_shard.get(shard, [])
+        if not gov_list:
+            return 0
+        # ATTACH غير مسموح داخل معاملة: نفتح الاتصال، نربط المصدر، ثم معاملة واحدة للنسخ
+        with pool.connection() as conn:
+            conn.execute("ATTACH DATABASE ? AS src", (str(source),))
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("CREATE TEMP TABLE shard_govs (governorate TEXT)")
+                conn.executemany("INSERT INTO shard_govs VALUES (?)", [(g,) for g in gov_list])
+                # NULL لا يطابق IN، لذا المحافظة الفارغة تُضاف صراحةً لملف "other"
+                mine = ("SELECT id FROM src.children WHERE governorate IN (SELECT governorate FROM shard_govs)"
+                        + (" OR governorate IS NULL" if None in gov_list else ""))
+                n = conn.execute(f"""
+                    INSERT INTO children (id, full_name, national_id, smart_id, birth_date, gender, mother_id,
+                                          father_id, governorate, created_at)
+                    SELECT id + {base}, full_name, national_id, smart_id, birth_date, gender, mother_id,
+                           father_id, governorate, created_at
+                    FROM src.children WHERE id IN ({mine})""").rowcount
+                conn.execute(f"""
+                    INSERT INTO medical_files (id, child_id, record_date, weight, height, bmi, vaccinations,
+                                               diagnoses, medications, notes, files, created_at)
+                    SELECT id + {base}, child_id + {base}, record_date, weight, height, bmi, vaccinations,
+                           diagnoses, medications, notes, files, created_at
+                    FROM src.medical_files WHERE child_id IN ({mine})""")
+                conn.execute(f"""
+                    INSERT INTO vaccination_events (id, child_id, vaccine_code, given_on, source, created_at)
+                    SELECT id + {base}, child_id + {base}, vaccine_code, given_on, source, created_at
+                    FROM src.vaccination_events WHERE child_id IN ({mine})""")
+                conn.execute(f"""
+                    INSERT INTO vaccination_bookings (id, child_id, vaccine_code, booked_for, created_at)
+                    SELECT id + {base}, child_id + {base}, vaccine_code, booked_for, created_at
+                    FROM src.vaccination_bookings WHERE child_id IN ({mine})""")
+                conn.execute(f"""
+                    INSERT INTO medical_attachments (id, medical_id, child_id, sha256, filename, mime, size, created_at)
+                    SELECT id + {base}, medical_id + {base}, child_id + {base}, sha256, filename, mime, size, created_at
+                    FROM src.medical_attachments WHERE child_id IN ({mine})""")
+                conn.execute("DROP TABLE temp.shard_govs")
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                conn.execute("DETACH DATABASE src")
+        if progress:
+            progress(shard, n)
+        return n
+
+    counts = registry._map([lambda k=k, p=p: copy(k, p) for k, p in registry.pools.items()])
+    registry.each_pool(backfill_name_norm)
+    # الجداول المشتقة (النمو + قائمة التطعيمات المستحقة) تُحسب من جديد في كل ملف
+    growth = registry.refresh_growth(full=True)
+    due = registry.refresh_due_list()
+    registry.close()
+    return {"children": sum(counts), "shards": len(counts), "growth_records": growth["records"],
+            "pending_doses": due["pending_doses"], "seconds": round(time.perf_counter() - t0, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EoHealth governorate-sharded storage tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    split = sub.add_parser("split", help="copy a single-file registry into shard files")
+    split.add_argument("source", help="existing eohealth.db")
+    split.add_argument("--out", default=str(SHARDS_DIR))
+    split.add_argument("--layout", default="governorate", help="'governorate' or a number of hash buckets")
+    args = parser.parse_args()
+    if args.command == "split":
+        result = split_database(args.source, args.out, args.layout,
+                                progress=lambda shard, n: print(f"shard {shard:>2}: {n:,} children"))
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# =========================
+# 📦 EoHealth Egypt — لقطات تحليلية عمودية (Parquet عبر pyarrow)
+# children و medical_files مقسمة حسب المحافظة وسنة الميلاد: <table>/governorate=.../birth_year=.../*.parquet
+# التحديث تزايدي (الصفوف الجديدة فقط في ملفات جديدة)، والقراءة memory-mapped مع اختيار الأعمدة وتصفية الأقسام
+# python eohealth_snapshots.py eohealth.db --out cache/snapshots [--full]
+# =========================
+
+import argparse
+import json
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+SNAPSHOT_DIR = Path("cache") / "snapshots"
+MANIFEST = "manifest.json"
+CHUNK_ROWS = 50_000
+ROW_GROUP_ROWS = 128_000   # الكاتب يجمع صفوف كل قسم حتى هذا العدد (بدون ذلك كل دفعة = row group صغيرة في كل قسم)
+MAX_INCREMENTS = 50     # بعد هذا العدد من التحديثات التزايدية يُعاد بناء الملف (دمج الملفات الصغيرة)
+
+PARTITIONING = ds.partitioning(pa.schema([("governorate", pa.string()), ("birth_year", pa.int16())]), flavor="hive")
+_FS = pafs.LocalFileSystem(use_mmap=True)
+_LOCK = threading.Lock()   # تحديث واحد في كل مرة داخل العملية (جلسات Streamlit + المهام)
+
+# كل جدول: استعلام الصفوف الجديدة (id > آخر id في اللقطة) + الأنواع في Parquet (نص التاريخ يُخزن date32)
+# عمود المحافظة وسنة الميلاد للسجل الطبي من الطفل نفسه حتى تُصفّى الجداول بنفس الأقسام
+TABLES = {
+    "children": {
+        "sql": """
+            SELECT id, full_name, national_id, smart_id, birth_date, gender, mother_id, father_id, created_at,
+                   NULLIF(TRIM(governorate), '') AS governorate,
+                   CAST(NULLIF(SUBSTR(birth_date, 1, 4), '') AS INTEGER) AS birth_year
+            FROM children WHERE id > ? ORDER BY id
+        """,
+        "schema": pa.schema([
+            ("id", pa.int64()), ("full_name", pa.string()), ("national_id", pa.string()), ("smart_id", pa.string()),
+            ("birth_date", pa.date32()), ("gender", pa.string()), ("mother_id", pa.string()),
+            ("father_id", pa.string()), ("created_at", pa.string()), ("governorate", pa.string()),
+            ("birth_year", pa.int16()),
+        ]),
+        "counter": "total_children",
+    },
+    "medical_files": {
+        "sql": """
+            SELECT m.id, m.child_id, m.record_date, m.weight, m.height, m.bmi,
+                   LENGTH(COALESCE(m.vaccinations, '')) > 0 AS has_vaccinations,
+                   m.vaccinations, m.diagnoses, m.medications, m.notes, m.created_at,
+                   NULLIF(TRIM(c.governorate), '') AS governorate,
+                   CAST(NULLIF(SUBSTR(c.birth_date, 1, 4), '') AS INTEGER) AS birth_year
+            FROM medical_files m LEFT JOIN children c ON c.id = m.child_id
+            WHERE m.id > ? ORDER BY m.id
+        """,
+        "schema": pa.schema([
+            ("id", pa.int64()), ("child_id", pa.int64()), ("record_date", pa.date32()), ("weight", pa.float64()),
+            ("height", pa.float64()), ("bmi", pa.float64()), ("has_vaccinations", pa.bool_()),
+            ("vaccinations", pa.string()), ("diagnoses", pa.string()), ("medications", pa.string()),
+            ("notes", pa.string()), ("created_at", pa.string()), ("governorate", pa.string()),
+            ("birth_year", pa.int16()),
+        ]),
+        "counter": "medical_records",
+    },
+}
+
+
+# ====================================================
+# 📝 التصدير (كامل أو تزايدي)
+# ====================================================
+
+def read_manifest(base_dir=SNAPSHOT_DIR) -> dict:
+    path = Path(base_dir) / MANIFEST
+    if not path.exists():
+        return {"version": 0, "sources": {}, "shards": {}, "updated_at": None}
+    return json.loads(path.read_text())
+
+
+def _write_manifest(base_dir: Path, manifest: dict):
+    tmp = base_dir / f"{MANIFEST}.part"
+    tmp.write_text(json.dumps(manifest, indent=2))
+    tmp.replace(base_dir / MANIFEST)
+
+
+def _to_batch(rows: list, schema: pa.Schema) -> pa.RecordBatch:
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if field.type == pa.date32():
+            # نص التاريخ يُحوَّل مرة واحدة عند التصدير (القيم غير الصالحة = null) بدلاً من كل قراءة
+            parsed = pc.strptime(pa.array(values, pa.string()), format="%Y-%m-%d", unit="s", error_is_null=True)
+            arrays.append(parsed.cast(pa.date32()))
+        elif field.type == pa.bool_():
+            arrays.append(pa.array([None if v is None else bool(v) for v in values], pa.bool_()))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _drop_shard(base_dir: Path, shard):
+    for table in TABLES:
+        for path in (base_dir / table).glob(f"**/s{shard}-*.parquet"):
+            path.unlink()
+
+
+def _append(conn, base_dir: Path, table: str, shard, after_id: int) -> tuple:
+    """كتابة الصفوف ذات id > after_id كملفات جديدة في أقسامها — يرجع (عدد الصفوف، آخر id)
+
+    كل الدفعات تمر في write_dataset واحدة: ملف واحد لكل قسم في كل تحديث (الملفات الصغيرة تبطئ القراءة)
+    """
+    schema = TABLES[table]["schema"]
+    cur = conn.execute(TABLES[table]["sql"], (after_id,))
+    rows = cur.fetchmany(CHUNK_ROWS)
+    if not rows:
+        return 0, after_id
+    first_id, seen = rows[0][0], {"rows": 0, "last_id": after_id}
+
+    def batches(rows):
+        while rows:
+            seen["rows"] += len(rows)
+            seen["last_id"] = rows[-1][0]
+            yield _to_batch(rows, schema)
+            rows = cur.fetchmany(CHUNK_ROWS)
+
+    ds.write_dataset(
+        pa.RecordBatchReader.from_batches(schema, batches(rows)), str(base_dir / table), format="parquet",
+        partitioning=PARTITIONING, basename_template=f"s{shard}-{first_id}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore", min_rows_per_group=ROW_GROUP_ROWS,
+        max_rows_per_group=ROW_GROUP_ROWS,
+    )
+    return seen["rows"], seen["last_id"]
+
+
+def refresh_snapshots(pools: dict, base_dir=SNAPSHOT_DIR, full=False) -> dict:
+    """تحديث اللقطة من كل ملف {shard: pool}: الصفوف الجديدة فقط، أو إعادة بناء الملف عند حذف صفوف منه
+
+    الحذف يُكتشف من عدادات stats (تحدثها الـ triggers): عدد الصفوف الحالي != ما في اللقطة + الصفوف الجديدة
+    """
+    from eohealth_db import read_stats
+
+    base_dir = Path(base_dir)
+    t0 = time.perf_counter()
+    result = {"children": 0, "medical_files": 0, "rebuilt": []}
+    with _LOCK:
+        base_dir.mkdir(parents=True, exist_ok=True)
+        manifest = read_manifest(base_dir)
+        sources = {str(shard): pool.db_path for shard, pool in pools.items()}
+        if manifest.get("sources") != sources:
+            # ملفات مختلفة (ملف واحد ↔ مقسم، أو قاعدة أخرى): اللقطة القديمة لا تخصها
+            for table in TABLES:
+                shutil.rmtree(base_dir / table, ignore_errors=True)
+            manifest.update(sources=sources, shards={})
+        for shard, pool in pools.items():
+            state = None if full else manifest["shards"].get(str(shard))
+            with pool.connection() as conn:
+                conn.execute("BEGIN")   # العدادات والصفوف من نفس نقطة القراءة (WAL)
+                try:
+                    stats = read_stats(conn)
+                    if state is not None:
+                        for table, spec in TABLES.items():
+                            new = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE id > ?",
+                                               (state[table]["max_id"],)).fetchone()[0]
+                            if stats[spec["counter"]] != state[table]["rows"] + new:
+                                state = None
+                                break
+                    if state is not None and state["increments"] >= MAX_INCREMENTS:
+                        state = None
+                    if state is None:
+                        _drop_shard(base_dir, shard)
+                        state = {table: {"max_id": 0, "rows": 0} for table in TABLES}
+                        state["increments"] = 0
+                        result["rebuilt"].append(shard)
+                    changed = False
+                    for table in TABLES:
+                        n, last_id = _append(conn, base_dir, table, shard, state[table]["max_id"])
+                        state[table] = {"max_id": last_id, "rows": state[table]["rows"] + n}
+                        result[table] += n
+                        changed = changed or n > 0
+                    state["increments"] += changed
+                finally:
+                    conn.rollback()
+            manifest["shards"][str(shard)] = state
+        # الإصدار يتغير فقط عند تغير الصفوف — مفتاح كاش القراءة في التطبيق
+        if result["rebuilt"] or result["children"] or result["medical_files"]:
+            manifest["version"] = manifest.get("version", 0) + 1
+        manifest["updated_at"] = datetime.utcnow().isoformat(timespec="seconds")
+        _write_manifest(base_dir, manifest)
+    result["version"] = manifest["version"]
+    result["seconds"] = round(time.perf_counter() - t0, 3)
+    return result
+
+
+def snapshot_info(base_dir=SNAPSHOT_DIR) -> dict:
+    """حالة اللقطة للوحة الإدارة: عدد الصفوف والملفات والحجم"""
+    base_dir = Path(base_dir)
+    manifest = read_manifest(base_dir)
+    info = {"version": manifest.get("version", 0), "updated_at": manifest["updated_at"], "shards": len(manifest["shards"])}
+    for table in TABLES:
+        files = list((base_dir / table).glob("**/*.parquet"))
+        info[table] = {"rows": sum(s[table]["rows"] for s in manifest["shards"].values()), "files": len(files),
+                       "bytes": sum(f.stat().st_size for f in files)}
+    return info
+
+
+# ====================================================
+# 📖 القراءة (أعمدة محددة + تصفية الأقسام)
+# ====================================================
+
+def has_snapshot(base_dir=SNAPSHOT_DIR) -> bool:
+    return (Path(base_dir) / MANIFEST).exists()
+
+
+def open_dataset(table: str, base_dir=SNAPSHOT_DIR) -> ds.Dataset:
+    path = Path(base_dir).resolve() / table
+    path.mkdir(parents=True, exist_ok=True)
+    return ds.dataset(str(path), format="parquet", partitioning=PARTITIONING, filesystem=_FS)
+
+
+def load_table(table: str, columns=None, governorate=None, birth_years=None, base_dir=SNAPSHOT_DIR) -> pa.Table:
+    """قراءة الأعمدة المطلوبة فقط — فلتر المحافظة/سنة الميلاد يتخطى مجلدات الأقسام الأخرى بالكامل"""
+    expr = None
+    if governorate:
+        expr = ds.field("governorate") == governorate
+    if birth_years:
+        years = ds.field("birth_year").isin(list(birth_years))
+        expr = years if expr is None else expr & years
+    dataset = open_dataset(table, base_dir)
+    if not dataset.files:
+        schema = TABLES[table]["schema"]
+        return pa.table({f.name: pa.array([], f.type) for f in schema if columns is None or f.name in columns})
+    return dataset.to_table(columns=columns, filter=expr)
+
+
+def load_insights_frame(base_dir=SNAPSHOT_DIR, today=None, governorate=None) -> pd.DataFrame:
+    """نفس أعمدة eohealth_insights.load_insights_frame لكن من اللقطة: 4 أعمدة للأطفال و5 للسجلات"""
+    from eohealth_insights import add_ages
+
+    children = load_table("children", ["id", "full_name", "birth_date", "governorate"],
+                          governorate=governorate, base_dir=base_dir).to_pandas(date_as_object=False)
+    medical = load_table("medical_files", ["child_id", "id", "record_date", "bmi", "has_vaccinations"],
+                         governorate=governorate, base_dir=base_dir).to_pandas(date_as_object=False)
+    per_child = medical.groupby("child_id").agg(
+        n_records=("id", "size"),
+        n_vaccination_records=("has_vaccinations", "sum"),
+        last_record_date=("record_date", "max"),
+    )
+    latest_bmi = (medical.dropna(subset=["bmi"]).sort_values("id")
+                  .groupby("child_id")["bmi"].last().rename("latest_bmi"))
+    f = (children.rename(columns={"id": "child_id"}).sort_values("child_id")
+         .join(per_child, on="child_id").join(latest_bmi, on="child_id").reset_index(drop=True))
+    f[["n_records", "n_vaccination_records"]] = f[["n_records", "n_vaccination_records"]].fillna(0).astype("int64")
+    return add_ages(f, today)
+
+
+def main():
+    from eohealth_db import ConnectionPool
+
+    parser = argparse.ArgumentParser(description="Export children / medical_files into partitioned Parquet snapshots")
+    parser.add_argument("db", nargs="?", default="eohealth.db")
+    parser.add_argument("--out", default=str(SNAPSHOT_DIR))
+    parser.add_argument("--full", action="store_true", help="rebuild instead of appending new rows")
+    args = parser.parse_args()
+    pool = ConnectionPool(args.db)
+    try:
+        print(refresh_snapshots({0: pool}, args.out, full=args.full))
+        print(json.dumps(snapshot_info(args.out), indent=2))
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
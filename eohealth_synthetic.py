@@ -0,0 +1,337 @@
+# =========================
+# 🧪 EoHealth Egypt — مولد بيانات تجريبية على نطاق السجل القومي
+# أطفال بأسماء عربية + أرقام قومية + سجلات طبية واقعية — نفس البذرة = نفس البيانات دائماً
+# =========================
+
+import time
+from contextlib import ExitStack
+
+import numpy as np
+import pandas as pd
+
+from eohealth_db import gen_smart_id, normalize_arabic
+from eohealth_io import add_id_range, transactions
+from eohealth_growth import DAYS_PER_MONTH, MAX_MONTHS, compute_bmi, lms_at
+from eohealth_vaccines import SCHEDULE, add_due_rows
+
+SEED = 2025
+REFERENCE_DATE = "2025-06-01"   # تاريخ ثابت افتراضياً حتى تتطابق البيانات بين التشغيلات
+BLOCK_ROWS = 50_000             # حجم ثابت للدفعة: البذرة لكل دفعة = (seed, أول id فيها)
+COMMIT_ROWS = 5_000             # أطفال لكل معاملة عند التشغيل كمهمة (قفل الكتابة يُترك بين المعاملات)
+
+MALE_NAMES = [
+    "محمد", "أحمد", "محمود", "مصطفى", "علي", "عمر", "يوسف", "عبد الرحمن", "إبراهيم", "حسن",
+    "حسين", "خالد", "كريم", "ياسين", "آدم", "مازن", "سيف", "زياد", "أنس", "حمزة",
+    "مالك", "ريان", "عبد الله", "إسلام", "طارق", "هشام", "سامي", "نبيل", "شريف", "وليد",
+    "أيمن", "عادل", "جمال", "سعيد", "رامي", "تامر", "هاني", "إيهاب", "مروان", "معاذ",
+]
+FEMALE_NAMES = [
+    "مريم", "فاطمة", "نور", "سارة", "هنا", "ملك", "جنى", "لين", "حبيبة", "رحمة",
+    "ياسمين", "آية", "منة الله", "شهد", "رقية", "سلمى", "فريدة", "ليلى", "نادين", "هدى",
+    "دعاء", "أسماء", "زينب", "خديجة", "رنا", "دينا", "مي", "إسراء", "ندى", "جميلة",
+]
+FAMILY_NAMES = [
+    "السيد", "عبد العزيز", "حسن", "إبراهيم", "محمود", "الشافعي", "المصري", "عبد الحميد", "النجار", "الشربيني",
+    "عثمان", "سليمان", "الجمال", "البنا", "رضوان", "فؤاد", "منصور", "عبد الفتاح", "زكي", "حجازي",
+    "مرسي", "الدسوقي", "شاهين", "عطية", "بدوي", "قنديل", "الحسيني", "سالم", "يونس", "الطوخي",
+]
+
+# (الاسم كما يُخزن في التطبيق, كود المحافظة في الرقم القومي, عدد السكان بالمليون تقريباً)
+GOVERNORATES = [
+    ("Cairo", 1, 10.1), ("Alexandria", 2, 5.5), ("Port Said", 3, 0.8), ("Suez", 4, 0.8),
+    ("Damietta", 11, 1.5), ("Dakahliya", 12, 6.9), ("Sharqia", 13, 7.7), ("Qalyubia", 14, 6.0),
+    ("Kafr El Sheikh", 15, 3.6), ("Gharbia", 16, 5.2), ("Monufia", 17, 4.5), ("Beheira", 18, 6.7),
+    ("Ismailia", 19, 1.4), ("Giza", 21, 9.2), ("Beni Suef", 22, 3.4), ("Faiyum", 23, 3.8),
+    ("Minya", 24, 6.0), ("Asyut", 25, 4.8), ("Sohag", 26, 5.4), ("Qena", 27, 3.4),
+    ("Aswan", 28, 1.6), ("Luxor", 29, 1.3), ("Red Sea", 31, 0.4), ("New Valley", 32, 0.3),
+    ("Matrouh", 33, 0.5), ("North Sinai", 34, 0.5), ("South Sinai", 35, 0.1),
+]
+GENDERS = np.array(["Male / ذكر", "Female / أنثى"])
+
+# تشخيص مع علاجه — أغلب الزيارات متابعة روتينية بدون تشخيص
+DIAGNOSES = [
+    ("", "", 0.70), ("نزلة برد", "باراسيتامول", 0.10), ("التهاب لوز", "أموكسيسيلين", 0.06),
+    ("إسهال", "محلول معالجة الجفاف", 0.06), ("أنيميا", "حديد", 0.05), ("حساسية جلدية", "كريم موضعي", 0.03),
+]
+MISSING_MEASUREMENT = 0.05      # زيارات بدون وزن/طول
+MISSING_VACCINATIONS = 0.10     # زيارات لم يُسجل فيها التطعيم
+
+CHILD_COLUMNS = ["id", "full_name", "national_id", "smart_id", "birth_date", "gender",
+                 "mother_id", "father_id", "governorate", "created_at", "name_norm"]
+MEDICAL_COLUMNS = ["child_id", "record_date", "weight", "height", "bmi", "vaccinations",
+                   "diagnoses", "medications", "notes", "files", "created_at"]
+
+
+def _popularity(n, skew=0.8):
+    # توزيع زيبف تقريبي: الأسماء الشائعة تتكرر أكثر (مهم لواقعية البحث بالاسم)
+    w = 1.0 / np.arange(1, n + 1) ** skew
+    return w / w.sum()
+
+
+def _normalized(names: np.ndarray) -> np.ndarray:
+    # الأسماء تتكرر كثيراً: التوحيد مرة واحدة لكل اسم مختلف
+    uniq, inverse = np.unique(names, return_inverse=True)
+    return np.asarray([normalize_arabic(n) for n in uniq], dtype=object)[inverse]
+
+
+def _dates(start: str, end: str, size, rng) -> np.ndarray:
+    lo, hi = np.datetime64(start, "D"), np.datetime64(end, "D")
+    return lo + rng.integers(0, (hi - lo).astype(int) + 1, size).astype("timedelta64[D]")
+
+
+def national_ids(birth, gov_codes, serials, male) -> list:
+    """رقم قومي بالصيغة المصرية (14 رقم): القرن + YYMMDD + المحافظة + مسلسل (آخره فردي للذكر) + رقم تحقق"""
+    birth = pd.DatetimeIndex(birth)
+    century = np.where(birth.year >= 2000, 3, 2)
+    serial = (np.asarray(serials) % 5000) * 2 + np.asarray(male, dtype=int)
+    check = (serial * 7 + birth.day.to_numpy()) % 9 + 1
+    # تجميع الأرقام حسابياً ثم تحويلها لنص مرة واحدة (أسرع بكثير من تنسيق كل صف)
+    yymmdd = (birth.year.to_numpy() % 100) * 10_000 + birth.month.to_numpy() * 100 + birth.day.to_numpy()
+    number = ((century * 1_000_000 + yymmdd) * 100 + np.asarray(gov_codes)) * 100_000 + serial * 10 + check
+    return number.astype(str).tolist()
+
+
+class ChildGenerator:
+    """يولد الأطفال على دفعات ثابتة الحجم — المسلسل في الرقم القومي يضمن عدم التكرار عبر الدفعات"""
+
+    def __init__(self, seed=SEED, today=REFERENCE_DATE, years=5, start_id=1, serials=None):
+        self.seed = seed
+        self.today = np.datetime64(pd.Timestamp(today).date(), "D")
+        self.years = years
+        self.start_id = start_id
+        # عدد المسجلين لكل (تاريخ ميلاد, محافظة) — المسلسل التالي يبدأ بعده
+        self._serials = serials if serials is not None else pd.Series(dtype="int64")
+        self._gov = pd.DataFrame(GOVERNORATES, columns=["name", "code", "population"])
+        self._gov_p = (self._gov["population"] / self._gov["population"].sum()).to_numpy()
+
+    def block(self, first_id: int, rows: int) -> pd.DataFrame:
+        rng = np.random.default_rng([self.seed, first_id])
+        ids = np.arange(first_id, first_id + rows)
+        male = rng.random(rows) < 0.51
+        first = np.where(
+            male,
+            np.asarray(MALE_NAMES, dtype=object)[rng.choice(len(MALE_NAMES), rows, p=_popularity(len(MALE_NAMES)))],
+            np.asarray(FEMALE_NAMES, dtype=object)[rng.choice(len(FEMALE_NAMES), rows, p=_popularity(len(FEMALE_NAMES)))],
+        )
+        father_first = np.asarray(MALE_NAMES, dtype=object)[rng.choice(len(MALE_NAMES), rows, p=_popularity(len(MALE_NAMES), 0.5))]
+        family = np.asarray(FAMILY_NAMES, dtype=object)[rng.choice(len(FAMILY_NAMES), rows, p=_popularity(len(FAMILY_NAMES), 0.5))]
+        gov = rng.choice(len(GOVERNORATES), rows, p=self._gov_p)
+        gov_codes = self._gov["code"].to_numpy()[gov]
+
+        birth = self.today - rng.integers(0, self.years * 365, rows).astype("timedelta64[D]")
+        registered = np.minimum(birth + rng.integers(0, 30, rows).astype("timedelta64[D]"), self.today)
+
+        # المسلسل = ترتيب الطفل بين المولودين في نفس اليوم ونفس المحافظة
+        key = pd.Series(birth.astype("int64") * 100 + gov_codes)
+        serial = key.groupby(key).cumcount().to_numpy() + key.map(self._serials).fillna(0).to_numpy(dtype="int64")
+        self._serials = self._serials.add(key.value_counts(), fill_value=0).astype("int64")
+
+        mother_birth = _dates("1980-01-01", "2002-12-31", rows, rng)
+        father_birth = _dates("1970-01-01", "2000-12-31", rows, rng)
+        reg = pd.DatetimeIndex(registered)
+        days = (reg.year.to_numpy() * 10_000 + reg.month.to_numpy() * 100 + reg.day.to_numpy()).astype(str)
+        full_name = first + " " + father_first + " " + family
+        return pd.DataFrame({
+            "id": ids,
+            "full_name": full_name,
+            "national_id": national_ids(birth, gov_codes, serial, male),
+            "smart_id": [gen_smart_id(int(i), d) for i, d in zip(ids, days)],
+            "birth_date": birth.astype(str),
+            "gender": GENDERS[np.where(male, 0, 1)],
+            "mother_id": national_ids(mother_birth, gov_codes, rng.integers(0, 5000, rows), np.zeros(rows, bool)),
+            "father_id": national_ids(father_birth, gov_codes, rng.integers(0, 5000, rows), np.ones(rows, bool)),
+            "governorate": self._gov["name"].to_numpy()[gov],
+            "created_at": np.char.add(registered.astype(str), "T08:00:00"),
+            "name_norm": _normalized(full_name),
+        }, columns=CHILD_COLUMNS)
+
+    def __call__(self, n: int):
+        """مولد دفعات DataFrame حتى n طفل"""
+        for start in range(0, n, BLOCK_ROWS):
+            yield self.block(self.start_id + start, min(BLOCK_ROWS, n - start))
+
+
+def generate_children(n: int, seed=SEED, today=REFERENCE_DATE, years=5, start_id=1, serials=None):
+    """n طفل على دفعات (DataFrame بأعمدة جدول children)"""
+    return ChildGenerator(seed, today, years, start_id, serials)(n)
+
+
+def existing_serials(conn) -> pd.Series:
+    """عدد الأطفال المسجلين لكل (تاريخ ميلاد, محافظة) — حتى لا تتكرر الأرقام القومية عند الإضافة لقاعدة غير فارغة"""
+    codes = {name: code for name, code, _ in GOVERNORATES}
+    counts = pd.DataFrame(
+        conn.execute("SELECT birth_date, governorate, COUNT(*) FROM children GROUP BY 1, 2").fetchall(),
+        columns=["birth_date", "governorate", "n"],
+    )
+    birth = pd.to_datetime(counts["birth_date"], errors="coerce")
+    code = counts["governorate"].map(codes)
+    ok = birth.notna() & code.notna()
+    key = birth[ok].to_numpy().astype("datetime64[D]").astype("int64") * 100 + code[ok].astype("int64").to_numpy()
+    return pd.Series(counts.loc[ok, "n"].to_numpy(), index=key).groupby(level=0).sum()
+
+
+# 💉 نص التطعيمات لكل زيارة: الجرعات المستحقة حتى عمر الزيارة
+_VACCINATION_TEXT = np.array([", ".join(d.code for d in SCHEDULE[:k]) for k in range(len(SCHEDULE) + 1)], dtype=object)
+_DUE_DAYS = np.array([d.due_days for d in SCHEDULE])
+
+
+def _measurements(indicator, sex, age_months, z):
+    L, M, S = lms_at(indicator, sex, np.minimum(age_months, MAX_MONTHS))
+    return M * (1 + L * S * z) ** (1 / L)
+
+
+def generate_medical(children: pd.DataFrame, per_child: int, seed=SEED, today=REFERENCE_DATE) -> pd.DataFrame:
+    """per_child زيارة لكل طفل بين الميلاد واليوم — وزن وطول حول منحنيات WHO بانحراف ثابت لكل طفل"""
+    rng = np.random.default_rng([seed, int(children["id"].iat[0]), 1])
+    n = len(children)
+    today = np.datetime64(pd.Timestamp(today).date(), "D")
+    birth = children["birth_date"].to_numpy().astype("datetime64[D]")
+    age = (today - birth).astype(int)
+    visits = np.sort(rng.random((n, per_child)), axis=1) * age[:, None]
+    visits = visits.astype(int).ravel()
+    child = np.repeat(np.arange(n), per_child)
+    record_date = birth[child] + visits.astype("timedelta64[D]")
+
+    # كل طفل يتبع "منحنى" خاص به (z ثابت) مع تذبذب صغير بين الزيارات
+    months = visits / DAYS_PER_MONTH
+    male = (children["gender"].to_numpy() == GENDERS[0])[child]
+    z_w = np.clip(rng.normal(0, 1, n)[child] + rng.normal(0, 0.3, len(child)), -3.5, 3.5)
+    z_h = np.clip(rng.normal(0, 1, n)[child] + rng.normal(0, 0.2, len(child)), -3.5, 3.5)
+    weight, height = np.empty(len(child)), np.empty(len(child))
+    for sex, rows in (("M", male), ("F", ~male)):
+        weight[rows] = _measurements("wfa", sex, months[rows], z_w[rows])
+        height[rows] = _measurements("lhfa", sex, months[rows], z_h[rows])
+    missing = rng.random(len(child)) < MISSING_MEASUREMENT
+    weight, height = np.round(weight, 1), np.round(height, 1)
+    weight[missing] = np.nan
+    height[missing] = np.nan
+
+    doses = np.searchsorted(_DUE_DAYS, visits, side="right")
+    vaccinations = np.where(rng.random(len(child)) < MISSING_VACCINATIONS, "", _VACCINATION_TEXT[doses])
+    dx = rng.choice(len(DIAGNOSES), len(child), p=[p for _, _, p in DIAGNOSES])
+    dates = record_date.astype(str)
+    return pd.DataFrame({
+        "child_id": children["id"].to_numpy()[child],
+        "record_date": dates,
+        "weight": weight,
+        "height": height,
+        "bmi": compute_bmi(weight, height),
+        "vaccinations": vaccinations,
+        "diagnoses": np.array([d for d, _, _ in DIAGNOSES], dtype=object)[dx],
+        "medications": np.array([m for _, m, _ in DIAGNOSES], dtype=object)[dx],
+        "notes": "",
+        "files": "",
+        "created_at": np.char.add(dates, "T10:00:00"),
+    }, columns=MEDICAL_COLUMNS)
+
+
+def _rows(frame: pd.DataFrame, columns):
+    frame = frame[columns].astype(object).where(frame[columns].notna(), None)   # NaN → NULL
+    return zip(*(frame[c].tolist() for c in columns))
+
+
+def _insert_block(conns: dict, frame: pd.DataFrame, medical, shard_of, stride: int, ranges: list, today) -> int:
+    """إدخال دفعة أطفال (وزياراتهم) في ملفاتها — أرقام كل ملف تستمر بعد آخر id فيه — يرجع عدد الزيارات"""
+    child_sql = f"INSERT INTO children ({', '.join(CHILD_COLUMNS)}) VALUES ({', '.join('?' * len(CHILD_COLUMNS))})"
+    medical_sql = f"INSERT INTO medical_files ({', '.join(MEDICAL_COLUMNS)}) VALUES ({', '.join('?' * len(MEDICAL_COLUMNS))})"
+    records = 0
+    parts = frame.groupby(frame["governorate"].map(shard_of), sort=False) if shard_of else [(0, frame)]
+    for k, part in parts:
+        conn = conns[k]
+        first = max(conn.execute("SELECT COALESCE(MAX(id), 0) FROM children").fetchone()[0], k * stride) + 1
+        ids = np.arange(first, first + len(part))
+        visits = None if medical is None else medical.loc[medical["child_id"].isin(part["id"])]
+        if not np.array_equal(ids, part["id"].to_numpy()):
+            # أرقام الملف (والهوية الذكية المحسوبة منها) بدل ترقيم المولد
+            renumber = pd.Series(ids, index=part["id"].to_numpy())
+            days = part["created_at"].str[:10].str.replace("-", "")
+            part = part.assign(id=ids, smart_id=[gen_smart_id(int(i), d) for i, d in zip(ids, days)])
+            if visits is not None:
+                visits = visits.assign(child_id=visits["child_id"].map(renumber))
+        conn.executemany(child_sql, _rows(part, CHILD_COLUMNS))
+        if visits is not None:
+            conn.executemany(medical_sql, _rows(visits, MEDICAL_COLUMNS))
+            records += len(visits)
+        add_due_rows(conn, first, int(ids[-1]), today)
+        add_id_range(ranges, first, int(ids[-1]))
+    return records
+
+
+def populate(pool, children: int, records_per_child=2, seed=SEED, today=REFERENCE_DATE, years=5, progress=None,
+             shard_of=None, stride=0, resume=None, on_commit=None) -> dict:
+    """إدخال الأطفال وسجلاتهم بالجملة في معاملة واحدة (يُضاف بعد آخر id موجود)
+
+    الملفات المقسمة: pool = {رقم الملف: مجمّع} — كل طفل (وسجلاته) في ملف shard_of(محافظته)،
+    وأرقامه من عداد ذلك الملف (بعد k * stride).
+    on_commit (مهام الخلفية): كل COMMIT_ROWS طفل في معاملتها الخاصة ثم on_commit(state) — state["ids"] = نطاقات
+    الأرقام المحفوظة. resume=state يكمل بعد آخر دفعة (المسلسلات تُحسب من القاعدة الحالية، فالأرقام القومية
+    للجزء المستكمل تختلف عن تشغيل متصل لكنها لا تتكرر)
+    """
+    t0 = time.perf_counter()
+    state = {"children": 0, "records": 0, "ids": [], **(resume or {})}
+    skip = state["children"]
+    pools = pool if isinstance(pool, dict) else {0: pool}
+    with ExitStack() as whole:
+        held = None if on_commit else whole.enter_context(transactions(pools))
+        with ExitStack() as stack:
+            conns = held or {k: stack.enter_context(p.connection()) for k, p in pools.items()}
+            if "start_id" not in state:
+                # المولد يرقم الأطفال بالتتابع (البذرة لكل دفعة من أول رقم فيها) — ملف واحد: نفس الأرقام النهائية
+                tops = {k: conn.execute("SELECT COALESCE(MAX(id), 0) FROM children").fetchone()[0] for k, conn in conns.items()}
+                state["start_id"] = 1 + sum(max(top - k * stride, 0) for k, top in tops.items())
+            serials = pd.concat([existing_serials(conn) for conn in conns.values()]).groupby(level=0).sum() \
+                if state["start_id"] > 1 or skip else None
+        start_id = state["start_id"]
+        for frame in generate_children(children, seed, today, years, start_id, serials):
+            offset = int(frame["id"].iat[0]) - start_id   # ترتيب أول طفل في الدفعة داخل المهمة
+            if offset + len(frame) <= skip:
+                continue
+            medical = generate_medical(frame, records_per_child, seed, today) if records_per_child else None
+            step = len(frame) if held else COMMIT_ROWS
+            for lo in range(max(skip - offset, 0), len(frame), step):
+                block = frame.iloc[lo:lo + step]
+                ranges = []
+                with ExitStack() as stack:
+                    conns = held or stack.enter_context(transactions(pools))
+                    records = _insert_block(conns, block, medical, shard_of, stride, ranges, today)
+                # الأرقام تُسجل بعد COMMIT فقط (دفعة أُلغيت لا تترك أرقاماً يحذفها التنظيف)
+                for first, last in ranges:
+                    add_id_range(state["ids"], first, last)
+                state.update(children=state["children"] + len(block), records=state["records"] + records)
+                if on_commit:
+                    on_commit(state)
+                if progress:
+                    progress(state["children"], children)
+    seconds = time.perf_counter() - t0
+    written = state["children"] - skip + state["records"]
+    return {
+        "children": state["children"],
+        "medical_records": state["records"],
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(written / seconds, 1) if seconds > 0 else 0.0,
+    }
+
+
+def write_import_file(path, n: int, fmt="csv", seed=SEED, today=REFERENCE_DATE) -> dict:
+    """ملف استيراد (أعمدة صفحة الإدارة) لأطفال تجريبيين — لاختبار الاستيراد بالحجم الكامل"""
+    from eohealth_io import IMPORT_COLUMNS
+
+    t0 = time.perf_counter()
+    blocks = generate_children(n, seed, today)
+    if fmt == "csv":
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            for i, frame in enumerate(blocks):
+                frame[IMPORT_COLUMNS].to_csv(fh, header=(i == 0), index=False)
+    elif fmt == "xlsx":
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("children")
+        ws.append(IMPORT_COLUMNS)
+        for frame in blocks:
+            for row in frame[IMPORT_COLUMNS].itertuples(index=False):
+                ws.append(list(row))
+        wb.save(path)
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+    return {"path": path, "rows": n, "seconds": round(time.perf_counter() - t0, 3)}
@@ -0,0 +1,192 @@
+# =========================
+# 📎 EoHealth Egypt — مخزن الملفات المرفوعة
+# كتابة متدفقة مع sha256 + تخزين حسب المحتوى (بدون تكرار) + عدّاد مراجع + صور مصغرة عند الطلب
+# =========================
+
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+
+CHUNK_SIZE = 1 << 20            # 1MB لكل قراءة — الملف لا يُحمَّل كاملاً في الذاكرة
+THUMB_SIZE = 256
+THUMB_QUALITY = 80
+GC_GRACE_S = 900                # ملف رُفع (أو أُعيد رفعه) حديثاً لا يُحذف: قد يكون مرفقه في الطريق للقاعدة
+
+
+def guess_mime(filename: str, declared=None) -> str:
+    """نوع الملف: المعلن من المتصفح أولاً ثم الامتداد"""
+    return declared or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+class UploadStore:
+    """ملفات مخزنة بالـ hash: uploads/objects/ab/cd/<sha256> — نفس التقرير المرفوع مرتين = ملف واحد"""
+
+    def __init__(self, root="uploads", chunk_size=CHUNK_SIZE):
+        self.root = Path(root)
+        self.chunk_size = chunk_size
+        self.objects = self.root / "objects"
+        self.thumbs = self.root / "thumbs"
+        self.tmp = self.root / "tmp"
+        for d in (self.objects, self.thumbs, self.tmp):
+            d.mkdir(parents=True, exist_ok=True)
+
+    def path(self, sha256: str) -> Path:
+        """مسار الملف (مجلدات فرعية حسب أول 4 حروف من الـ hash حتى لا يتضخم مجلد واحد)"""
+        return self.objects / sha256[:2] / sha256[2:4] / sha256
+
+    def put(self, fileobj) -> tuple:
+        """كتابة الملف على أجزاء مع حساب الـ hash — يرجع (sha256, size)"""
+        if hasattr(fileobj, "seek"):
+            fileobj.seek(0)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self.tmp)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: fileobj.read(self.chunk_size), b""):
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            sha = digest.hexdigest()
+            target = self.path(sha)
+            try:
+                # محتوى موجود مسبقاً: تحديث mtime يحميه من collect_garbage حتى يُربط بالسجل
+                os.utime(target)
+                os.unlink(tmp_name)
+            except FileNotFoundError:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_name, target)  # ذري: لا يظهر ملف نصف مكتوب أبداً
+            return sha, size
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    def open(self, sha256: str):
+        return open(self.path(sha256), "rb")
+
+    def thumbnail(self, sha256: str, mime: str, size=THUMB_SIZE):
+        """صورة مصغرة JPEG تُنشأ أول مرة فقط ثم تُقرأ من القرص — None لغير الصور"""
+        if not (mime or "").startswith("image/"):
+            return None
+        thumb = self.thumbs / sha256[:2] / f"{sha256}_{size}.jpg"
+        if thumb.exists():
+            return thumb
+        from PIL import Image  # تحميل PIL عند الحاجة فقط
+
+        try:
+            with Image.open(self.path(sha256)) as img:
+                img.draft("RGB", (size, size))   # JPEG: فك ترميز بدقة مخفضة مباشرة
+                img.thumbnail((size, size))
+                thumb.parent.mkdir(parents=True, exist_ok=True)
+                tmp = thumb.with_suffix(".tmp")
+                img.convert("RGB").save(tmp, "JPEG", quality=THUMB_QUALITY)
+                os.replace(tmp, thumb)
+        except (OSError, ValueError):
+            return None
+        return thumb
+
+    def discard(self, sha256: str):
+        """حذف الملف وصوره المصغرة من القرص"""
+        self.path(sha256).unlink(missing_ok=True)
+        for t in (self.thumbs / sha256[:2]).glob(f"{sha256}_*.jpg"):
+            t.unlink(missing_ok=True)
+
+    def collect_garbage(self, pool, grace=GC_GRACE_S) -> int:
+        """حذف الملفات التي لم يعد لها أي مرفق (refcount = 0) — يرجع عدد المحذوف
+
+        الحذف من القرص داخل معاملة الكتابة نفسها: attach_files يفحص وجود الملف تحت نفس القفل،
+        فلا يُربط سجل بملف حُذف (put بدون قفل قد يرى الملف قبل حذفه مباشرة).
+        الملفات المقسمة تشترك في نفس المخزن: pool = قائمة مجمّعات، والملف يُحذف فقط إن لم يعد له مرفق في أي منها
+        """
+        cutoff = time.time() - grace
+        removed = 0
+        with ExitStack() as stack:
+            conns = [stack.enter_context(p.transaction()) for p in (pool if isinstance(pool, (list, tuple)) else [pool])]
+            orphans = set().union(*({r[0] for r in c.execute("SELECT sha256 FROM upload_blobs WHERE refcount <= 0")}
+                                    for c in conns))
+            for conn in conns:
+                orphans -= {r[0] for r in conn.execute(
+                    "SELECT sha256 FROM upload_blobs WHERE refcount > 0 AND sha256 IN (SELECT value FROM json_each(?))",
+                    (json.dumps(sorted(orphans)),))}
+            for sha in orphans:
+                try:
+                    if self.path(sha).stat().st_mtime > cutoff:
+                        continue   # رُفع حديثاً (put) ولم يُربط بعد
+                except FileNotFoundError:
+                    pass
+                for conn in conns:
+                    conn.execute("DELETE FROM upload_blobs WHERE sha256 = ? AND refcount <= 0", (sha,))
+                self.discard(sha)
+                removed += 1
+        return removed
+
+
+def save_uploads(store: UploadStore, uploaded) -> list:
+    """تخزين ملفات الفورم قبل فتح معاملة الكتابة — يرجع بيانات المرفقات الجاهزة للإدخال"""
+    saved = []
+    for f in uploaded or []:
+        sha, size = store.put(f)
+        saved.append({"sha256": sha, "size": size, "filename": f.name, "path": str(store.path(sha)),
+                      "mime": guess_mime(f.name, getattr(f, "type", None))})
+    return saved
+
+
+def attach_files(conn, medical_id: int, child_id: int, attachments: list):
+    """ربط الملفات بالسجل الطبي (داخل معاملة السجل نفسها) — الـ triggers تحدّث refcount"""
+    # تحت قفل الكتابة: collect_garbage لا يحذف في نفس اللحظة، فالملف الموجود الآن يبقى (refcount > 0 بعد الإدخال)
+    missing = [a["filename"] for a in attachments if "path" in a and not os.path.exists(a["path"])]
+    if missing:
+        raise FileNotFoundError(f"uploaded file(s) removed before saving, please upload again: {', '.join(missing)}")
+    now = datetime.utcnow().isoformat()
+    conn.executemany(
+        "INSERT INTO medical_attachments (medical_id, child_id, sha256, filename, mime, size, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(medical_id, child_id, a["sha256"], a["filename"], a["mime"], a["size"], now) for a in attachments],
+    )
+
+
+def list_attachments(conn, child_id: int) -> list:
+    """مرفقات الطفل من الجدول فقط (بدون قراءة أي ملف)"""
+    cur = conn.execute(
+        "SELECT id, medical_id, sha256, filename, mime, size, created_at FROM medical_attachments "
+        "WHERE child_id = ? ORDER BY id DESC", (child_id,),
+    )
+    cols = [d[0] for d in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def import_legacy_files(pool, store: UploadStore) -> int:
+    """نقل المسارات القديمة (عمود files المفصول بفواصل) إلى المخزن الجديد — آمن للتكرار"""
+    with pool.connection() as conn:
+        rows = conn.execute(
+            "SELECT id, child_id, files FROM medical_files WHERE COALESCE(files, '') <> ''"
+        ).fetchall()
+    moved = 0
+    for medical_id, child_id, files in rows:
+        attachments, legacy_paths = [], []
+        for p in files.split(","):
+            p = Path(p.strip())
+            if not p.is_file():
+                continue
+            with open(p, "rb") as fh:
+                sha, size = store.put(fh)
+            attachments.append({"sha256": sha, "size": size, "filename": p.name, "path": str(store.path(sha)),
+                                "mime": guess_mime(p.name)})
+            legacy_paths.append(p)
+        with pool.transaction() as conn:
+            attach_files(conn, medical_id, child_id, attachments)
+            # تفريغ العمود يُنقص عداد uploaded_files بنفس عدد المسارات (trigger الترحيل 4)
+            conn.execute("UPDATE medical_files SET files = '' WHERE id = ?", (medical_id,))
+        # النسخة القديمة تُحذف فقط لو كانت داخل مجلد الرفع نفسه
+        for p in legacy_paths:
+            if p.resolve().parent == store.root.resolve():
+                p.unlink(missing_ok=True)
+        moved += len(attachments)
+    return moved
@@ -0,0 +1,235 @@
+# =========================
+# 💉 EoHealth Egypt — محرك جدول التطعيمات الإجباري
+# حساب الجرعات المستحقة/المتأخرة لكل الأطفال دفعة واحدة (مصفوفات NumPy) + قائمة مستحق مخزنة
+# =========================
+
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+Dose = namedtuple("Dose", "code label_ar label_en due_days grace_days")
+
+# 🗓️ جدول التطعيمات الإجباري (وزارة الصحة المصرية) — العمر بالأيام من تاريخ الميلاد
+SCHEDULE = [
+    Dose("HEPB0", "الالتهاب الكبدي B — جرعة الولادة", "Hepatitis B birth dose", 0, 7),
+    Dose("OPV0", "شلل الأطفال — الجرعة الصفرية", "OPV zero dose", 0, 7),
+    Dose("BCG", "الدرن (BCG)", "BCG", 0, 90),
+    Dose("OPV1", "شلل الأطفال بالفم 1", "OPV 1", 60, 28),
+    Dose("IPV1", "شلل الأطفال بالحقن 1", "IPV 1", 60, 28),
+    Dose("PENTA1", "الخماسي 1", "Pentavalent 1", 60, 28),
+    Dose("OPV2", "شلل الأطفال بالفم 2", "OPV 2", 120, 28),
+    Dose("IPV2", "شلل الأطفال بالحقن 2", "IPV 2", 120, 28),
+    Dose("PENTA2", "الخماسي 2", "Pentavalent 2", 120, 28),
+    Dose("OPV3", "شلل الأطفال بالفم 3", "OPV 3", 180, 28),
+    Dose("PENTA3", "الخماسي 3", "Pentavalent 3", 180, 28),
+    Dose("OPV4", "شلل الأطفال بالفم 4", "OPV 4", 270, 28),
+    Dose("MMR1", "الحصبة والنكاف والحصبة الألمانية 1", "MMR 1", 365, 28),
+    Dose("OPV5", "شلل الأطفال بالفم 5", "OPV 5", 365, 28),
+    Dose("DTP_B", "الثلاثي — جرعة منشطة", "DTP booster", 548, 28),
+    Dose("MMR2", "الحصبة والنكاف والحصبة الألمانية 2", "MMR 2", 548, 28),
+    Dose("OPV6", "شلل الأطفال بالفم — جرعة منشطة", "OPV booster", 548, 28),
+]
+DOSES = {d.code: d for d in SCHEDULE}
+CODES = pd.Index([d.code for d in SCHEDULE])
+DUE_DAYS = np.array([d.due_days for d in SCHEDULE], dtype="timedelta64[D]")
+GRACE_DAYS = np.array([d.grace_days for d in SCHEDULE], dtype="timedelta64[D]")
+
+CATCH_UP_DAYS = 5 * 365        # بعد 5 سنوات الطفل يخرج من قائمة المتابعة الدورية
+STATUSES = np.array(["completed", "overdue", "due", "upcoming"])
+REFRESH_CHUNK_ROWS = 100_000
+
+
+def _day(value) -> np.datetime64:
+    return np.datetime64(pd.Timestamp(value or date.today()).date(), "D")
+
+
+def compute_schedule(children: pd.DataFrame, events: pd.DataFrame, today=None, include_completed=False) -> pd.DataFrame:
+    """حالة كل جرعة لكل طفل: مصفوفة (أطفال × جرعات) بعمليات تواريخ عمودية بدون حلقة لكل طفل
+
+    children: أعمدة id, birth_date, governorate — events: أعمدة child_id, vaccine_code
+    """
+    today = _day(today)
+    columns = ["child_id", "vaccine_code", "governorate", "due_date", "overdue_date", "status"]
+    dob = pd.to_datetime(children["birth_date"], errors="coerce").to_numpy().astype("datetime64[D]")
+    known = ~np.isnat(dob)
+    if not known.any():
+        return pd.DataFrame(columns=columns)
+    ids = children["id"].to_numpy()[known]
+    gov = children["governorate"].to_numpy()[known]
+    dob = dob[known]
+
+    due = dob[:, None] + DUE_DAYS[None, :]
+    overdue = due + GRACE_DAYS[None, :]
+
+    # الجرعات المسجلة: مواضعها في المصفوفة عبر فهرسة عمودية
+    done = np.zeros(due.shape, dtype=bool)
+    if len(events):
+        rows = pd.Index(ids).get_indexer(events["child_id"])
+        cols = CODES.get_indexer(events["vaccine_code"])
+        ok = (rows >= 0) & (cols >= 0)
+        done[rows[ok], cols[ok]] = True
+
+    status = np.select(
+        [done, overdue < today, due <= today],
+        [0, 1, 2], default=3,
+    )
+    keep = np.ones(due.shape, dtype=bool) if include_completed else ~done
+    r, c = np.nonzero(keep)
+    return pd.DataFrame({
+        "child_id": ids[r],
+        "vaccine_code": CODES.to_numpy()[c],
+        "governorate": gov[r],
+        "due_date": due[r, c].astype(str),
+        "overdue_date": overdue[r, c].astype(str),
+        "status": STATUSES[status[r, c]],
+    }, columns=columns)
+
+
+def refresh_due_list(pool, today=None, chunk_rows=REFRESH_CHUNK_ROWS) -> dict:
+    """إعادة بناء vaccination_due لكل الأطفال في سن المتابعة — معاملة واحدة على دفعات"""
+    t0 = time.perf_counter()
+    cutoff = str(_day(today) - np.timedelta64(CATCH_UP_DAYS, "D"))
+    children_n = rows_n = 0
+    with pool.transaction() as conn:
+        events = pd.DataFrame(
+            conn.execute("SELECT child_id, vaccine_code FROM vaccination_events").fetchall(),
+            columns=["child_id", "vaccine_code"],
+        )
+        # الإدخال بترتيب المفتاح بدون الفهارس الثانوية ثم بناؤها مرة واحدة (أسرع بكثير من تحديثها صفاً صفاً)
+        indexes = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'vaccination_due' AND sql IS NOT NULL"
+        ).fetchall()
+        for name, _ in indexes:
+            conn.execute(f"DROP INDEX {name}")
+        conn.execute("DELETE FROM vaccination_due")
+        cur = conn.execute(
+            "SELECT id, birth_date, governorate FROM children WHERE birth_date >= ? ORDER BY id", (cutoff,)
+        )
+        while True:
+            batch = cur.fetchmany(chunk_rows)
+            if not batch:
+                break
+            frame = pd.DataFrame(batch, columns=["id", "birth_date", "governorate"])
+            pending = compute_schedule(frame, events[events["child_id"].between(frame["id"].iat[0], frame["id"].iat[-1])], today)
+            conn.executemany(
+                "INSERT INTO vaccination_due (child_id, vaccine_code, governorate, due_date, overdue_date) VALUES (?, ?, ?, ?, ?)",
+                zip(*(pending[c].tolist() for c in ("child_id", "vaccine_code", "governorate", "due_date", "overdue_date"))),
+            )
+            children_n += len(frame)
+            rows_n += len(pending)
+        for _, sql in indexes:
+            conn.execute(sql)
+    return {"children": children_n, "pending_doses": rows_n, "seconds": round(time.perf_counter() - t0, 2)}
+
+
+# جدول التطعيمات كجدول SQL (code, due_days, grace_days) لحساب قائمة المستحق للأطفال الجدد داخل القاعدة
+_SCHEDULE_SQL = "VALUES " + ", ".join(f"('{d.code}', {d.due_days}, {d.grace_days})" for d in SCHEDULE)
+
+
+def add_due_rows(conn, first_id: int, last_id=None, today=None) -> int:
+    """إضافة جرعات الأطفال الجدد (first_id..last_id) لقائمة المستحق داخل معاملة الإدخال نفسها
+
+    بدون إعادة بناء القائمة كلها — نفس قاعدة refresh_due_list (سن المتابعة + الجرعات غير المسجلة)
+    """
+    cutoff = str(_day(today) - np.timedelta64(CATCH_UP_DAYS, "D"))
+    return conn.execute(
+        f"""
+        WITH schedule (code, due_days, grace_days) AS ({_SCHEDULE_SQL})
+        INSERT OR IGNORE INTO vaccination_due (child_id, vaccine_code, governorate, due_date, overdue_date)
+        SELECT c.id, s.code, c.governorate,
+               date(c.birth_date, '+' || s.due_days || ' days'),
+               date(c.birth_date, '+' || (s.due_days + s.grace_days) || ' days')
+        FROM children c CROSS JOIN schedule s
+        WHERE c.id BETWEEN ? AND ? AND c.birth_date >= ? AND date(c.birth_date) IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM vaccination_events e WHERE e.child_id = c.id AND e.vaccine_code = s.code)
+        """,
+        (int(first_id), int(first_id if last_id is None else last_id), cutoff),
+    ).rowcount
+
+
+def due_list(conn, status=None, governorate=None, start=None, end=None, today=None, limit=1000) -> pd.DataFrame:
+    """قائمة المستحق من الجدول المخزن — للمتأخرين تُطبق النافذة على تاريخ بدء التأخير"""
+    today = str(_day(today))
+    column = "overdue_date" if status == "overdue" else "due_date"
+    clauses, params = [], []
+    if status == "overdue":
+        clauses.append("d.overdue_date < ?")
+        params.append(today)
+    elif status == "due":
+        clauses.append("d.due_date <= ? AND d.overdue_date >= ?")
+        params += [today, today]
+    elif status == "upcoming":
+        clauses.append("d.due_date > ?")
+        params.append(today)
+    if start:
+        clauses.append(f"d.{column} >= ?")
+        params.append(str(start))
+    if end:
+        clauses.append(f"d.{column} <= ?")
+        params.append(str(end))
+    if governorate:
+        clauses.append("d.governorate = ?")
+        params.append(governorate)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    frame = pd.read_sql_query(
+        f"""
+        SELECT d.child_id, c.full_name, c.smart_id, d.governorate, d.vaccine_code, d.due_date, d.overdue_date,
+               CASE WHEN d.overdue_date < ? THEN 'overdue' WHEN d.due_date <= ? THEN 'due' ELSE 'upcoming' END AS status
+        FROM vaccination_due d
+        JOIN children c ON c.id = d.child_id
+        {where}
+        ORDER BY d.{column}, d.child_id
+        LIMIT ?
+        """,
+        conn, params=(today, today, *params, int(limit)),
+    )
+    frame["vaccine"] = frame["vaccine_code"].map(lambda c: DOSES[c].label_ar if c in DOSES else c)
+    return frame
+
+
+def child_schedule(conn, child_id: int, today=None) -> pd.DataFrame:
+    """الجدول الكامل لطفل واحد (يشمل الجرعات المكتملة وتاريخ إعطائها)"""
+    row = conn.execute("SELECT id, birth_date, governorate FROM children WHERE id = ?", (child_id,)).fetchone()
+    if row is None:
+        return pd.DataFrame()
+    given = pd.DataFrame(
+        conn.execute("SELECT child_id, vaccine_code, given_on FROM vaccination_events WHERE child_id = ?",
+                     (child_id,)).fetchall(),
+        columns=["child_id", "vaccine_code", "given_on"],
+    )
+    frame = compute_schedule(pd.DataFrame([row], columns=["id", "birth_date", "governorate"]), given, today,
+                             include_completed=True)
+    frame = frame.merge(given[["vaccine_code", "given_on"]], on="vaccine_code", how="left")
+    frame["vaccine"] = frame["vaccine_code"].map(lambda c: DOSES[c].label_ar)
+    return frame[["vaccine_code", "vaccine", "due_date", "overdue_date", "status", "given_on"]]
+
+
+def record_vaccination(conn, child_id: int, vaccine_code: str, given_on=None, source="clinic"):
+    """تسجيل جرعة مُعطاة — trigger يحذفها من قائمة المستحق في نفس المعاملة"""
+    if vaccine_code not in DOSES:
+        raise ValueError(f"Unknown vaccine code: {vaccine_code}")
+    conn.execute(
+        "INSERT INTO vaccination_events (child_id, vaccine_code, given_on, source, created_at) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(child_id, vaccine_code) DO UPDATE SET given_on = excluded.given_on, source = excluded.source",
+        (int(child_id), vaccine_code, str(given_on or date.today()), source, datetime.utcnow().isoformat()),
+    )
+
+
+def book_vaccination(conn, child_id: int, vaccine_code: str, booked_for) -> int:
+    """حجز موعد لجرعة لم تُعطَ بعد — يرجع رقم الحجز (الجرعة نفسها تُسجل بـ record_vaccination يوم الإعطاء)"""
+    if vaccine_code not in DOSES:
+        raise ValueError(f"Unknown vaccine code: {vaccine_code}")
+    return conn.execute(
+        "INSERT INTO vaccination_bookings (child_id, vaccine_code, booked_for, created_at) VALUES (?, ?, ?, ?)",
+        (int(child_id), vaccine_code, str(booked_for), datetime.utcnow().isoformat()),
+    ).lastrowid
+
+
+def week_window(today=None):
+    """بداية ونهاية الأسبوع الحالي (السبت → الجمعة)"""
+    today = pd.Timestamp(today or date.today()).date()
+    start = today - timedelta(days=(today.weekday() - 5) % 7)
+    return start, start + timedelta(days=6)
@@ -0,0 +1,183 @@
+# =========================
+# ✍️ EoHealth Egypt — تجميع الكتابة (group commit)
+# thread كاتب واحد لكل ملف يجمع حفظ كل الجلسات في معاملة واحدة (كل ما وصل أثناء COMMIT السابق، حتى N سجل)
+# كل مستدعٍ يستلم نتيجته (رقم السجل) بعد COMMIT فقط = إقرار بأن السجل محفوظ على القرص
+# =========================
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+WRITE_MODES = ("strict", "group")
+GROUP_MAX_ROWS = 128            # أقصى عدد عمليات حفظ في معاملة واحدة
+# انتظار إضافي لتجميع عمليات أخرى بعد أول عملية: 0 = المجموعة هي ما وصل أثناء COMMIT السابق فقط.
+# الجلسات تنتظر إقرارها قبل الحفظ التالي، فنافذة ثابتة (2ms مثلاً) تؤخر كل مجموعة بلا فائدة إلا على قرص fsync بطيء
+GROUP_MAX_DELAY_S = 0.0
+WRITE_TIMEOUT_S = 30.0
+
+log = logging.getLogger("eohealth.writer")
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """كاتب لملف SQLite واحد بنفس الواجهة في الوضعين
+
+    mode="strict": معاملة (BEGIN IMMEDIATE ... COMMIT) لكل عملية حفظ في thread المستدعي
+    mode="group":  عمليات الحفظ تُجمع في thread الكاتب وتُحفظ معاً بـ COMMIT واحد،
+                   وكل عملية داخل SAVEPOINT خاص بها فخطأ عملية واحدة لا يلغي باقي المجموعة
+    """
+
+    def __init__(self, pool, mode="group", max_rows=GROUP_MAX_ROWS, max_delay=GROUP_MAX_DELAY_S, metrics=None):
+        if mode not in WRITE_MODES:
+            raise ValueError(f"unknown write mode {mode!r} (expected one of {WRITE_MODES})")
+        self.pool = pool
+        self.mode = mode
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.metrics = metrics
+        self.groups = self.rows = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        with self._lock:
+            if self.mode == "group" and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="eohealth-writer", daemon=True)
+                self._thread.start()
+        return self
+
+    def close(self, timeout=WRITE_TIMEOUT_S):
+        """إيقاف الكاتب بعد حفظ كل ما في الطابور"""
+        with self._lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    # ---------------- الواجهة ----------------
+    def submit(self, fn, *args) -> Future:
+        """fn(conn, *args) داخل معاملة — Future تكتمل بنتيجة fn بعد COMMIT"""
+        if self._closed:
+            raise RuntimeError("writer is closed")
+        fut = Future()
+        if self.mode == "strict":
+            try:
+                fut.set_result(self._write_strict(fn, args))
+            except Exception as e:
+                fut.set_exception(e)
+            return fut
+        if self._thread is None:
+            self.start()
+        self._queue.put((fn, args, fut))
+        return fut
+
+    def write(self, fn, *args, timeout=WRITE_TIMEOUT_S):
+        """نفس submit لكن ينتظر الإقرار: يرجع نتيجة fn (أو يرفع خطأها) بعد أن يصبح الحفظ دائماً
+
+        بعد timeout تُلغى العملية إن كانت ما زالت في الطابور (فشل مؤكد: لن تُحفظ)، أما إن بدأت داخل
+        مجموعة فلا يمكن إلغاؤها فننتظر نتيجتها — وإلا قد يُبلغ المستدعي بفشل سجل حُفظ فعلاً
+        """
+        t0 = time.perf_counter()
+        try:
+            fut = self.submit(fn, *args)
+            return fut.result(timeout)
+        except FutureTimeout:
+            if fut.cancel():
+                raise
+            log.warning("write still running after %.1fs — waiting for its commit", timeout)
+            return fut.result()
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe("writer", f"{self.mode}.wait", time.perf_counter() - t0)
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "groups": self.groups, "rows": self.rows, "queued": self._queue.qsize(),
+                "mean_group": round(self.rows / self.groups, 2) if self.groups else 0.0}
+
+    # ---------------- التنفيذ ----------------
+    def _write_strict(self, fn, args):
+        t0 = time.perf_counter()
+        with self.pool.transaction() as conn:
+            result = fn(conn, *args)
+        self._record(1, time.perf_counter() - t0)
+        return result
+
+    def _record(self, rows: int, seconds: float):
+        with self._lock:
+            self.groups += 1
+            self.rows += rows
+        if self.metrics is not None:
+            self.metrics.observe("writer", f"{self.mode}.commit", seconds)
+            self.metrics.count("writer", self.mode, "groups")
+            self.metrics.count("writer", self.mode, "rows", rows)
+
+    def _collect(self, first) -> tuple:
+        """أول عملية + ما في الطابور (+ ما يصل خلال max_delay) حتى max_rows — يرجع (المجموعة، هل طُلب الإيقاف)"""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_rows:
+            try:
+                # ما في الطابور بالفعل يُؤخذ فوراً، والانتظار فقط حتى نهاية النافذة
+                item = self._queue.get(timeout=max(0.0, deadline - time.perf_counter())) \
+                    if self.max_delay > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stop = self._collect(item)
+            self._commit(batch)
+        # عمليات وصلت بعد طلب الإيقاف تُحفظ أيضاً بدل أن تنتظر للأبد
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._commit(leftovers)
+
+    def _commit(self, batch: list):
+        t0 = time.perf_counter()
+        results = []
+        try:
+            with self.pool.transaction() as conn:
+                for fn, args, fut in batch:
+                    if not fut.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT group_write")
+                    try:
+                        result = fn(conn, *args)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO group_write")
+                        conn.execute("RELEASE group_write")
+                        fut.set_exception(e)
+                        continue
+                    conn.execute("RELEASE group_write")
+                    results.append((fut, result))
+        except Exception as e:
+            # فشل BEGIN أو COMMIT: لا شيء من المجموعة محفوظ
+            log.warning("group commit of %d writes failed: %s", len(batch), e)
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        self._record(len(batch), time.perf_counter() - t0)
+        # الإقرار بعد COMMIT فقط
+        for fut, result in results:
+            fut.set_result(result)
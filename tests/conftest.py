@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# الوحدات في جذر المستودع (بدون حزمة)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from eohealth_db import ConnectionPool, migrate  # noqa: E402
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(tmp_path / "eohealth.db")
+    migrate(pool)
+    yield pool
+    pool.close()
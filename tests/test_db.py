@@ -0,0 +1,79 @@
+from eohealth_db import ConnectionPool, insert_child, insert_medical_record, migrate, normalize_arabic, search_children
+from eohealth_lookup import ChildLookup
+from eohealth_writer import GroupCommitWriter
+
+
+def _child(national_id, full_name="محمد أحمد علي", **extra):
+    return {"full_name": full_name, "national_id": national_id, "birth_date": "2024-03-01", "gender": "Male",
+            "mother_id": "28001011234567", "father_id": "27501011234567", "governorate": "Cairo", **extra}
+
+
+def test_duplicate_national_ids_are_quarantined(tmp_path):
+    pool = ConnectionPool(tmp_path / "old.db")
+    migrate(pool, target=1)
+    with pool.transaction() as conn:
+        rows = [(1, "أول", "30001010100011"), (2, "مكرر", "30001010100011"), (3, "آخر", "30001010100022"),
+                (4, "مكرر ثاني", "30001010100011")]
+        conn.executemany("INSERT INTO children (id, full_name, national_id) VALUES (?, ?, ?)", rows)
+        conn.executemany("INSERT INTO medical_files (child_id, record_date) VALUES (?, '2024-05-01')", [(1,), (2,), (4,)])
+
+    migrate(pool)
+
+    with pool.connection() as conn:
+        assert [r[0] for r in conn.execute("SELECT id FROM children ORDER BY id")] == [1, 3]
+        assert conn.execute("SELECT id, national_id, kept_id FROM children_quarantine ORDER BY id").fetchall() == [
+            (2, "30001010100011", 1), (4, "30001010100011", 1)]
+        assert [r[0] for r in conn.execute("SELECT child_id FROM medical_files_quarantine ORDER BY child_id")] == [2, 4]
+        assert [r[0] for r in conn.execute("SELECT child_id FROM medical_files")] == [1]
+    pool.close()
+
+
+def _add_child(conn, national_id, full_name) -> int:
+    return conn.execute("INSERT INTO children (full_name, national_id, name_norm) VALUES (?, ?, ?)",
+                        (full_name, national_id, normalize_arabic(full_name))).lastrowid
+
+
+def test_name_search_follows_insert_update_delete(pool):
+    with pool.transaction() as conn:
+        child_id = _add_child(conn, "30001010100011", "أحمد محمود")
+        _add_child(conn, "30001010100022", "يوسف علي")
+
+    with pool.connection() as conn:
+        # البحث بعد التوحيد: الهمزات وبادئة الكلمة
+        assert search_children(conn, "احمد")["id"].tolist() == [child_id]
+        assert search_children(conn, "محم")["id"].tolist() == [child_id]
+
+    with pool.transaction() as conn:
+        conn.execute("UPDATE children SET full_name=?, name_norm=? WHERE id=?",
+                     ("كريم محمود", normalize_arabic("كريم محمود"), child_id))
+    with pool.connection() as conn:
+        assert search_children(conn, "احمد").empty
+        assert search_children(conn, "كريم")["id"].tolist() == [child_id]
+
+    with pool.transaction() as conn:
+        conn.execute("DELETE FROM children WHERE id=?", (child_id,))
+    with pool.connection() as conn:
+        assert search_children(conn, "كريم").empty
+        assert len(search_children(conn, "يوسف")) == 1
+
+
+def test_group_writer_and_lookup(pool):
+    writer = GroupCommitWriter(pool).start()
+    lookup = ChildLookup(pool, validate=True)
+    try:
+        child_id = writer.write(insert_child, _child("30001010100011"))
+        with pool.connection() as conn:
+            smart_id = conn.execute("SELECT smart_id FROM children WHERE id=?", (child_id,)).fetchone()[0]
+
+        found = lookup.lookup(f"{smart_id}|30001010100011")
+        assert found["child"]["id"] == child_id and found["latest_medical"] is None
+        assert lookup.lookup("30001010100011")["child"]["id"] == child_id
+        assert lookup.lookup(smart_id)["latest_medical"] is None
+        assert lookup.lookup(f"{smart_id}|30001010199999") is None
+
+        writer.write(insert_medical_record, child_id, {"record_date": "2024-05-01", "weight": 7.5, "height": 65})
+        # validate=True: نسخة الطفل تغيرت فالكاش لا يرجع النتيجة القديمة
+        assert lookup.lookup(smart_id)["latest_medical"]["weight"] == 7.5
+        assert [r["child"]["id"] for r in lookup.lookup_many([smart_id, "EOH-00000000-999"]) if r] == [child_id]
+    finally:
+        writer.close()